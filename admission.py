@@ -0,0 +1,249 @@
+"""Per-team admission control in front of the analysis pipeline.
+
+Embedding, Qdrant writes and the LLM are shared by all teams, so a team with
+a huge suite and frequent pushes could keep them busy and starve the
+others.  Every analysis therefore takes a slot from :func:`admit` once its
+team and size are known, before embedding:
+
+* at most ``ADMISSION_MAX_CONCURRENCY`` analyses run at once, and at most
+  ``ADMISSION_TEAM_CONCURRENCY`` of them per team;
+* waiting analyses are served by weighted fair queueing: each gets a
+  virtual finish time ``start + cost / weight`` (the cost is estimated from
+  the number of cases to embed, see :func:`estimate_cost`), and the
+  smallest finish time among teams below their limit goes first, so a team
+  with many large reports cannot push out small ones of other teams;
+* an analysis is rejected with :class:`AdmissionRejected` (HTTP 429 with
+  ``Retry-After``) when its team already has ``ADMISSION_TEAM_QUEUE``
+  waiting analyses or when it waited longer than
+  ``ADMISSION_QUEUE_DEADLINE``.
+"""
+
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Analyses in the pipeline at the same time, over all teams
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", 4))
+# Analyses of one team in the pipeline at the same time
+ADMISSION_TEAM_CONCURRENCY = int(os.getenv("ADMISSION_TEAM_CONCURRENCY", 2))
+# Waiting analyses per team; more are rejected right away
+ADMISSION_TEAM_QUEUE = int(os.getenv("ADMISSION_TEAM_QUEUE", 20))
+# How long (seconds) an analysis may wait for a slot
+ADMISSION_QUEUE_DEADLINE = float(os.getenv("ADMISSION_QUEUE_DEADLINE", 120))
+# Fixed cost of an analysis (LLM call, Qdrant round-trips) in cases
+ADMISSION_BASE_COST = int(os.getenv("ADMISSION_BASE_COST", 200))
+# Team weights, e.g. "Payments=2,Search=0.5"; other teams have weight 1
+ADMISSION_TEAM_WEIGHTS = os.getenv("ADMISSION_TEAM_WEIGHTS", "")
+# Retry-After (seconds) before any analysis has finished
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 10))
+
+_WAITING = None
+_GRANTED = True
+_ABANDONED = False
+
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis is not admitted; ``retry_after`` is in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_weights(value: str) -> dict:
+    """Parse ``"team=weight,..."``; malformed entries are ignored."""
+    weights = {}
+    for part in value.split(","):
+        team, sep, weight = part.rpartition("=")
+        if not sep or not team.strip():
+            continue
+        try:
+            weights[team.strip()] = max(float(weight), 0.01)
+        except ValueError:
+            logger.warning("[ADMISSION] bad weight %r", part)
+    return weights
+
+
+def estimate_cost(cases: int) -> int:
+    """Cost of an analysis that embeds ``cases`` cases."""
+    return ADMISSION_BASE_COST + max(int(cases), 0)
+
+
+class FairScheduler:
+    """Weighted fair queue with a global and a per-team concurrency limit."""
+
+    def __init__(self, capacity, team_limit, queue_limit, weights=None):
+        self.capacity = max(int(capacity), 1)
+        self.team_limit = max(int(team_limit), 1)
+        self.queue_limit = max(int(queue_limit), 0)
+        self.weights = dict(weights or {})
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._active = Counter()
+        self._queued = Counter()
+        self._finish = {}
+        self._vtime = 0.0
+        # Скользящая оценка секунд на единицу стоимости для Retry-After
+        self._seconds_per_cost = None
+
+    def _weight(self, team) -> float:
+        return self.weights.get(team, 1.0)
+
+    def _dispatch(self):
+        # Вызывается под self._lock
+        while sum(self._active.values()) < self.capacity:
+            eligible = [
+                e for e in self._waiting if self._active[e["team"]] < self.team_limit
+            ]
+            if not eligible:
+                return
+            entry = min(eligible, key=lambda e: (e["finish"], e["seq"]))
+            self._waiting.remove(entry)
+            self._queued[entry["team"]] -= 1
+            self._active[entry["team"]] += 1
+            self._vtime = max(self._vtime, entry["start"])
+            entry["state"] = _GRANTED
+            entry["event"].set()
+
+    def _retry_after(self, team, cost) -> int:
+        # Под self._lock: очередь команды плюс этот запрос при её лимите
+        if self._seconds_per_cost is None:
+            return ADMISSION_RETRY_AFTER
+        queued = sum(e["cost"] for e in self._waiting if e["team"] == team) + cost
+        seconds = self._seconds_per_cost * queued / self.team_limit
+        return min(max(int(math.ceil(seconds)), 1), 3600)
+
+    def acquire(self, team, cost, timeout=None) -> dict:
+        """Wait for a slot of ``team``; returns the ticket for :meth:`release`.
+
+        Raises
+        ------
+        AdmissionRejected
+            When the team queue is full or ``timeout`` expired.
+        """
+        cost = max(float(cost), 1.0)
+        with self._lock:
+            free = (
+                self._active[team] < self.team_limit
+                and sum(self._active.values()) < self.capacity
+            )
+            if self._queued[team] >= self.queue_limit and not free:
+                raise AdmissionRejected(
+                    f"Too many queued analyses for team {team!r}",
+                    self._retry_after(team, cost),
+                )
+            start = max(self._vtime, self._finish.get(team, 0.0))
+            entry = {
+                "team": team,
+                "cost": cost,
+                "start": start,
+                "finish": start + cost / self._weight(team),
+                "seq": next(self._seq),
+                "event": threading.Event(),
+                "state": _WAITING,
+            }
+            self._finish[team] = entry["finish"]
+            self._waiting.append(entry)
+            self._queued[team] += 1
+            self._dispatch()
+
+        if not entry["event"].wait(timeout):
+            with self._lock:
+                if entry["state"] is not _GRANTED:
+                    entry["state"] = _ABANDONED
+                    self._waiting.remove(entry)
+                    self._queued[team] -= 1
+                    raise AdmissionRejected(
+                        f"Team {team!r} waited for a slot longer than {timeout:.0f}s",
+                        self._retry_after(team, cost),
+                    )
+        entry["granted_at"] = time.monotonic()
+        return entry
+
+    def release(self, ticket):
+        elapsed = time.monotonic() - ticket["granted_at"]
+        with self._lock:
+            self._active[ticket["team"]] -= 1
+            rate = elapsed / ticket["cost"]
+            if self._seconds_per_cost is None:
+                self._seconds_per_cost = rate
+            else:
+                self._seconds_per_cost = 0.8 * self._seconds_per_cost + 0.2 * rate
+            self._dispatch()
+
+    def snapshot(self) -> dict:
+        """Return ``{team: (waiting, active)}`` of every team seen so far."""
+        with self._lock:
+            teams = set(self._queued) | set(self._active)
+            return {t: (self._queued[t], self._active[t]) for t in teams}
+
+
+_SCHEDULER = FairScheduler(
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_TEAM_CONCURRENCY,
+    ADMISSION_TEAM_QUEUE,
+    parse_weights(ADMISSION_TEAM_WEIGHTS),
+)
+
+ADMISSION_WAIT = metrics.histogram(
+    "rag_admission_wait_seconds",
+    "Time analyses waited for admission, per team.",
+    ("team", "outcome"),
+)
+TEAM_QUEUE_DEPTH = metrics.gauge(
+    "rag_admission_queue_depth", "Analyses waiting for admission, per team.", ("team",)
+)
+TEAM_ACTIVE = metrics.gauge(
+    "rag_admission_active", "Admitted analyses in the pipeline, per team.", ("team",)
+)
+
+
+@metrics.register_collector
+def _collect_queue():
+    state = _SCHEDULER.snapshot()
+    result = [
+        (metrics.QUEUE_DEPTH, {"queue": "admission"}, sum(w for w, _ in state.values())),
+        (metrics.QUEUE_ACTIVE, {"queue": "admission"}, sum(a for _, a in state.values())),
+    ]
+    for team, (waiting, active) in state.items():
+        result.append((TEAM_QUEUE_DEPTH, {"team": team}, waiting))
+        result.append((TEAM_ACTIVE, {"team": team}, active))
+    return result
+
+
+@contextmanager
+def admit(team: str, cost: float, timeout: float | None = None):
+    """Hold a pipeline slot of ``team`` for the duration of the block.
+
+    Raises :class:`AdmissionRejected` before the block when the analysis is
+    not admitted.
+    """
+    if not ADMISSION_ENABLED:
+        yield
+        return
+    if timeout is None:
+        timeout = ADMISSION_QUEUE_DEADLINE
+    queued_at = time.monotonic()
+    try:
+        with metrics.span("admission", cost=int(cost)):
+            ticket = _SCHEDULER.acquire(team, cost, timeout=timeout)
+    except AdmissionRejected as e:
+        ADMISSION_WAIT.observe(time.monotonic() - queued_at, team=team, outcome="rejected")
+        logger.warning("[ADMISSION] %s (retry after %ss)", e, e.retry_after)
+        raise
+    ADMISSION_WAIT.observe(time.monotonic() - queued_at, team=team, outcome="admitted")
+    try:
+        yield
+    finally:
+        _SCHEDULER.release(ticket)
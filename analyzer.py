@@ -1,30 +1,213 @@
-import requests
+"""LLM analysis of a report compared with the previous ones.
+
+The prompt is built from compact aggregates instead of the cases: every
+report is reduced to its status counts, duration, flaky count, top error
+signatures and the status of every test, and the current report is compared
+with the latest previous one test by test (:func:`diff_reports`).  Sections
+are serialized as compact JSON and the prompt is capped by
+``ANALYZER_PROMPT_TOKEN_BUDGET``, so its size no longer grows with the
+number of cases.
+
+:func:`analyze_team` reads the aggregates that every analysis already
+recorded in :mod:`stats_store` (:func:`stored_aggregates`) and touches no
+case at all; :func:`analyze_reports` computes them from case lists
+(:func:`aggregate_report`) for callers that only have the cases.
+"""
+
 import os
+from collections import Counter
 
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
-LLM_MODEL = os.getenv("LLM_MODEL", "gemma3:4b")
+import numpy as np
 
-def analyze_reports(report, prev_reports, plot_img_path):
-    # "plot_img_path" is kept for backward compatibility but is not used in the
-    # LLM prompt. The model operates only on textual data.
-    # Формируем промпт для LLM
-    prompt = (
-        "Ты — эксперт по автотестам. Проведи глубокий анализ текущего отчёта и сравни с предыдущими. "
-        "Кратко: в чем основные тренды, какие ошибки повторяются, есть ли улучшения или деградация?\n\n"
-        "Данные текущего отчёта:\n"
-        f"{report}\n\n"
-        "Данные прошлых отчётов:\n"
-        f"{prev_reports}"
+import llm_gateway
+import prompt_builder
+import serialization
+from error_signature import error_signature
+import stats_store
+from stats_store import FAILED_STATUSES, STATUSES, case_key
+
+# Hard cap of the prompt in (estimated) tokens
+ANALYZER_PROMPT_TOKEN_BUDGET = int(os.getenv("ANALYZER_PROMPT_TOKEN_BUDGET", 2000))
+# Timeout (seconds) of the LLM call
+ANALYZER_LLM_TIMEOUT = float(os.getenv("ANALYZER_LLM_TIMEOUT", 60))
+# Error signatures kept per report
+ANALYZER_TOP_ERRORS = int(os.getenv("ANALYZER_TOP_ERRORS", 5))
+# Reports compared by analyze_team (the current one and the previous ones)
+ANALYZER_HISTORY_DEPTH = int(os.getenv("ANALYZER_HISTORY_DEPTH", 3))
+
+INTRO = (
+    "Ты — эксперт по автотестам. Проведи глубокий анализ текущего отчёта и сравни с предыдущими. "
+    "Данные — агрегаты отчётов в JSON.\n\n"
+)
+INSTRUCTION = (
+    "\nКратко: в чем основные тренды, какие ошибки повторяются, есть ли улучшения или деградация?"
+)
+
+
+def aggregate_report(cases) -> dict:
+    """Reduce a report to the aggregates used in the prompt.
+
+    Returns
+    -------
+    dict
+        ``total``, ``statuses``, ``duration_s``, ``flaky``, ``errors``
+        (``[signature, count]``, most frequent first) and ``tests``
+        (``{test: status}``, used only for the diff).
+    """
+    statuses = Counter()
+    errors = Counter()
+    tests = {}
+    duration = 0
+    flaky = 0
+    for case in cases:
+        status = (case.get("status") or "unknown").lower()
+        statuses[status] += 1
+        flaky += bool(case.get("flaky"))
+        value = (case.get("time") or {}).get("duration", case.get("duration"))
+        if isinstance(value, (int, float)):
+            duration += value
+        if status in FAILED_STATUSES:
+            signature = error_signature(case)
+            if signature:
+                errors[signature] += 1
+        tests[case_key(case)] = status
+    ordered = [s for s in STATUSES if s in statuses] + sorted(set(statuses) - set(STATUSES))
+    return {
+        "total": len(cases),
+        "statuses": {s: statuses[s] for s in ordered},
+        "duration_s": round(duration / 1000),
+        "flaky": flaky,
+        "errors": [[sig, n] for sig, n in errors.most_common(ANALYZER_TOP_ERRORS)],
+        "tests": tests,
+    }
+
+
+def stored_aggregates(team: str, depth: int | None = None, until: int | None = None) -> list:
+    """Return the aggregates of the last ``depth`` reports of ``team``, oldest first.
+
+    The result has the shape of :func:`aggregate_report` but is read from the
+    report rows, error signatures and per-test outcomes of :mod:`stats_store`.
+    """
+    depth = depth or ANALYZER_HISTORY_DEPTH
+    rows = stats_store.report_history(team, depth, until=until)
+    if not rows:
+        return []
+    outcomes = stats_store.load_outcomes(team, depth, until=until)
+    column = {uuid: i for i, uuid in enumerate(outcomes["uuids"])}
+    names = stats_store.team_test_names(team)
+    signatures = stats_store.report_signatures(
+        team, [row["uuid"] for row in rows], ANALYZER_TOP_ERRORS
     )
-    data = {
-        "model": LLM_MODEL,
-        "prompt": prompt,
-        "stream": False
+    result = []
+    for row in rows:
+        tests = {}
+        if row["uuid"] in column:
+            codes = outcomes["status"][:, column[row["uuid"]]]
+            for test_id in np.flatnonzero(codes != stats_store.ABSENT):
+                code = int(codes[test_id])
+                status = STATUSES[code] if code < len(STATUSES) else "unknown"
+                tests[names.get(int(test_id), str(test_id))] = status
+        statuses = {s: row[s] for s in STATUSES if row[s]}
+        other = row["total"] - sum(statuses.values())
+        if other:
+            statuses["unknown"] = other
+        result.append(
+            {
+                "total": row["total"],
+                "statuses": statuses,
+                "duration_s": round(row["duration_ms"] / 1000),
+                "flaky": row["flaky"],
+                "errors": [[sig, n] for sig, n in signatures.get(row["uuid"], [])],
+                "tests": tests,
+            }
+        )
+    return result
+
+
+def _examples(tests) -> dict:
+    tests = sorted(tests)
+    return {"count": len(tests), "examples": tests[: prompt_builder.PROMPT_TOP_K]}
+
+
+def diff_reports(previous: dict, current: dict) -> dict:
+    """Compare two reports aggregated by :func:`aggregate_report` test by test."""
+    before, after = previous["tests"], current["tests"]
+    failed_before = {t for t, s in before.items() if s in FAILED_STATUSES}
+    failed_after = {t for t, s in after.items() if s in FAILED_STATUSES}
+    fixed = {t for t in failed_before if after.get(t) == "passed"}
+    return {
+        "new_failures": _examples(failed_after - failed_before),
+        "fixed": _examples(fixed),
+        "still_failing": len(failed_after & failed_before),
+        "added_tests": len(after.keys() - before.keys()),
+        "removed_tests": len(before.keys() - after.keys()),
     }
-    resp = requests.post(OLLAMA_URL, json=data)
-    if resp.status_code != 200:
-        raise Exception(f"LLM error: {resp.text}")
-    output = resp.json()["response"]
+
+
+def _previous_reports(prev_reports) -> list:
+    """Return previous reports as case lists, oldest first.
+
+    Accepts the ``{uuid: {"timestamp", "chunks"}}`` mapping of
+    :func:`qdrant_store.get_prev_report_chunks`, a list of case lists or a
+    single flat list of cases.
+    """
+    if not prev_reports:
+        return []
+    if isinstance(prev_reports, dict):
+        items = sorted(prev_reports.values(), key=lambda d: d.get("timestamp", 0))
+        return [d.get("chunks") or [] for d in items]
+    if isinstance(prev_reports[0], dict):
+        return [prev_reports]
+    return list(prev_reports)
+
+
+def _json(value) -> str:
+    return serialization.dumps(value).decode("utf-8")
+
+
+def _public(aggregate) -> dict:
+    return {k: v for k, v in aggregate.items() if k != "tests"}
+
+
+def build_prompt(current: dict, previous: list) -> str:
+    """Assemble the prompt from aggregates (current and previous, oldest first)."""
+    sections = [
+        prompt_builder.PromptSection(INTRO, priority=0),
+        prompt_builder.PromptSection(f"Текущий отчёт: {_json(_public(current))}\n", priority=0),
+    ]
+    if previous:
+        sections.append(
+            prompt_builder.PromptSection(
+                f"Изменения относительно прошлого отчёта: {_json(diff_reports(previous[-1], current))}\n",
+                priority=1,
+            )
+        )
+        sections.append(
+            prompt_builder.PromptSection(
+                "Прошлые отчёты (от старых к новым): "
+                f"{_json([_public(p) for p in previous])}\n",
+                priority=2,
+            )
+        )
+    budget = ANALYZER_PROMPT_TOKEN_BUDGET
+    if budget <= 0:
+        budget = prompt_builder.LLM_PROMPT_TOKEN_BUDGET or 2000
+    return prompt_builder.build_prompt(sections, INSTRUCTION, budget=budget)
+
+
+def _generate(prompt, priority, timeout, fallback) -> list:
+    if priority is None:
+        priority = llm_gateway.PRIORITY_NORMAL
+    try:
+        output = llm_gateway.generate(
+            prompt, priority=priority, timeout=timeout or ANALYZER_LLM_TIMEOUT
+        )
+    except llm_gateway.LLMCancelled:
+        raise
+    except llm_gateway.LLMQueueTimeout:
+        output = fallback
+    except Exception as e:
+        raise Exception(f"LLM error: {e}")
     # Возвращаем в правильном формате
     return [
         {
@@ -32,3 +215,38 @@ def analyze_reports(report, prev_reports, plot_img_path):
             "message": output
         }
     ]
+
+
+def analyze_team(team, until=None, priority=None, timeout=None):
+    """Compare the last ``ANALYZER_HISTORY_DEPTH`` recorded reports of ``team``.
+
+    Returns an empty list when no report of the team was recorded.
+    """
+    aggregates = stored_aggregates(team, until=until)
+    if not aggregates:
+        return []
+    current, previous = aggregates[-1], aggregates[:-1]
+    return _generate(
+        build_prompt(current, previous),
+        priority,
+        timeout,
+        "LLM недоступна, сводка сформирована автоматически.\n"
+        f"Кейсов в текущем отчёте: {current['total']}, "
+        f"предыдущих отчётов: {len(previous)}",
+    )
+
+
+def analyze_reports(report, prev_reports, plot_img_path, priority=None, timeout=None):
+    # "plot_img_path" is kept for backward compatibility but is not used in the
+    # LLM prompt. The model operates only on textual data.
+    # Формируем промпт из агрегатов, а не из сырых кейсов
+    current = aggregate_report(report)
+    previous = [aggregate_report(cases) for cases in _previous_reports(prev_reports)]
+    return _generate(
+        build_prompt(current, previous),
+        priority,
+        timeout,
+        "LLM недоступна, сводка сформирована автоматически.\n"
+        f"Кейсов в текущем отчёте: {len(report)}, "
+        f"предыдущих отчётов: {len(previous)}",
+    )
@@ -0,0 +1,142 @@
+"""Prompt size and end-to-end latency of ``analyzer.analyze_reports``.
+
+Two versions are compared on the current report plus ``--previous`` earlier
+reports of every size:
+
+* ``legacy``  – the previous implementation: ``repr`` of every case of the
+  current and previous reports in the prompt, one ``requests.post`` per call;
+* ``compact`` – :mod:`analyzer`: aggregates and a test-by-test diff as
+  compact JSON, capped by ``ANALYZER_PROMPT_TOKEN_BUDGET``, sent through the
+  gateway session;
+* ``stored``  – :func:`analyzer.analyze_team`: the same prompt from the
+  aggregates recorded in :mod:`stats_store` (recorded before the timing,
+  as every analysis does), no case is touched.
+
+The LLM is the fake Ollama of :mod:`fakes` (``--llm-delay`` seconds per
+call) unless ``--ollama`` is given, then prompts go to ``OLLAMA_URL``:
+
+    python benchmarks/bench_analyzer.py --sizes 1000 10000 --previous 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeServices  # noqa: E402
+from synthetic import make_cases  # noqa: E402
+
+
+def legacy_prompt(report, prev_reports):
+    return (
+        "Ты — эксперт по автотестам. Проведи глубокий анализ текущего отчёта и сравни с предыдущими. "
+        "Кратко: в чем основные тренды, какие ошибки повторяются, есть ли улучшения или деградация?\n\n"
+        "Данные текущего отчёта:\n"
+        f"{report}\n\n"
+        "Данные прошлых отчётов:\n"
+        f"{prev_reports}"
+    )
+
+
+def legacy_analyze(report, prev_reports):
+    import llm_gateway
+
+    prompt = legacy_prompt(report, prev_reports)
+    payload = {"model": os.getenv("LLM_MODEL", "gemma3:4b"), "prompt": prompt, "stream": False}
+    response = requests.post(os.environ["OLLAMA_URL"], json=payload, timeout=llm_gateway.LLM_TIMEOUT)
+    response.raise_for_status()
+    return response.json().get("response", "")
+
+
+def record_stats(report, prev_reports):
+    import stats_store
+
+    stats_store.STATS_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_analyzer_"), "stats.sqlite3")
+    for uuid, data in prev_reports.items():
+        stats_store.record_report("bench", uuid, data["timestamp"], data["chunks"])
+    stats_store.record_report("bench", "current", len(prev_reports), report)
+
+
+def measure(variant, report, prev_reports):
+    import analyzer
+    import prompt_builder
+
+    start = time.perf_counter()
+    if variant == "legacy":
+        prompt = legacy_prompt(report, prev_reports)
+    elif variant == "stored":
+        aggregates = analyzer.stored_aggregates("bench", depth=len(prev_reports) + 1)
+        prompt = analyzer.build_prompt(aggregates[-1], aggregates[:-1])
+    else:
+        previous = [analyzer.aggregate_report(cases) for cases in analyzer._previous_reports(prev_reports)]
+        prompt = analyzer.build_prompt(analyzer.aggregate_report(report), previous)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if variant == "legacy":
+        legacy_analyze(report, prev_reports)
+    elif variant == "stored":
+        analyzer.analyze_team("bench")
+    else:
+        analyzer.analyze_reports(report, prev_reports, None)
+    total = time.perf_counter() - start
+    return {
+        "prompt_chars": len(prompt),
+        "prompt_tokens": prompt_builder.estimate_tokens(prompt),
+        "build_seconds": round(build, 4),
+        "end_to_end_seconds": round(total, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--previous", type=int, default=2, help="Number of previous reports")
+    parser.add_argument("--llm-delay", type=float, default=0.0)
+    parser.add_argument("--ollama", action="store_true", help="Send prompts to OLLAMA_URL")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    services = None
+    if not args.ollama:
+        services = FakeServices(llm_delay=args.llm_delay).start()
+        os.environ["OLLAMA_URL"] = services.env()["OLLAMA_URL"]
+    os.environ.setdefault("OLLAMA_URL", "http://localhost:11434/api/generate")
+
+    results = []
+    try:
+        for size in args.sizes:
+            report = make_cases(size, run=args.previous)
+            prev_reports = {
+                f"prev-{run}": {"timestamp": run, "chunks": make_cases(size, run=run)}
+                for run in range(args.previous)
+            }
+            record_stats(report, prev_reports)
+            for variant in ("legacy", "compact", "stored"):
+                row = {"cases": size, "variant": variant}
+                row.update(measure(variant, report, prev_reports))
+                results.append(row)
+                if services is not None:
+                    services.prompts.clear()
+                print(
+                    f"{size:>7} cases  {variant:<8} {row['prompt_tokens']:>10} tokens  "
+                    f"build {row['build_seconds']:>7.3f}s  end-to-end {row['end_to_end_seconds']:>7.3f}s"
+                )
+    finally:
+        if services is not None:
+            services.stop()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Timing of :func:`failure_clustering.cluster_embeddings` on synthetic failures.
+
+Vectors are drawn around a number of random centres to mimic failures that
+share a root cause.  ``--worst-case`` makes every failure distinct, so each
+one becomes its own leader and is compared with all earlier leaders; with
+``--target-ms`` the script exits with status 1 when the best run is slower,
+e.g.
+
+    python benchmarks/bench_clustering.py --failures 10000 --centres 200
+    python benchmarks/bench_clustering.py --failures 10000 --worst-case --target-ms 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import failure_clustering  # noqa: E402
+
+
+def make_vectors(n, centres, dim, noise, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(centres, dim)).astype(np.float32)
+    base /= np.linalg.norm(base, axis=1, keepdims=True)
+    vectors = base[rng.integers(0, centres, size=n)]
+    vectors = vectors + rng.normal(scale=noise, size=vectors.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def distinct_vectors(n, dim, seed=0):
+    # Случайные направления в высокой размерности почти ортогональны
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--failures", type=int, default=10000)
+    parser.add_argument("--centres", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--worst-case", action="store_true", help="every failure is its own cluster"
+    )
+    parser.add_argument("--target-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.worst_case:
+        vectors = distinct_vectors(args.failures, args.dim)
+    else:
+        vectors = make_vectors(args.failures, args.centres, args.dim, args.noise)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        labels = failure_clustering.cluster_embeddings(vectors)
+        timings.append(time.perf_counter() - start)
+    print(
+        f"{args.failures} failures -> {labels.max() + 1} clusters, "
+        f"best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms"
+    )
+    if args.target_ms is not None and min(timings) * 1000 > args.target_ms:
+        print(f"target missed: best {min(timings) * 1000:.1f} ms > {args.target_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
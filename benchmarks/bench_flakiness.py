@@ -0,0 +1,84 @@
+"""Timing of the per-test stability analytics on a synthetic history.
+
+Measures :func:`flakiness.compute` plus :func:`flakiness.offenders` on
+aligned ``tests x reports`` matrices, and loading the same window from the
+stats store (:func:`stats_store.load_outcomes`), e.g.
+
+    python benchmarks/bench_flakiness.py --tests 20000 --reports 30
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import flakiness  # noqa: E402
+import stats_store  # noqa: E402
+
+
+def make_history(tests, reports, seed=0):
+    """Mostly passing tests with some flaky, broken, slowed-down and absent ones."""
+    rng = np.random.default_rng(seed)
+    codes = stats_store.STATUS_CODES
+    fail_rate = np.where(rng.random(tests) < 0.05, 0.4, 0.01)[:, None]
+    status = np.where(rng.random((tests, reports)) < fail_rate, codes["failed"], codes["passed"])
+    status = status.astype(np.int8)
+    status[rng.random((tests, reports)) < 0.02] = codes["skipped"]
+    status[rng.random((tests, reports)) < 0.01] = stats_store.ABSENT
+    status[: tests // 100, -5:] = codes["broken"]
+    duration = rng.normal(1000, 50, size=(tests, reports)).astype(np.float32)
+    duration[-(tests // 100):, -1] *= 3
+    return status, duration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tests", type=int, default=20000)
+    parser.add_argument("--reports", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-store", action="store_true", help="Do not measure the SQLite store")
+    args = parser.parse_args()
+
+    status, duration = make_history(args.tests, args.reports)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        picked = flakiness.offenders(flakiness.compute(status, duration))
+        timings.append(time.perf_counter() - start)
+    print(
+        f"analytics {args.tests} tests x {args.reports} reports: "
+        f"best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms "
+        f"({', '.join(f'{k}={len(v)}' for k, v in picked.items())})"
+    )
+    if args.skip_store:
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_store.STATS_DB_PATH = os.path.join(tmp, "stats.sqlite3")
+        statuses = stats_store.STATUSES + ("unknown",)
+        start = time.perf_counter()
+        for r in range(args.reports):
+            cases = [
+                {"fullName": f"suite.test_{i}", "status": statuses[code], "time": {"duration": float(d)}}
+                for i, (code, d) in enumerate(zip(status[:, r], duration[:, r]))
+                if code != stats_store.ABSENT
+            ]
+            stats_store.record_report("bench", f"r{r}", r, cases)
+        record = (time.perf_counter() - start) / args.reports
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            flakiness.analyze_team("bench", depth=args.reports)
+            timings.append(time.perf_counter() - start)
+    print(
+        f"store: record {record * 1000:.1f} ms/report, "
+        f"load + analytics best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Qdrant memory and search latency with many teams: per-team vs shared layout.
+
+``--teams`` teams with ``--reports`` reports of ``--cases`` cases each are
+loaded into a real Qdrant (``--qdrant-host``) twice: once as a collection per
+team (``QDRANT_COLLECTION_MODE=per_team``) and once into the shared
+collection partitioned by tenant (``shared``).  For each layout the script
+reports the load time, the Qdrant process memory from its ``/metrics``
+endpoint and p50/p99 of ``qdrant_store.search_cases`` for random teams, e.g.
+
+    python benchmarks/bench_multitenant.py --teams 500 --qdrant-host localhost
+
+Collections created by the benchmark are removed at the end of each layout.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeEmbeddingModel  # noqa: E402
+from synthetic import make_cases  # noqa: E402
+
+TEAM_PREFIX = "bench_tenant_"
+SHARED_COLLECTION = "bench_shared_test_cases"
+MEMORY_METRICS = ("memory_resident_bytes", "memory_allocated_bytes")
+
+
+def qdrant_memory(url):
+    """Return Qdrant memory metrics in MiB (empty when unavailable)."""
+    try:
+        text = requests.get(f"{url}/metrics", timeout=10).text
+    except requests.RequestException:
+        return {}
+    values = {}
+    for name in MEMORY_METRICS:
+        match = re.search(rf"^{name}(?:{{[^}}]*}})? ([0-9.e+]+)$", text, re.MULTILINE)
+        if match:
+            values[name] = float(match.group(1)) / 2**20
+    return values
+
+
+def cleanup(client, teams):
+    import qdrant_store
+
+    names = {qdrant_store.normalize_collection_name(t) for t in teams} | {SHARED_COLLECTION}
+    for collection in client.get_collections().collections:
+        if collection.name in names:
+            client.delete_collection(collection.name)
+
+
+def run_layout(mode, args, teams, embeddings):
+    import qdrant_store
+
+    qdrant_store.QDRANT_COLLECTION_MODE = mode
+    qdrant_store.QDRANT_SHARED_COLLECTION = SHARED_COLLECTION
+    client = qdrant_store.get_client()
+    url = f"http://{args.qdrant_host}:{args.qdrant_port}"
+    cleanup(client, teams)
+    time.sleep(args.settle)
+    before = qdrant_memory(url)
+
+    start = time.perf_counter()
+    for team in teams:
+        reports = [
+            (f"{team}-{run}", chunks, vectors, 1000 + run)
+            for run, (chunks, vectors) in enumerate(embeddings)
+        ]
+        qdrant_store.save_reports_chunks(team, reports)
+    load = time.perf_counter() - start
+    time.sleep(args.settle)
+    after = qdrant_memory(url)
+
+    rng = random.Random(0)
+    queries = embeddings[0][1]
+    latencies = []
+    for _ in range(args.searches):
+        team = rng.choice(teams)
+        vector = queries[rng.randrange(len(queries))]
+        statuses = ["failed", "broken"] if rng.random() < 0.5 else None
+        start = time.perf_counter()
+        qdrant_store.search_cases(team, vector, statuses=statuses, limit=10)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+
+    cleanup(client, teams)
+    memory = ", ".join(
+        f"{name.replace('memory_', '').replace('_bytes', '')} +{after[name] - before.get(name, 0):.0f} MiB"
+        for name in after
+    ) or "memory n/a"
+    print(
+        f"{mode:>8}: load {load:.1f} s, {memory}, "
+        f"search p50 {p50:.1f} ms, p99 {p99:.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--reports", type=int, default=3)
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--searches", type=int, default=2000)
+    parser.add_argument("--modes", nargs="+", default=["per_team", "shared"], choices=["per_team", "shared"])
+    parser.add_argument("--qdrant-host", required=True)
+    parser.add_argument("--qdrant-port", type=int, default=6333)
+    parser.add_argument("--settle", type=float, default=5.0, help="Seconds to wait before reading memory")
+    args = parser.parse_args()
+    os.environ["QDRANT_HOST"] = args.qdrant_host
+    os.environ["QDRANT_PORT"] = str(args.qdrant_port)
+
+    import embedder
+
+    embedder._MODEL = FakeEmbeddingModel()
+    # Все команды получают одни и те же отчёты: сравниваются раскладки, а не данные
+    embeddings = []
+    for run in range(args.reports):
+        chunks = make_cases(args.cases, seed=run, run=run)
+        embeddings.append((chunks, embedder.generate_embeddings(chunks)))
+    teams = [f"{TEAM_PREFIX}{i:04d}" for i in range(args.teams)]
+    print(f"{args.teams} teams x {args.reports} reports x {args.cases} cases")
+    for mode in args.modes:
+        run_layout(mode, args, teams, embeddings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""End-to-end benchmark of ``/uuid/analyze`` against local stand-ins.
+
+Every (size, shape) combination runs in a fresh subprocess so that peak RSS
+is measured per run.  Inside, the service is pointed at :mod:`fakes`
+(fake Allure and Ollama over HTTP, fake embedding model, in-memory Qdrant),
+``history`` previous reports are analysed first, and the next analysis is
+measured stage by stage.  Stage functions are wrapped where ``main`` and
+``utils`` look them up, so the real code path is timed.
+
+    python benchmarks/bench_pipeline.py --sizes 100 1000 10000 --shapes flat tree
+    python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Results are written to ``benchmarks/results/<commit>.json`` unless
+``--output`` is given.
+
+The in-memory Qdrant scans points in Python, so Qdrant stages (upsert,
+retention, history, regression) are pessimistic and sizes above a few
+thousand cases take very long.  Pass ``--qdrant-host`` to run them against a
+real Qdrant server; every run then uses its own collection.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+# stage name -> (module, attribute) as called by main.analyze_uuid
+STAGES = {
+    "fetch": ("main", "fetch_allure_report"),
+    "chunk": ("main", "chunk_report"),
+    "embed": ("main", "generate_embeddings"),
+    "embed_failures": ("main", "generate_failure_embeddings"),
+    "cluster": ("main", "cluster_failures"),
+    "upsert": ("main", "save_reports_chunks"),
+    "retention": ("main", "maintain_last_n_reports"),
+    "history": ("main", "get_prev_report_chunks"),
+    "regression": ("main", "classify_failures"),
+    "summary": ("main", "format_reports_summary"),
+    "plot": ("main", "plot_trends_for_reports"),
+    "llm": ("utils", "analyze_cases_with_llm"),
+    "publish": ("utils", "send_analysis_to_allure"),
+}
+
+
+def _rss_peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _install_timers(timings):
+    for stage, (module_name, attr) in STAGES.items():
+        module = sys.modules[module_name]
+        func = getattr(module, attr, None)
+        if func is None:
+            # Переименованный этап иначе молча пропал бы из результатов
+            raise AttributeError(f"Stage {stage!r}: {module_name}.{attr} does not exist")
+
+        def timed(*args, _func=func, _stage=stage, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _func(*args, **kwargs)
+            finally:
+                entry = timings.setdefault(_stage, {"seconds": 0.0, "calls": 0})
+                entry["seconds"] += time.perf_counter() - start
+                entry["calls"] += 1
+                entry["rss_peak_mb"] = round(_rss_peak_mb(), 1)
+
+        setattr(module, attr, timed)
+
+
+def run_single(size, shape, history, llm_delay, qdrant_host=None):
+    """Run one measured analysis in this process and return its metrics."""
+    from fakes import FakeEmbeddingModel, FakeServices, memory_qdrant
+    from synthetic import make_report
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    services = FakeServices(llm_delay=llm_delay).start()
+    os.environ.update(services.env())
+    os.chdir(workdir)
+
+    import embedder
+    import main
+    import plotter
+    import qdrant_store
+
+    plotter.PLOT_DIR = os.path.join(workdir, "plots")
+    embedder._MODEL = FakeEmbeddingModel()
+    team = "Bench"
+    if qdrant_host:
+        os.environ["QDRANT_HOST"] = qdrant_host
+        team = f"Bench_{size}_{shape}_{os.getpid()}"
+    else:
+        client = memory_qdrant()
+        qdrant_store.get_client = lambda: client
+
+    try:
+        for run in range(history):
+            uuid = f"prev-{run}"
+            services.add_report(uuid, make_report(size, shape, team=team, run=run), shape)
+            main.analyze_uuid(main.AnalyzeRequest(uuid=uuid))
+
+        uuid = "measured"
+        services.add_report(uuid, make_report(size, shape, team=team, run=history), shape)
+        timings = {}
+        _install_timers(timings)
+        start = time.perf_counter()
+        main.analyze_uuid(main.AnalyzeRequest(uuid=uuid))
+        total = time.perf_counter() - start
+    finally:
+        services.stop()
+        if qdrant_host:
+            qdrant_store.get_client().delete_collection(
+                qdrant_store.normalize_collection_name(team)
+            )
+
+    for entry in timings.values():
+        entry["seconds"] = round(entry["seconds"], 4)
+        entry["cases_per_s"] = round(size / entry["seconds"], 1) if entry["seconds"] else None
+    return {
+        "size": size,
+        "shape": shape,
+        "history": history,
+        "total_seconds": round(total, 4),
+        "cases_per_s": round(size / total, 1),
+        "rss_peak_mb": round(_rss_peak_mb(), 1),
+        "prompt_chars": len(services.prompts[-1]) if services.prompts else 0,
+        "stages": timings,
+    }
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--shapes", nargs="+", default=["flat", "tree"], choices=["flat", "tree"])
+    parser.add_argument("--history", type=int, default=2, help="Previous reports analysed first")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="Fake Ollama latency, seconds")
+    parser.add_argument("--qdrant-host", help="Use this Qdrant server instead of in-memory")
+    parser.add_argument("--output", help="Result JSON path")
+    parser.add_argument("--single", nargs=2, metavar=("SIZE", "SHAPE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        result = run_single(
+            int(args.single[0]), args.single[1], args.history, args.llm_delay, args.qdrant_host
+        )
+        print(json.dumps(result))
+        return
+
+    runs = []
+    for size in args.sizes:
+        for shape in args.shapes:
+            cmd = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--single",
+                str(size),
+                shape,
+                "--history",
+                str(args.history),
+                "--llm-delay",
+                str(args.llm_delay),
+            ]
+            if args.qdrant_host:
+                cmd += ["--qdrant-host", args.qdrant_host]
+            out = subprocess.run(cmd, capture_output=True, text=True)
+            if out.returncode != 0:
+                print(out.stderr, file=sys.stderr)
+                raise SystemExit(f"benchmark run {size}/{shape} failed")
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            runs.append(result)
+            stages = ", ".join(
+                f"{name}={entry['seconds']:.3f}s" for name, entry in result["stages"].items()
+            )
+            print(
+                f"{size:>7} {shape:<4} total={result['total_seconds']:.3f}s "
+                f"rss={result['rss_peak_mb']:.0f}MB  {stages}"
+            )
+
+    commit = _commit()
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "runs": runs,
+            },
+            f,
+            indent=2,
+        )
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
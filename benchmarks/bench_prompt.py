@@ -0,0 +1,126 @@
+"""Prompt size and LLM latency of ``utils.analyze_cases_with_llm`` on large reports.
+
+Three prompt variants are compared for every report size:
+
+* ``legacy``     – every duplicate name and every case with missing fields
+  inlined (the behaviour before prompt budgeting);
+* ``aggregated`` – lists aggregated into counts plus top-k examples, no budget;
+* ``budgeted``   – aggregated and capped by ``LLM_PROMPT_TOKEN_BUDGET``.
+
+By default the prompts are only measured.  Pass ``--ollama`` to also send
+each prompt to ``OLLAMA_URL`` and measure the generation latency.
+
+    python benchmarks/bench_prompt.py --sizes 1000 10000 --ollama
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import llm_gateway  # noqa: E402
+import prompt_builder  # noqa: E402
+import utils  # noqa: E402
+
+
+def make_cases(n, seed=0):
+    rnd = random.Random(seed)
+    cases = []
+    for i in range(n):
+        status = rnd.choices(["passed", "failed", "broken", "skipped"], [80, 10, 5, 5])[0]
+        case = {
+            "uid": f"uid-{i:06d}",
+            # ~10% of names are duplicated
+            "name": f"test_case_{i if rnd.random() > 0.1 else i // 10}",
+            "status": status,
+            "labels": [{"name": "parentSuite", "value": "Team"}],
+            "steps": [{"name": f"step {j}"} for j in range(3)],
+        }
+        if rnd.random() > 0.3:
+            case["description"] = f"Checks feature {i % 50}"
+        if status in {"failed", "broken"}:
+            case["statusMessage"] = f"AssertionError: expected {rnd.randint(0, 9)}"
+        cases.append(case)
+    return cases
+
+
+def _legacy_items(items, top_k=None, empty="нет"):
+    items = list(dict.fromkeys(items))
+    return ", ".join(str(i) for i in items) if items else empty
+
+
+def _legacy_missing(missing, top_k=None):
+    parts = [f"{uid}: {', '.join(fields)}" for uid, fields in missing]
+    return "; ".join(parts) if parts else "нет"
+
+
+def run_variant(cases, variant, use_ollama):
+    captured = {}
+    real_generate = llm_gateway.generate
+    originals = (
+        prompt_builder.summarize_items,
+        prompt_builder.summarize_missing_fields,
+        prompt_builder.LLM_PROMPT_TOKEN_BUDGET,
+    )
+
+    def capture(prompt, **kwargs):
+        captured["prompt"] = prompt
+        if use_ollama:
+            return real_generate(prompt, **kwargs)
+        return "ok"
+
+    llm_gateway.generate = capture
+    if variant == "legacy":
+        prompt_builder.summarize_items = _legacy_items
+        prompt_builder.summarize_missing_fields = _legacy_missing
+    if variant in {"legacy", "aggregated"}:
+        prompt_builder.LLM_PROMPT_TOKEN_BUDGET = 0
+    try:
+        start = time.perf_counter()
+        utils.analyze_cases_with_llm([cases], "Team")
+        elapsed = time.perf_counter() - start
+    finally:
+        llm_gateway.generate = real_generate
+        (
+            prompt_builder.summarize_items,
+            prompt_builder.summarize_missing_fields,
+            prompt_builder.LLM_PROMPT_TOKEN_BUDGET,
+        ) = originals
+    prompt = captured.get("prompt", "")
+    return {
+        "prompt_chars": len(prompt),
+        "prompt_tokens": prompt_builder.estimate_tokens(prompt),
+        "seconds": round(elapsed, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument(
+        "--ollama", action="store_true", help="Send prompts to OLLAMA_URL"
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        cases = make_cases(size)
+        for variant in ("legacy", "aggregated", "budgeted"):
+            row = {"cases": size, "variant": variant}
+            row.update(run_variant(cases, variant, args.ollama))
+            results.append(row)
+            print(
+                f"{size:>7} cases  {variant:<10} "
+                f"{row['prompt_tokens']:>9} tokens  {row['seconds']:>8.3f}s"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Latency of ``POST /search`` under concurrent load.
+
+The service runs in-process under uvicorn with the fake embedding model;
+``--reports`` synthetic reports of ``--cases`` cases are stored for one team
+in in-memory Qdrant (or a real one with ``--qdrant-host``).  ``--clients``
+threads then send ``--requests`` searches with random queries, status and
+time filters and pages, and p50/p95/p99 latencies are compared with the
+targets, e.g.
+
+    python benchmarks/bench_search.py --cases 5000 --reports 3 --clients 8 --qdrant-host localhost
+
+The exit code is 1 when a target is missed.
+"""
+
+import argparse
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeEmbeddingModel, memory_qdrant  # noqa: E402
+from synthetic import make_cases  # noqa: E402
+
+TEAM = "BenchSearch"
+QUERIES = [
+    "login fails with timeout",
+    "element not found on checkout page",
+    "NullPointerException in payment service",
+    "cart total is wrong",
+    "search returns empty list",
+    "connection refused",
+    "assertion error on profile update",
+    "slow page load",
+]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(args):
+    os.environ["WARMUP_ENABLED"] = "false"
+    if args.qdrant_host:
+        os.environ["QDRANT_HOST"] = args.qdrant_host
+    import uvicorn
+
+    import embedder
+    import main
+    import qdrant_store
+
+    embedder._MODEL = FakeEmbeddingModel()
+    if not args.qdrant_host:
+        client = memory_qdrant()
+        qdrant_store.get_client = lambda: client
+
+    for run in range(args.reports):
+        chunks = make_cases(args.cases, seed=run, team=TEAM, run=run)
+        qdrant_store.save_report_chunks(
+            TEAM, f"search-{run}", chunks, embedder.generate_embeddings(chunks), 1000 + run
+        )
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def make_request(rng, reports):
+    body = {"query": rng.choice(QUERIES), "team": TEAM, "limit": rng.choice([10, 20, 50])}
+    if rng.random() < 0.5:
+        body["statuses"] = rng.choice([["failed", "broken"], ["passed"]])
+    if rng.random() < 0.3:
+        body["time_from"] = 1000 + rng.randrange(reports)
+    if rng.random() < 0.3:
+        body["offset"] = body["limit"] * rng.randrange(1, 4)
+    return body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--reports", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--qdrant-host")
+    parser.add_argument("--p50-ms", type=float, default=50, help="p50 target")
+    parser.add_argument("--p99-ms", type=float, default=250, help="p99 target")
+    args = parser.parse_args()
+
+    server, url = start_service(args)
+    local = threading.local()
+
+    def call(seed):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        body = make_request(random.Random(seed), args.reports)
+        start = time.perf_counter()
+        resp = session.post(f"{url}/search", json=body, timeout=30)
+        elapsed = time.perf_counter() - start
+        resp.raise_for_status()
+        return elapsed
+
+    # Прогрев: соединения, кэш запросов, JIT-пути Qdrant
+    with ThreadPoolExecutor(args.clients) as pool:
+        list(pool.map(call, range(args.clients * 4)))
+        start = time.perf_counter()
+        latencies = np.array(list(pool.map(call, range(args.requests))))
+        wall = time.perf_counter() - start
+    server.should_exit = True
+
+    p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+    print(
+        f"{args.reports}x{args.cases} cases, {args.clients} clients: "
+        f"{args.requests / wall:.0f} req/s, p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms"
+    )
+    missed = [
+        f"{name} {value:.1f} ms > {target:.0f} ms"
+        for name, value, target in (("p50", p50, args.p50_ms), ("p99", p99, args.p99_ms))
+        if value > target
+    ]
+    if missed:
+        print("targets missed: " + ", ".join(missed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Stdlib ``json`` vs :mod:`serialization` (orjson) on service payloads.
+
+Measures parsing of a synthetic Allure report (``fetch_allure_report``),
+encoding of an analysis response (FastAPI's ``jsonable_encoder`` + ``json``
+vs the response class of ``main``) and of the Allure publishing payload.
+When msgspec is installed, decoding the report into typed structs is
+measured too, e.g.
+
+    python benchmarks/bench_serialization.py --cases 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import serialization  # noqa: E402
+from synthetic import make_report  # noqa: E402
+
+
+def _measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def _msgspec_decoder():
+    try:
+        import msgspec
+    except ImportError:
+        return None
+
+    class Time(msgspec.Struct):
+        start: int | None = None
+        stop: int | None = None
+        duration: int | None = None
+
+    class Label(msgspec.Struct):
+        name: str | None = None
+        value: str | None = None
+
+    class Case(msgspec.Struct):
+        uid: str | None = None
+        name: str | None = None
+        fullName: str | None = None
+        status: str | None = None
+        time: Time | None = None
+        labels: list[Label] = []
+        flaky: bool = False
+        description: str | None = None
+        statusMessage: str | None = None
+        statusTrace: str | None = None
+        steps: list = []
+        attachments: list = []
+        parameters: list = []
+
+    return msgspec.json.Decoder(list[Case])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+
+    report = make_report(args.cases)
+    raw = json.dumps(report).encode("utf-8")
+    analysis = [
+        {"rule": "report-info", "message": f"{c['name']}: {c['status']}"} for c in report
+    ]
+    response = {"result": "ok", "summary": "…", "analysis": analysis}
+
+    cases = {
+        "parse report": {
+            "json.loads": lambda: json.loads(raw),
+            "serialization.loads": lambda: serialization.loads(raw),
+        },
+        "render response": {
+            "jsonable_encoder + json.dumps": lambda: json.dumps(
+                jsonable_encoder(response), ensure_ascii=False
+            ).encode("utf-8"),
+            "serialization.dumps": lambda: serialization.dumps(response),
+        },
+        "publish payload": {
+            "json.dumps": lambda: json.dumps(analysis).encode("utf-8"),
+            "serialization.dumps": lambda: serialization.dumps(analysis),
+        },
+    }
+    decoder = _msgspec_decoder()
+    if decoder is not None:
+        cases["parse report"]["msgspec typed structs"] = lambda: decoder.decode(raw)
+
+    print(f"{args.cases} cases, report {len(raw) / 1e6:.1f} MB")
+    for title, variants in cases.items():
+        print(title)
+        baseline = None
+        for name, func in variants.items():
+            seconds, peak = _measure(func, args.repeat)
+            baseline = baseline or seconds
+            print(
+                f"  {name:<32} {seconds * 1000:8.1f} ms  x{baseline / seconds:4.1f}"
+                f"  peak {peak / 1e6:7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
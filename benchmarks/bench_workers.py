@@ -0,0 +1,186 @@
+"""Throughput and memory of ``serve.py`` by number of workers.
+
+For every worker count the service is started with ``serve.py``, waits for
+``/ready``, and then ``--requests`` analyses of ``--cases`` cases are sent
+with ``--concurrency`` parallel clients.  Allure and Ollama are replaced by
+:class:`fakes.FakeServices`; Qdrant must be a real server (``--qdrant-host``)
+because the workers are separate processes.
+
+Modes:
+
+* ``shared``    – one embedding server process, workers use it over a Unix
+  socket (default of ``serve.py`` for more than one worker);
+* ``inprocess`` – every worker loads its own copy of the model;
+* ``fake``      – a shared embedding server with :class:`fakes.FakeEmbeddingModel`,
+  for measuring the rest of the pipeline without a model on disk.
+
+RSS and PSS (proportional set size, which splits shared pages between the
+processes using them) are reported for every process of the service.
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --mode shared --qdrant-host localhost
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeServices  # noqa: E402
+from synthetic import make_report  # noqa: E402
+
+FAKE_SERVER = (
+    "import sys; sys.path[:0] = [{root!r}, {bench!r}];"
+    "import embedding_server, fakes;"
+    "embedding_server.serve({socket!r}, fakes.FakeEmbeddingModel())"
+)
+
+
+def _children(pid):
+    result = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except OSError:
+            continue
+        if ppid == pid:
+            result.append(int(entry))
+            result.extend(_children(int(entry)))
+    return result
+
+
+def _memory(pid):
+    values = {"pid": pid}
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            values["cmd"] = f.read().replace(b"\0", b" ").decode()[:80]
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in {"Rss", "Pss"}:
+                    values[key.lower() + "_mb"] = round(int(rest.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values
+
+
+def _wait_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/ready", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def run(workers, args, services):
+    port = args.port
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, **services.env(), QDRANT_HOST=args.qdrant_host, MPLBACKEND="Agg")
+    env.pop("EMBEDDING_SOCKET", None)
+    cmd = [sys.executable, os.path.join(ROOT, "serve.py"), "--workers", str(workers), "--port", str(port)]
+    helper = None
+    socket_path = f"/tmp/bench-embedder-{os.getpid()}.sock"
+    if args.mode == "fake":
+        helper = subprocess.Popen(
+            [sys.executable, "-c", FAKE_SERVER.format(root=ROOT, bench=BENCH_DIR, socket=socket_path)]
+        )
+        env["EMBEDDING_SOCKET"] = socket_path
+        cmd.append("--no-shared-model")
+    elif args.mode == "inprocess":
+        cmd.append("--no-shared-model")
+    else:
+        cmd += ["--shared-model", "--embedding-socket", socket_path]
+
+    proc = subprocess.Popen(cmd, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not _wait_ready(url, args.ready_timeout):
+            raise SystemExit(f"service with {workers} workers did not become ready")
+        uuids = [f"w{workers}-{i}" for i in range(args.requests)]
+        for i, uuid in enumerate(uuids):
+            team = f"BenchWorkers{i % args.teams}"
+            services.add_report(uuid, make_report(args.cases, team=team, run=i), "flat")
+
+        def call(uuid):
+            start = time.perf_counter()
+            resp = requests.post(f"{url}/uuid/analyze", json={"uuid": uuid}, timeout=600)
+            return resp.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(call, uuids))
+        wall = time.perf_counter() - start
+
+        pids = [proc.pid] + _children(proc.pid)
+        if helper is not None:
+            pids.append(helper.pid)
+        memory = [_memory(pid) for pid in pids]
+        latencies = sorted(r[1] for r in results)
+        return {
+            "workers": workers,
+            "mode": args.mode,
+            "ok": sum(1 for status, _ in results if status == 200),
+            "requests": len(results),
+            "wall_seconds": round(wall, 3),
+            "throughput_rps": round(len(results) / wall, 3),
+            "p50_seconds": round(latencies[len(latencies) // 2], 3),
+            "total_rss_mb": round(sum(m.get("rss_mb", 0) for m in memory), 1),
+            "total_pss_mb": round(sum(m.get("pss_mb", 0) for m in memory), 1),
+            "processes": memory,
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        if helper is not None:
+            helper.terminate()
+            helper.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--mode", choices=["shared", "inprocess", "fake"], default="shared")
+    parser.add_argument("--qdrant-host", default=os.getenv("QDRANT_HOST", "localhost"))
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--teams", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    with FakeServices() as services:
+        for workers in args.workers:
+            result = run(workers, args, services)
+            results.append(result)
+            print(
+                f"workers={workers:<2} mode={args.mode:<9} ok={result['ok']}/{result['requests']} "
+                f"{result['throughput_rps']:.2f} req/s  p50={result['p50_seconds']:.2f}s  "
+                f"RSS={result['total_rss_mb']:.0f}MB  PSS={result['total_pss_mb']:.0f}MB"
+            )
+            for m in result["processes"]:
+                print(f"    pid={m['pid']:<7} rss={m.get('rss_mb', 0):>7}MB pss={m.get('pss_mb', 0):>7}MB  {m.get('cmd', '')}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
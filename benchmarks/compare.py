@@ -0,0 +1,63 @@
+"""Compare two ``bench_pipeline.py`` result files.
+
+Prints per-stage timings side by side and exits with status 1 when any
+stage (or the total, or peak RSS) got slower than ``--threshold`` percent.
+
+    python benchmarks/compare.py benchmarks/results/abc123.json benchmarks/results/def456.json
+"""
+
+import argparse
+import json
+
+# Stages faster than this are too noisy to be compared
+MIN_SECONDS = 0.01
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data, {(r["size"], r["shape"]): r for r in data["runs"]}
+
+
+def _change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) * 100.0 / old
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=20.0)
+    args = parser.parse_args()
+
+    base_meta, base = _load(args.base)
+    new_meta, new = _load(args.new)
+    print(f"base {base_meta['commit']}  ->  new {new_meta['commit']}")
+
+    regressions = []
+    for key in sorted(set(base) & set(new)):
+        old_run, new_run = base[key], new[key]
+        print(f"\n{key[0]} cases, {key[1]}")
+        rows = [("total", old_run["total_seconds"], new_run["total_seconds"])]
+        for stage in old_run["stages"]:
+            if stage in new_run["stages"]:
+                rows.append(
+                    (stage, old_run["stages"][stage]["seconds"], new_run["stages"][stage]["seconds"])
+                )
+        rows.append(("rss_peak_mb", old_run["rss_peak_mb"], new_run["rss_peak_mb"]))
+        for name, old, cur in rows:
+            change = _change(old, cur)
+            flag = ""
+            if change > args.threshold and (name == "rss_peak_mb" or max(old, cur) >= MIN_SECONDS):
+                flag = "  REGRESSION"
+                regressions.append((key, name, change))
+            print(f"  {name:<15} {old:>10.3f} {cur:>10.3f} {change:>+8.1f}%{flag}")
+
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Local stand-ins for the services used by the pipeline.
+
+* :class:`FakeServices` – one threaded HTTP server that plays both the Allure
+  API (report fetch and analysis upload) and Ollama ``/api/generate``;
+* :class:`FakeEmbeddingModel` – deterministic replacement of the
+  sentence-transformers model with the same ``encode`` signature;
+* :func:`memory_qdrant` – an in-process Qdrant client.
+"""
+
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class FakeServices:
+    """Fake Allure API and Ollama on ``127.0.0.1``.
+
+    Reports are registered with :meth:`add_report`; ``flat`` reports are
+    served from ``/test-cases/aggregate``, ``tree`` reports only from
+    ``/suites/json`` so that the fetcher fallback is exercised too.
+    """
+
+    def __init__(self, llm_delay: float = 0.0):
+        self.llm_delay = llm_delay
+        self.reports = {}
+        self.published = {}
+        self.prompts = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """Environment variables pointing the service to the fakes."""
+        return {
+            "ALLURE_API_REPORT_ENDPOINT": f"{self.base_url}/api/report",
+            "ALLURE_API_REPORT_PATH": "/test-cases/aggregate",
+            "ALLURE_API_ANALYSIS_ENDPOINT": f"{self.base_url}/api/analysis/report",
+            "ALLURE_API_USER": "bench",
+            "ALLURE_API_PASSWORD": "bench",
+            "OLLAMA_URL": f"{self.base_url}/api/generate",
+        }
+
+    def add_report(self, uuid, report, shape="flat"):
+        self.reports[uuid] = (shape, json.dumps(report).encode("utf-8"))
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"{}"):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length)
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                # /api/report/<uuid>/<path...>
+                if len(parts) >= 4 and parts[:2] == ["api", "report"]:
+                    uuid, path = parts[2], "/" + "/".join(parts[3:])
+                    shape, body = services.reports.get(uuid, (None, None))
+                    wanted = "/suites/json" if shape == "tree" else "/test-cases/aggregate"
+                    if body is not None and path == wanted:
+                        return self._send(200, body)
+                return self._send(404, b'{"error": "not found"}')
+
+            def do_POST(self):
+                body = self._body()
+                if self.path.startswith("/api/generate"):
+                    payload = json.loads(body or b"{}")
+                    services.prompts.append(payload.get("prompt", ""))
+                    if services.llm_delay:
+                        time.sleep(services.llm_delay)
+                    return self._send(200, b'{"response": "synthetic summary"}')
+                if self.path.startswith("/api/analysis/report/"):
+                    services.published[self.path.rsplit("/", 1)[-1]] = len(body)
+                    return self._send(200, b'{"result": "ok"}')
+                return self._send(404, b'{"error": "not found"}')
+
+        return Handler
+
+
+class FakeEmbeddingModel:
+    """Deterministic embedding model: equal texts get equal vectors.
+
+    Vectors are picked from a fixed random table by the CRC32 of the text, so
+    encoding is cheap and does not dominate the measured stages.
+    """
+
+    def __init__(self, dim: int = 384, table_size: int = 4096, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        table = rng.normal(size=(table_size, dim)).astype(np.float32)
+        self.table = table / np.linalg.norm(table, axis=1, keepdims=True)
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True, **kwargs):
+        idx = np.fromiter(
+            (zlib.crc32(t.encode("utf-8")) for t in texts), dtype=np.uint64, count=len(texts)
+        )
+        return self.table[idx % len(self.table)]
+
+
+def memory_qdrant():
+    """Return an in-process Qdrant client."""
+    import qdrant_client
+
+    return qdrant_client.QdrantClient(":memory:")
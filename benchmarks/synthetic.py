@@ -0,0 +1,100 @@
+"""Synthetic Allure reports for benchmarks.
+
+Reports are generated deterministically from a seed, either as the flat
+list returned by ``/test-cases/aggregate`` or as the suite tree returned by
+``/suites/json``.
+"""
+
+import random
+
+STATUSES = ["passed", "failed", "broken", "skipped"]
+STATUS_WEIGHTS = [85, 8, 4, 3]
+
+_ERRORS = [
+    "AssertionError: expected status 200 but was {n}",
+    "org.openqa.selenium.NoSuchElementException: no such element: #btn-{n}",
+    "TimeoutException: page did not load in {n} ms",
+    "NullPointerException at OrderService.create",
+    "ConnectionError: Max retries exceeded with url /api/v1/items/{n}",
+]
+
+
+def _steps(rnd, depth, failed):
+    steps = []
+    for i in range(rnd.randint(2, 4)):
+        step = {
+            "name": f"step {depth}.{i}",
+            "status": "passed",
+            "time": {"duration": rnd.randint(5, 500)},
+        }
+        if depth < 2 and rnd.random() < 0.3:
+            step["steps"] = _steps(rnd, depth + 1, False)
+        steps.append(step)
+    if failed:
+        steps[-1]["status"] = "failed"
+    return steps
+
+
+def make_case(i, rnd, team="Team", start=1_700_000_000_000, run=0):
+    status = rnd.choices(STATUSES, STATUS_WEIGHTS)[0]
+    duration = rnd.randint(50, 20_000)
+    case_start = start + i * 10
+    case = {
+        "uid": f"{run:03d}-{i:07d}",
+        "name": f"test_{i % 5000}_{i}",
+        "status": status,
+        "time": {"start": case_start, "stop": case_start + duration, "duration": duration},
+        "labels": [
+            {"name": "parentSuite", "value": team},
+            {"name": "suite", "value": f"suite_{i % 50}"},
+            {"name": "owner", "value": f"owner_{i % 7}"},
+            {"name": "host", "value": "ci-runner"},
+        ],
+        "description": f"Checks feature {i % 500} of {team}",
+        "flaky": rnd.random() < 0.02,
+        "steps": _steps(rnd, 0, status in {"failed", "broken"}),
+        "attachments": [],
+    }
+    if status in {"failed", "broken"}:
+        message = rnd.choice(_ERRORS).format(n=rnd.randint(1, 10_000))
+        case["statusMessage"] = message
+        frames = "\n".join(f"\tat com.example.Module{j}.call(Module{j}.java:{j * 7})" for j in range(40))
+        case["statusTrace"] = f"{message}\n{frames}"
+    return case
+
+
+def make_cases(n, seed=0, team="Team", run=0):
+    """Return ``n`` synthetic test cases."""
+    rnd = random.Random(seed * 1_000_003 + run)
+    start = 1_700_000_000_000 + run * 86_400_000
+    return [make_case(i, rnd, team=team, start=start, run=run) for i in range(n)]
+
+
+def to_suites_tree(cases):
+    """Group ``cases`` into the ``/suites/json`` tree shape."""
+    parents = {}
+    for case in cases:
+        labels = {lbl["name"]: lbl["value"] for lbl in case.get("labels", [])}
+        parent = parents.setdefault(labels.get("parentSuite", ""), {})
+        parent.setdefault(labels.get("suite", ""), []).append(dict(case, type="testcase"))
+    return {
+        "name": "suites",
+        "children": [
+            {
+                "name": parent_name,
+                "children": [
+                    {"name": suite_name, "children": leaves}
+                    for suite_name, leaves in suites.items()
+                ],
+            }
+            for parent_name, suites in parents.items()
+        ],
+    }
+
+
+def make_report(n, shape="flat", seed=0, team="Team", run=0):
+    """Return a synthetic report of ``n`` cases in ``shape`` (``flat``/``tree``)."""
+    cases = make_cases(n, seed=seed, team=team, run=run)
+    if shape == "tree":
+        return to_suites_tree(cases)
+    return cases
@@ -1,3 +1,6 @@
+from step_analysis import summarize_steps
+
+
 def chunk_report(report):
     """
     report: list — массив тест-кейсов (реальный Allure отчет)
@@ -7,12 +10,16 @@ def chunk_report(report):
     for case in report:
         chunk = {
             "name": case.get("name"),
+            "fullName": case.get("fullName"),
+            # Различает параметризованные запуски одного теста
+            "historyId": case.get("historyId"),
             "status": case.get("status"),
             "uid": case.get("uid"),
             "duration": case.get("time", {}).get("duration"),
             "labels": case.get("labels", []),
             "description": case.get("description"),
-            "steps": case.get("steps"),
+            # Вместо дерева шагов — компактная сводка (см. step_analysis)
+            "step_summary": summarize_steps(case.get("steps")),
             "attachments": case.get("attachments"),
             "flaky": case.get("flaky", False),
             "statusMessage": case.get("statusMessage"),
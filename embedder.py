@@ -1,17 +1,106 @@
-from sentence_transformers import SentenceTransformer
 import os
+import threading
+from collections import OrderedDict
+import metrics
+
+# Distinct search queries whose vectors are kept
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+# Distinct failure texts whose vectors are kept between analyses
+FAILURE_CACHE_SIZE = int(os.getenv("FAILURE_CACHE_SIZE", 20000))
 
 _MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+def load_local_model():
+    # sentence_transformers (and torch) are imported on first use, so that
+    # importing the service stays fast; see warmup.py for eager loading.
+    from sentence_transformers import SentenceTransformer
+
+    model_path = os.getenv("EMBEDDING_MODEL_PATH")
+    return SentenceTransformer(model_path)
 
 def get_model():
+    """Return the embedding model.
+
+    With ``EMBEDDING_SOCKET`` set the model shared by all workers is used
+    through :class:`embedding_server.RemoteModel`, otherwise it is loaded
+    into this process.
+    """
     global _MODEL
     if _MODEL is None:
-        model_path = os.getenv("EMBEDDING_MODEL_PATH")
-        _MODEL = SentenceTransformer(model_path)
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                metrics.CACHE_REQUESTS.inc(cache="embedding_model", result="miss")
+                socket_path = os.getenv("EMBEDDING_SOCKET")
+                if socket_path:
+                    from embedding_server import RemoteModel
+
+                    _MODEL = RemoteModel(socket_path)
+                else:
+                    _MODEL = load_local_model()
+    else:
+        metrics.CACHE_REQUESTS.inc(cache="embedding_model", result="hit")
     return _MODEL
 
 def generate_embeddings(chunks):
     model = get_model()
     texts = ["passage: " + (chunk.get("description") or chunk.get("name") or "") for chunk in chunks]
     embs = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    metrics.add_size(texts=len(texts))
     return embs
+
+_FAILURE_CACHE = OrderedDict()
+_FAILURE_LOCK = threading.Lock()
+
+def generate_failure_embeddings(cases):
+    """Embed the failure message and trace head of ``cases``.
+
+    Identical failure texts are encoded only once, and the vectors of the
+    last ``FAILURE_CACHE_SIZE`` texts are kept, so re-analysing a report
+    encodes only failures that were not seen yet.
+    """
+    import numpy as np
+
+    from failure_clustering import failure_text
+
+    texts = ["passage: " + failure_text(case) for case in cases]
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return []
+    with _FAILURE_LOCK:
+        cached = {text: _FAILURE_CACHE[text] for text in unique if text in _FAILURE_CACHE}
+        for text in cached:
+            _FAILURE_CACHE.move_to_end(text)
+    missing = [text for text in unique if text not in cached]
+    metrics.CACHE_REQUESTS.inc(len(texts) - len(missing), cache="failure_text", result="hit")
+    metrics.CACHE_REQUESTS.inc(len(missing), cache="failure_text", result="miss")
+    if missing:
+        embs = get_model().encode(missing, convert_to_numpy=True, normalize_embeddings=True)
+        with _FAILURE_LOCK:
+            for text, vector in zip(missing, embs):
+                cached[text] = _FAILURE_CACHE[text] = vector
+                if len(_FAILURE_CACHE) > FAILURE_CACHE_SIZE:
+                    _FAILURE_CACHE.popitem(last=False)
+    return np.stack([cached[text] for text in texts])
+
+_QUERY_CACHE = OrderedDict()
+_QUERY_LOCK = threading.Lock()
+
+def embed_query(text):
+    """Embed a search query (e5 ``query:`` prefix); repeated queries are cached."""
+    text = text.strip()
+    with _QUERY_LOCK:
+        vector = _QUERY_CACHE.get(text)
+        if vector is not None:
+            _QUERY_CACHE.move_to_end(text)
+    if vector is not None:
+        metrics.CACHE_REQUESTS.inc(cache="search_query", result="hit")
+        return vector
+    metrics.CACHE_REQUESTS.inc(cache="search_query", result="miss")
+    embs = get_model().encode(["query: " + text], convert_to_numpy=True, normalize_embeddings=True)
+    vector = [float(x) for x in embs[0]]
+    with _QUERY_LOCK:
+        _QUERY_CACHE[text] = vector
+        if len(_QUERY_CACHE) > QUERY_CACHE_SIZE:
+            _QUERY_CACHE.popitem(last=False)
+    return vector
@@ -0,0 +1,197 @@
+"""Embedding model shared by several service workers over a Unix socket.
+
+Every uvicorn worker is a separate process, and loading the embedding model
+in each of them multiplies its memory.  In multi-worker mode (see
+``serve.py``) the model is loaded once in this server, and the workers use
+:class:`RemoteModel`, which has the ``encode`` interface of
+``SentenceTransformer`` and is picked by :func:`embedder.get_model` when
+``EMBEDDING_SOCKET`` is set.
+
+Protocol: every message is a 4-byte length-prefixed JSON header followed by
+a 4-byte length-prefixed binary payload.  Requests carry the texts in the
+header; responses carry the float32 matrix in the payload.
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "/tmp/rag-embedder.sock"
+_LENGTH = struct.Struct("!I")
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("embedding socket closed")
+        received += n
+    return bytes(buf)
+
+
+def send_message(sock, header: dict, payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(data)) + data + _LENGTH.pack(len(payload)))
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock):
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    header = json.loads(_recv_exact(sock, size))
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    payload = _recv_exact(sock, size) if size else b""
+    return header, payload
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                server.model_ready.wait()
+                with server.encode_lock:
+                    embs = server.model.encode(
+                        header.get("texts", []),
+                        convert_to_numpy=True,
+                        normalize_embeddings=header.get("normalize", True),
+                    )
+                embs = np.ascontiguousarray(embs, dtype=np.float32)
+                send_message(self.request, {"shape": list(embs.shape)}, embs.tobytes())
+            except Exception as e:
+                logger.exception("[EMBEDDER] encode failed")
+                send_message(self.request, {"error": str(e)})
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _Handler)
+        self.model = None
+        self.model_ready = threading.Event()
+        # One encode at a time: the model already uses all cores per call
+        self.encode_lock = threading.Lock()
+
+    def set_model(self, model):
+        self.model = model
+        self.model_ready.set()
+
+
+def serve(socket_path: str, model=None):
+    """Listen on ``socket_path`` and serve ``model`` (the local model by default).
+
+    The socket is bound before the model is loaded, so workers can connect
+    right away; their requests wait until the model is ready.
+    """
+    server = EmbeddingServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    if model is None:
+        import embedder
+
+        model = embedder.load_local_model()
+    server.set_model(model)
+    logger.info("[EMBEDDER] serving model on %s", socket_path)
+    try:
+        thread.join()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def wait_for_socket(socket_path: str, timeout: float = 30.0) -> bool:
+    """Wait until the server accepts connections on ``socket_path``."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+class RemoteModel:
+    """Client of :class:`EmbeddingServer` with ``SentenceTransformer.encode`` semantics.
+
+    Each thread keeps its own connection.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 300.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True, **kwargs):
+        request = {"texts": list(texts), "normalize": normalize_embeddings}
+        for attempt in (1, 2):
+            try:
+                sock = self._connection()
+                send_message(sock, request)
+                header, payload = recv_message(sock)
+                break
+            except TimeoutError:
+                # Сервер может всё ещё кодировать этот батч: повтор удвоил бы работу
+                self._drop_connection()
+                raise
+            except (ConnectionError, OSError):
+                # Повторяем только оборванное соединение (например, после рестарта)
+                self._drop_connection()
+                if attempt == 2:
+                    raise
+        if "error" in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the embedding model over a Unix socket")
+    parser.add_argument(
+        "--socket",
+        default=os.getenv("EMBEDDING_SOCKET") or DEFAULT_SOCKET,
+        help="Socket path (EMBEDDING_SOCKET by default)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Normalized error signatures of failed test cases.
+
+Traces are often hundreds of kilobytes long, and they contain volatile tokens
+(ids, timestamps, memory addresses) that defeat grouping.  A signature is
+built only from the message and the head of the trace, with the volatile
+tokens replaced by placeholders.  Signatures are memoized by the hash of
+their input, so the same trace seen again in the history costs one lookup.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import metrics
+
+# Only this many characters of a message or trace are ever scanned
+TRACE_HEAD_CHARS = 4000
+SIGNATURE_MAX_CHARS = 120
+CACHE_SIZE = 8192
+
+_VOLATILE = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<time>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.I), "<addr>"),
+    (re.compile(r"@[0-9a-f]{6,}\b", re.I), "@<addr>"),
+    (re.compile(r"\b[0-9a-f]{16,}\b", re.I), "<hex>"),
+    (re.compile(r"\d+"), "<n>"),
+]
+_SPACES = re.compile(r"\s+")
+_LOCATOR = re.compile(r"no ?such ?element|element not found", re.I)
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def normalize(text: str) -> str:
+    """Replace volatile tokens in ``text`` with placeholders."""
+    for pattern, repl in _VOLATILE:
+        text = pattern.sub(repl, text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def signature_info(case) -> dict:
+    """Return ``{"signature": str, "locator": bool}`` for ``case``.
+
+    ``signature`` is the normalized first line of the message (or of the
+    trace when the message is empty); ``locator`` tells whether the failure
+    is an element-not-found error.
+    """
+    message = (case.get("statusMessage") or "")[:TRACE_HEAD_CHARS]
+    trace_head = (case.get("statusTrace") or "")[:TRACE_HEAD_CHARS]
+    key = hashlib.blake2b(
+        f"{message}\0{trace_head}".encode("utf-8", "replace"), digest_size=16
+    ).digest()
+    with _lock:
+        info = _cache.get(key)
+        if info is not None:
+            _stats["hits"] += 1
+            _cache.move_to_end(key)
+            return info
+
+    lines = message.splitlines() or trace_head.splitlines()
+    first = lines[0] if lines else ""
+    info = {
+        "signature": normalize(first)[:SIGNATURE_MAX_CHARS],
+        "locator": bool(_LOCATOR.search(message) or _LOCATOR.search(trace_head)),
+    }
+    with _lock:
+        _stats["misses"] += 1
+        _cache[key] = info
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return info
+
+
+def error_signature(case) -> str:
+    """Return the normalized error signature of ``case``."""
+    return signature_info(case)["signature"]
+
+
+def cache_stats() -> dict:
+    """Return signature cache hit/miss counters."""
+    return dict(_stats)
+
+
+@metrics.register_collector
+def _collect_cache():
+    stats = cache_stats()
+    return [
+        (metrics.CACHE_REQUESTS, {"cache": "error_signature", "result": "hit"}, stats["hits"]),
+        (metrics.CACHE_REQUESTS, {"cache": "error_signature", "result": "miss"}, stats["misses"]),
+    ]
@@ -0,0 +1,140 @@
+"""Semantic clustering of failed and broken test cases.
+
+Failures are embedded by the text of their message and the head of their
+trace (see :func:`embedder.generate_failure_embeddings`) and grouped by
+cosine similarity.  Vectors are L2-normalized, so similarity is a plain dot
+product and whole batches are compared with one matrix multiplication.
+"""
+
+import os
+from collections import Counter
+
+import numpy as np
+
+from error_signature import error_signature, normalize
+
+FAILED_STATUSES = {"failed", "broken"}
+# Minimal cosine similarity between a failure and its cluster leader
+FAILURE_CLUSTER_THRESHOLD = float(os.getenv("FAILURE_CLUSTER_THRESHOLD", 0.9))
+# How many clusters are reported to the LLM and to Allure
+FAILURE_CLUSTERS_TOP = int(os.getenv("FAILURE_CLUSTERS_TOP", 5))
+# Only the head of a trace is embedded, the rest rarely changes the meaning
+TRACE_HEAD_CHARS = 1000
+
+
+def failed_cases(cases):
+    """Return cases with ``failed`` or ``broken`` status."""
+    return [
+        c for c in cases if (c.get("status") or "").lower() in FAILED_STATUSES
+    ]
+
+
+def failure_text(case) -> str:
+    """Return the text describing why ``case`` failed.
+
+    Volatile tokens are normalized, so failures differing only by ids or
+    timestamps produce the same text and are embedded once.
+    """
+    msg = (case.get("statusMessage") or "")[:TRACE_HEAD_CHARS]
+    trace = (case.get("statusTrace") or "")[:TRACE_HEAD_CHARS]
+    return normalize(f"{msg}\n{trace}")
+
+
+def cluster_embeddings(vectors, threshold: float | None = None, batch_size: int = 512):
+    """Group ``vectors`` by cosine similarity.
+
+    Greedy leader clustering: every vector joins the most similar existing
+    leader when the similarity reaches ``threshold``, otherwise it becomes a
+    new leader.  Vectors are processed in batches, each batch is compared to
+    all leaders at once and the unassigned rest of the batch to itself.
+
+    The cost is dominated by the batch-to-leaders products, ``O(n * k * d)``
+    for ``k`` clusters, so the worst case is a run where every failure is
+    distinct (see ``benchmarks/bench_clustering.py --worst-case``).
+
+    Returns
+    -------
+    numpy.ndarray
+        Cluster label for each vector; labels are numbered by first
+        appearance.
+    """
+    if threshold is None:
+        threshold = FAILURE_CLUSTER_THRESHOLD
+    X = np.asarray(vectors, dtype=np.float32)
+    n = len(X)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    X = X / norms
+
+    # Лидеры пишутся в заранее выделенный буфер: без копирования на каждом батче
+    leaders = np.empty_like(X)
+    n_leaders = 0
+    for start in range(0, n, batch_size):
+        batch = X[start : start + batch_size]
+        batch_labels = np.full(len(batch), -1, dtype=np.int64)
+        if n_leaders:
+            sims = batch @ leaders[:n_leaders].T
+            best = sims.argmax(axis=1)
+            matched = sims[np.arange(len(batch)), best] >= threshold
+            batch_labels[matched] = best[matched]
+
+        rest = np.flatnonzero(batch_labels < 0)
+        if rest.size:
+            inner = batch[rest] @ batch[rest].T
+            assigned = np.zeros(rest.size, dtype=bool)
+            for j in range(rest.size):
+                if assigned[j]:
+                    continue
+                members = ~assigned & (inner[j] >= threshold)
+                members[j] = True
+                batch_labels[rest[members]] = n_leaders
+                assigned |= members
+                leaders[n_leaders] = batch[rest[j]]
+                n_leaders += 1
+        labels[start : start + len(batch)] = batch_labels
+    return labels
+
+
+def cluster_failures(cases, embeddings, threshold: float | None = None, top_names: int = 3):
+    """Cluster failed ``cases`` by their failure ``embeddings``.
+
+    Returns
+    -------
+    list of dict
+        Clusters sorted by size, each with ``size``, ``message`` (error
+        signature of the leader failure), ``names`` (most frequent test names) and
+        ``statuses``.
+    """
+    if not cases:
+        return []
+    labels = cluster_embeddings(embeddings, threshold)
+    groups = {}
+    for case, label in zip(cases, labels.tolist()):
+        groups.setdefault(label, []).append(case)
+    clusters = []
+    for members in groups.values():
+        names = Counter(c.get("name") for c in members if c.get("name"))
+        clusters.append(
+            {
+                "size": len(members),
+                "message": error_signature(members[0]),
+                "names": [n for n, _ in names.most_common(top_names)],
+                "statuses": dict(
+                    Counter((c.get("status") or "").lower() for c in members)
+                ),
+            }
+        )
+    clusters.sort(key=lambda c: -c["size"])
+    return clusters
+
+
+def format_cluster(cluster) -> str:
+    """Return a one-line description of a cluster."""
+    names = ", ".join(cluster["names"])
+    text = f"x{cluster['size']} {cluster['message'] or 'без сообщения'}"
+    if names:
+        text += f" (тесты: {names})"
+    return text
@@ -0,0 +1,185 @@
+"""Per-test stability analytics over the report history.
+
+Outcomes of the last reports are aligned by :func:`stats_store.load_outcomes`
+into ``tests x reports`` matrices and every metric is computed for all
+tests at once:
+
+* flip rate – share of consecutive runs in which a test switched between
+  passing and failing (skipped runs and reports without the test are
+  ignored);
+* failure streak – failed runs since the last pass;
+* duration regression – z-score of the latest duration against the passed
+  runs before it.
+"""
+
+import os
+
+import numpy as np
+
+import stats_store
+
+# Runs (passed or failed) a test needs before it is judged
+FLAKY_MIN_RUNS = int(os.getenv("FLAKY_MIN_RUNS", 5))
+FLAKY_MIN_FLIP_RATE = float(os.getenv("FLAKY_MIN_FLIP_RATE", 0.2))
+# One switch is a break or a fix, flaky tests switch back and forth
+FLAKY_MIN_FLIPS = int(os.getenv("FLAKY_MIN_FLIPS", 2))
+FAILURE_STREAK_MIN = int(os.getenv("FAILURE_STREAK_MIN", 3))
+DURATION_Z_THRESHOLD = float(os.getenv("DURATION_Z_THRESHOLD", 3))
+# The latest run must also be this many times slower than the mean
+DURATION_MIN_RATIO = float(os.getenv("DURATION_MIN_RATIO", 1.5))
+# How many offenders of each kind are reported
+ANALYTICS_TOP = int(os.getenv("ANALYTICS_TOP", 5))
+
+_PASSED = stats_store.STATUS_CODES["passed"]
+_FAILED = [stats_store.STATUS_CODES[s] for s in stats_store.FAILED_STATUSES]
+
+RULES = {
+    "flaky": ("flaky-tests", "Нестабильные тесты"),
+    "streaks": ("failure-streaks", "Падают подряд"),
+    "slow": ("duration-regressions", "Замедлились"),
+}
+
+
+def compute(status, duration):
+    """Compute stability metrics of every test.
+
+    Parameters
+    ----------
+    status : numpy.ndarray
+        ``tests x reports`` status codes, oldest report first (see
+        :func:`stats_store.load_outcomes`).
+    duration : numpy.ndarray
+        ``tests x reports`` durations in ms, NaN when unknown.
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        Per test: ``runs``, ``failures``, ``flips``, ``flip_rate``,
+        ``streak``, ``duration`` (latest), ``mean_duration`` and
+        ``duration_z`` (NaN without enough history).
+    """
+    tests, reports = status.shape
+    passed = status == _PASSED
+    failed = np.isin(status, _FAILED)
+    ran = passed | failed
+    runs = ran.sum(axis=1)
+    cols = np.arange(reports)
+
+    # Index of the last run up to every report, -1 before the first run
+    last_run = np.maximum.accumulate(np.where(ran, cols, -1), axis=1)
+    prev = last_run[:, :-1]
+    prev_failed = np.take_along_axis(failed, np.maximum(prev, 0), axis=1)
+    flips = (ran[:, 1:] & (prev >= 0) & (failed[:, 1:] != prev_failed)).sum(axis=1)
+
+    last_pass = np.where(passed, cols, -1).max(axis=1, initial=-1)
+    streak = (failed & (cols > last_pass[:, None])).sum(axis=1)
+
+    if reports:
+        latest = np.where(ran[:, -1], duration[:, -1], np.nan)
+        history = np.where(passed[:, :-1], duration[:, :-1], np.nan)
+    else:
+        latest = np.full(tests, np.nan, dtype=np.float32)
+        history = np.empty((tests, 0), dtype=np.float32)
+    known = ~np.isnan(history)
+    count = known.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(known, history, 0).sum(axis=1) / count
+        var = np.where(known, (history - mean[:, None]) ** 2, 0).sum(axis=1) / count
+        # Не меньше 1 мс, иначе стабильные тесты дают бесконечный z
+        z = (latest - mean) / np.maximum(np.sqrt(var), 1.0)
+    z[count < FLAKY_MIN_RUNS - 1] = np.nan
+
+    return {
+        "runs": runs,
+        "failures": failed.sum(axis=1),
+        "flips": flips,
+        "flip_rate": flips / np.maximum(runs - 1, 1),
+        "streak": streak,
+        "duration": latest,
+        "mean_duration": mean,
+        "duration_z": z,
+    }
+
+
+def _top(mask, key, top):
+    idx = np.flatnonzero(mask)
+    return idx[np.argsort(-key[idx], kind="stable")[:top]]
+
+
+def offenders(metrics, top: int | None = None) -> dict:
+    """Pick the worst tests of each kind.
+
+    Returns ``{"flaky": idx, "streaks": idx, "slow": idx}`` with row indices
+    of the metric arrays, worst first.
+    """
+    if top is None:
+        top = ANALYTICS_TOP
+    z = np.nan_to_num(metrics["duration_z"], nan=-np.inf)
+    with np.errstate(invalid="ignore"):
+        slow = (z >= DURATION_Z_THRESHOLD) & (
+            metrics["duration"] >= DURATION_MIN_RATIO * metrics["mean_duration"]
+        )
+    return {
+        "flaky": _top(
+            (metrics["runs"] >= FLAKY_MIN_RUNS)
+            & (metrics["flips"] >= FLAKY_MIN_FLIPS)
+            & (metrics["flip_rate"] >= FLAKY_MIN_FLIP_RATE),
+            metrics["flip_rate"],
+            top,
+        ),
+        "streaks": _top(metrics["streak"] >= FAILURE_STREAK_MIN, metrics["streak"], top),
+        "slow": _top(slow, z, top),
+    }
+
+
+def analyze_team(team: str, depth: int | None = None, until: int | None = None, top: int | None = None) -> dict:
+    """Return the top unstable, constantly failing and slowed-down tests.
+
+    Returns
+    -------
+    dict
+        ``{"reports": n, "flaky": [...], "streaks": [...], "slow": [...]}``;
+        items are dicts with the test name and its metrics.
+    """
+    if depth is None:
+        depth = stats_store.TREND_DEPTH
+    outcomes = stats_store.load_outcomes(team, depth, until=until)
+    metrics = compute(outcomes["status"], outcomes["duration"])
+    picked = offenders(metrics, top)
+    ids = outcomes["test_ids"]
+    names = stats_store.names_for_ids(team, {int(ids[i]) for idx in picked.values() for i in idx})
+
+    def item(i):
+        return {
+            "test": names.get(int(ids[i]), str(ids[i])),
+            "runs": int(metrics["runs"][i]),
+            "failures": int(metrics["failures"][i]),
+            "flip_rate": round(float(metrics["flip_rate"][i]), 3),
+            "streak": int(metrics["streak"][i]),
+            "duration": float(metrics["duration"][i]),
+            "mean_duration": round(float(metrics["mean_duration"][i]), 1),
+            "duration_z": round(float(metrics["duration_z"][i]), 2),
+        }
+
+    result = {kind: [item(i) for i in idx] for kind, idx in picked.items()}
+    result["reports"] = len(outcomes["uuids"])
+    return result
+
+
+def _describe(kind, t) -> str:
+    if kind == "flaky":
+        return f"{t['test']} (смена статуса {t['flip_rate']:.0%}, падений {t['failures']}/{t['runs']})"
+    if kind == "streaks":
+        return f"{t['test']} ({t['streak']} подряд)"
+    return f"{t['test']} ({t['duration'] / 1000:.1f}с против {t['mean_duration'] / 1000:.1f}с, z={t['duration_z']})"
+
+
+def analytics_entries(result) -> list:
+    """Return Allure analysis entries for the non-empty offender lists."""
+    entries = []
+    for kind, (rule, title) in RULES.items():
+        tests = result.get(kind) or []
+        if tests:
+            described = "; ".join(_describe(kind, t) for t in tests)
+            entries.append({"rule": rule, "message": f"{title} за {result['reports']} отчётов: {described}"})
+    return entries
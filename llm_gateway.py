@@ -0,0 +1,241 @@
+"""Single entry point for all Ollama calls.
+
+A local Ollama instance handles only a couple of generations at a time, so
+every LLM request of the service goes through :func:`generate`.  The gateway
+caps the number of concurrent generations, serves waiting callers by
+priority, applies a per-call HTTP timeout and lets callers give up (or be
+cancelled) while they are still waiting in the queue.  A request handler
+can make every call of its request cancellable with :func:`cancel_scope`,
+e.g. when its client disconnects.
+"""
+
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+import metrics
+from prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of generations sent to Ollama at the same time
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 2))
+# Timeout (seconds) of a single HTTP call to Ollama
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 120))
+# How long (seconds) a call may wait for a free slot before giving up
+LLM_QUEUE_DEADLINE = float(os.getenv("LLM_QUEUE_DEADLINE", 60))
+# Branches whose reports are served before the others
+LLM_PRIORITY_BRANCHES = {
+    b.strip()
+    for b in os.getenv("LLM_PRIORITY_BRANCHES", "main,master").split(",")
+    if b.strip()
+}
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+
+_WAITING = None
+_GRANTED = True
+_ABANDONED = False
+
+# Cancel flag of the calls made in the current context, see cancel_scope()
+_CANCEL = contextvars.ContextVar("llm_cancel", default=None)
+
+
+class LLMQueueTimeout(Exception):
+    """Raised when a call waited for a free slot longer than its deadline."""
+
+
+class LLMCancelled(Exception):
+    """Raised when a queued call was cancelled before it was sent."""
+
+
+class PriorityGate:
+    """Counting semaphore that wakes waiters in priority order.
+
+    Lower ``priority`` values are served first; callers with equal priority
+    are served in arrival order.  A released slot is handed over directly to
+    the next waiter, so a newcomer can never overtake the queue.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(int(limit), 1)
+        self._active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority=PRIORITY_NORMAL, timeout=None, cancel=None) -> bool:
+        """Wait for a slot.
+
+        Returns ``False`` when ``timeout`` expires or ``cancel`` (a
+        :class:`threading.Event` or any object with ``is_set()``) is set
+        before the slot was granted.
+        """
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return True
+            # [priority, seq, event, state]
+            entry = [priority, next(self._seq), threading.Event(), _WAITING]
+            heapq.heappush(self._waiters, entry)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 0.1
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.monotonic(), 0))
+            if entry[2].wait(wait):
+                return True
+            expired = deadline is not None and time.monotonic() >= deadline
+            cancelled = cancel is not None and cancel.is_set()
+            if expired or cancelled:
+                with self._lock:
+                    if entry[3] is _GRANTED:
+                        return True
+                    entry[3] = _ABANDONED
+                return False
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                entry = heapq.heappop(self._waiters)
+                if entry[3] is _WAITING:
+                    entry[3] = _GRANTED
+                    entry[2].set()
+                    return
+            self._active -= 1
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for e in self._waiters if e[3] is _WAITING)
+
+
+_GATE = PriorityGate(LLM_MAX_CONCURRENCY)
+
+# Keep-alive connections to Ollama; the gate bounds concurrent calls, so the
+# pool never needs more than LLM_MAX_CONCURRENCY connections.
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session():
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=max(LLM_MAX_CONCURRENCY, 1)
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _SESSION = session
+    return _SESSION
+
+
+LLM_QUEUE_WAIT = metrics.histogram(
+    "rag_llm_queue_wait_seconds", "Time LLM calls waited for a free slot.", ("outcome",)
+)
+
+
+@metrics.register_collector
+def _collect_queue():
+    return [
+        (metrics.QUEUE_DEPTH, {"queue": "llm"}, _GATE.queue_depth),
+        (metrics.QUEUE_ACTIVE, {"queue": "llm"}, _GATE.active),
+    ]
+
+
+@contextmanager
+def cancel_scope(cancel):
+    """Use ``cancel`` for the :func:`generate` calls of the block without one."""
+    token = _CANCEL.set(cancel)
+    try:
+        yield
+    finally:
+        _CANCEL.reset(token)
+
+
+def priority_for_branch(branch: str | None) -> int:
+    """Return the queue priority for a report built from ``branch``."""
+    if branch and branch in LLM_PRIORITY_BRANCHES:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+def generate(
+    prompt: str,
+    priority: int = PRIORITY_NORMAL,
+    timeout: float | None = None,
+    queue_deadline: float | None = None,
+    cancel=None,
+) -> str:
+    """Send ``prompt`` to Ollama and return the generated text.
+
+    Parameters
+    ----------
+    prompt : str
+        Prompt text.
+    priority : int, optional
+        Queue priority, lower is served first (see :data:`PRIORITY_HIGH`).
+    timeout : float, optional
+        HTTP timeout of the call, defaults to :data:`LLM_TIMEOUT`.
+    queue_deadline : float, optional
+        Maximum time to wait for a free slot, defaults to
+        :data:`LLM_QUEUE_DEADLINE`.
+    cancel : threading.Event, optional
+        When set while the call is still queued, the call is dropped.
+        Defaults to the flag of the enclosing :func:`cancel_scope`.
+
+    Raises
+    ------
+    LLMQueueTimeout
+        If no slot became free before ``queue_deadline``.
+    LLMCancelled
+        If ``cancel`` was set while waiting.
+    """
+    ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+    llm_model = os.getenv("LLM_MODEL", "gemma3:4b")
+    if queue_deadline is None:
+        queue_deadline = LLM_QUEUE_DEADLINE
+    if cancel is None:
+        cancel = _CANCEL.get()
+
+    queued_at = time.monotonic()
+    acquired = _GATE.acquire(priority, timeout=queue_deadline, cancel=cancel)
+    waited = time.monotonic() - queued_at
+    if not acquired:
+        if cancel is not None and cancel.is_set():
+            LLM_QUEUE_WAIT.observe(waited, outcome="cancelled")
+            raise LLMCancelled("LLM call cancelled while queued")
+        LLM_QUEUE_WAIT.observe(waited, outcome="timeout")
+        raise LLMQueueTimeout(
+            f"LLM queue wait exceeded {queue_deadline:.0f}s "
+            f"(queue depth {_GATE.queue_depth})"
+        )
+    try:
+        LLM_QUEUE_WAIT.observe(waited, outcome="acquired")
+        metrics.add_size(prompt_tokens=estimate_tokens(prompt))
+        logger.debug("[LLM] slot acquired after %.2fs (priority=%s)", waited, priority)
+        payload = {"model": llm_model, "prompt": prompt, "stream": False}
+        response = _session().post(
+            ollama_url, json=payload, timeout=timeout or LLM_TIMEOUT
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result.get("response", "").strip() or result.get("message", "")
+    finally:
+        _GATE.release()
@@ -1,18 +1,46 @@
 import os
 import logging
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager
+import anyio.from_thread
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from qdrant_store import (
-    save_report_chunks,
+    count_report_points,
+    delete_cases,
+    get_case_vectors,
+    save_reports_chunks,
     get_prev_report_chunks,
     maintain_last_n_reports,
+    search_cases,
 )
 from report_fetcher import fetch_allure_report
 from chunker import chunk_report
-from embedder import generate_embeddings
+from embedder import embed_query, generate_embeddings, generate_failure_embeddings
+from failure_clustering import (
+    FAILURE_CLUSTERS_TOP,
+    cluster_failures,
+    failed_cases,
+    format_cluster,
+)
 from plotter import plot_trends_for_reports
 from report_summary import format_reports_summary
 import utils
+import llm_gateway
+import stats_store
+import flakiness
+import admission
+import analyzer
+import metrics
+import profiling
+import report_delta
+import report_snapshot
+import serialization
+import warmup
+from regression import classify_failures, regression_entries
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -22,100 +50,412 @@ load_dotenv()
 # How many reports should be kept and compared (current + previous ones)
 REPORTS_HISTORY_DEPTH = int(os.getenv("REPORTS_HISTORY_DEPTH", 3))
 
-app = FastAPI()
+# Batch analysis: parallel fetches/analyses and the maximal number of uuids
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+BATCH_MAX_UUIDS = int(os.getenv("BATCH_MAX_UUIDS", 200))
+
+# Search: the largest page and the payload fields returned by default
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", 100))
+SEARCH_DEFAULT_FIELDS = [
+    "uid",
+    "name",
+    "status",
+    "statusMessage",
+    "duration",
+    "report_uuid",
+    "timestamp",
+]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# How often (seconds) a queued LLM call checks that its client is still there
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", 1))
+# Status of a request dropped because its client disconnected (nginx convention)
+CLIENT_CLOSED_REQUEST = 499
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Модель, Qdrant и matplotlib прогреваются в фоне: health-check `/`
+    # доступен сразу, готовность компонентов показывает `/ready`.
+    warmup.start_warmup()
+    yield
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by :mod:`serialization` (orjson)."""
+
+    def render(self, content) -> bytes:
+        return serialization.dumps(content)
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 
 class AnalyzeRequest(BaseModel):
     uuid: str
+    # Ветка, из которой собран отчёт: main/master получают приоритет у LLM
+    branch: str | None = None
+    # Вернуть в ответе тайминги этапов анализа
+    debug: bool = False
+    # false — взять сохранённый снимок из reports/ вместо запроса в Allure
+    refresh: bool = True
+
+
+class BatchAnalyzeRequest(BaseModel):
+    uuids: list[str]
+    branch: str | None = None
+    refresh: bool = True
+
 
+class TeamAnalyzeRequest(BaseModel):
+    team: str
+    branch: str | None = None
 
+
+class SearchRequest(BaseModel):
+    query: str = Field(min_length=1)
+    team: str
+    statuses: list[str] | None = None
+    report_uuids: list[str] | None = None
+    # Границы времени отчёта (unix-время, включительно)
+    time_from: int | None = None
+    time_to: int | None = None
+    limit: int = Field(default=10, ge=1, le=SEARCH_MAX_LIMIT)
+    offset: int = Field(default=0, ge=0)
+    # Поля payload в ответе; по умолчанию без тяжёлых steps/statusTrace
+    fields: list[str] | None = None
+
+
+class _ClientDisconnect:
+    """Cancel flag of :mod:`llm_gateway` that is set once the client has gone.
+
+    ``is_set`` is polled by the thread waiting in the LLM queue, which is the
+    worker thread of the request, so the event loop is asked about the
+    connection through :func:`anyio.from_thread.run`.
+    """
+
+    def __init__(self, request: Request):
+        self._request = request
+        self._disconnected = False
+        self._next_check = 0.0
+
+    def is_set(self) -> bool:
+        now = time.monotonic()
+        if not self._disconnected and now >= self._next_check:
+            self._next_check = now + DISCONNECT_POLL_INTERVAL
+            try:
+                self._disconnected = anyio.from_thread.run(self._request.is_disconnected)
+            except RuntimeError:
+                # Вне рабочего потока anyio (например, в тестах) не проверяем
+                pass
+        return self._disconnected
+
+
+# Обработчик синхронный: FastAPI выполняет его в пуле потоков, поэтому
+# одновременные анализы не блокируют event loop и честно делят слоты LLM.
 @app.post("/uuid/analyze")
-async def analyze_uuid(req: AnalyzeRequest):
+def analyze_uuid(
+    req: AnalyzeRequest,
+    # None при прямом вызове (бенчмарки): отмена по разрыву не отслеживается
+    request: Request = None,
+    x_profile: str | None = Header(default=None, alias=profiling.PROFILE_HEADER),
+):
     uuid = req.uuid
-    try:
-        # 1. Получить Allure-отчёт (JSON) и время его получения
-        report, timestamp = fetch_allure_report(uuid)
+    profiled = profiling.should_profile(x_profile)
+    with metrics.collect_timings() as timings, profiling.profile_run(
+        uuid, profiled
+    ) as profile:
+        try:
+            # Ушедший клиент снимает свой вызов LLM из очереди
+            cancel = _ClientDisconnect(request) if request is not None else None
+            with llm_gateway.cancel_scope(cancel):
+                result = _analyze(req)
+        except admission.AdmissionRejected as e:
+            raise HTTPException(
+                status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+            )
+        except llm_gateway.LLMCancelled as e:
+            logger.info("[LLM] %s: client disconnected, analysis dropped", uuid)
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+        except Exception as e:
+            logger.exception("Unhandled exception while processing UUID %s", uuid)
+            raise HTTPException(status_code=500, detail=str(e))
+    if req.debug:
+        result["timings"] = timings
+    if profile and profile.get("path"):
+        result["profile"] = profile["path"]
+    # Готовый ответ минует jsonable_encoder FastAPI, это заметно на больших analysis
+    return FastJSONResponse(result)
+
+
+def _analyze(req: AnalyzeRequest):
+    uuid = req.uuid
+    # 1-2. Получаем отчёт, чанки и имя команды
+    item = _load_report(uuid, refresh=req.refresh)
+    team_name = item["team"]
+    # 2c. Допуск в конвейер: лимит на команду и справедливая очередь по стоимости
+    with admission.admit(team_name, _admission_cost([item])):
+        return _analyze_admitted(item, req.branch)
+
+
+def _analyze_admitted(item, branch):
+    """Run the pipeline of a loaded report inside its admission slot."""
+    uuid, chunks, team_name = item["uuid"], item["chunks"], item["team"]
+    # 2a. Агрегаты отчёта для длинных трендов
+    _record_stats(item)
+
+    # 3. Генерируем эмбеддинги (при повторном анализе — только изменившихся
+    #    кейсов) и кластеризуем падения по сообщению и трейсу
+    _embed_batch([item])
+    failures = failed_cases(chunks)
+    # 4. Сохраняем новые и изменённые чанки в Qdrant, удалённые удаляем
+    _store_reports(team_name, [item])
+    # 5. Чистим старые отчёты в коллекции
+    with metrics.span("retention"):
+        maintain_last_n_reports(team_name, n=REPORTS_HISTORY_DEPTH, current_uuid=uuid)
+    # 6. Получаем чанки из предыдущих отчётов (от старого к новому!)
+    prev_limit = max(REPORTS_HISTORY_DEPTH - 1, 0)
+    with metrics.span("history") as sp:
+        prev_reports = get_prev_report_chunks(
+            team_name, exclude_uuid=uuid, limit=prev_limit
+        )
+        sp["chunks"] = sum(len(d.get("chunks", [])) for d in prev_reports.values())
+    # 6a. Новые / повторяющиеся / исправленные падения относительно истории
+    with metrics.span("regression", cases=len(failures)):
+        regressions = classify_failures(team_name, chunks, item["embeddings"], prev_reports)
+
+    return _summarize_and_publish(item, prev_reports, regressions, branch)
+
+
+def _admission_cost(items):
+    """Admission cost of ``items``, estimated from the cases to embed."""
+    cost = 0
+    for item in items:
+        delta = item["delta"]
+        cases = len(item["chunks"]) if delta is None else len(delta["added"] | delta["changed"])
+        cost += admission.estimate_cost(cases)
+    return cost
+
+
+def _load_report(uuid: str, refresh: bool = True) -> dict:
+    """Fetch and chunk the report ``uuid``."""
+    # 1. Получить Allure-отчёт (JSON) и время его получения
+    with metrics.span("fetch") as sp:
+        report, timestamp = fetch_allure_report(uuid, refresh=refresh)
         if not isinstance(report, list):
             raise HTTPException(
                 status_code=400, detail="Report JSON must be a list of test-cases"
             )
-        # 2. Получаем чанки и имя команды
+        sp["cases"] = len(report)
+    # 2. Получаем чанки и имя команды
+    with metrics.span("chunk") as sp:
         chunks, team_name = chunk_report(report)
         if not team_name:
             team_name = "default_team"
+        sp["chunks"] = len(chunks)
+    item = {
+        "uuid": uuid,
+        "report": report,
+        "timestamp": timestamp,
+        "chunks": chunks,
+        "team": team_name,
+    }
+    # 2b. Что изменилось с прошлого анализа этого отчёта
+    with metrics.span("delta", cases=len(report)):
+        _diff_with_last_analysis(item)
+    return item
 
-        # 3. Генерируем эмбеддинги
-        embeddings = generate_embeddings(chunks)
-        # 4. Сохраняем чанки и эмбеддинги в Qdrant
-        save_report_chunks(team_name, uuid, chunks, embeddings, timestamp)
-        # 5. Чистим старые отчёты в коллекции
-        maintain_last_n_reports(team_name, n=REPORTS_HISTORY_DEPTH, current_uuid=uuid)
-        # 6. Получаем чанки из предыдущих отчётов (от старого к новому!)
-        prev_limit = max(REPORTS_HISTORY_DEPTH - 1, 0)
-        prev_reports = get_prev_report_chunks(
-            team_name, exclude_uuid=uuid, limit=prev_limit
+
+def _diff_with_last_analysis(item):
+    """Set ``item["delta"]`` against the last analysis of the same report.
+
+    ``delta`` stays ``None`` (full analysis) without a stored index, when the
+    team changed, when Qdrant does not hold all cases of the last analysis
+    any more (e.g. removed by retention) or when the cases cannot be hashed.
+    """
+    item["delta"] = None
+    try:
+        item["index"] = report_delta.case_index(item["chunks"])
+    except Exception as e:
+        # Пустой индекс не совпадёт с точками в Qdrant: следующий анализ тоже полный
+        logger.warning("[DELTA] %s: full analysis, cannot hash cases: %s", item["uuid"], e)
+        item["index"] = {}
+        return
+    if not report_snapshot.REPORT_SNAPSHOT_ENABLED:
+        return
+    try:
+        previous = report_snapshot.load_index(item["uuid"])
+        if not previous or previous.get("team") != item["team"]:
+            return
+        if count_report_points(item["team"], item["uuid"]) != len(previous["cases"]):
+            return
+    except Exception as e:
+        logger.warning("[DELTA] %s: full analysis, no usable index: %s", item["uuid"], e)
+        return
+    delta = report_delta.diff(previous["cases"], item["index"])
+    item["delta"] = delta
+    # Перезапуски не двигают отчёт в истории команды
+    item["timestamp"] = previous["timestamp"]
+    logger.info(
+        "[DELTA] %s: %s added, %s changed, %s removed, %s unchanged",
+        item["uuid"],
+        *(len(delta[k]) for k in ("added", "changed", "removed", "unchanged")),
+    )
+
+
+def _plan_embeddings(item):
+    """Return chunk positions to embed and store, and reused vectors by position.
+
+    For a re-analysed report only added and changed cases are embedded;
+    vectors of unchanged failures (needed for regression detection) are read
+    back from Qdrant.
+    """
+    chunks, delta = item["chunks"], item["delta"]
+    if delta is None:
+        return list(range(len(chunks))), {}
+    todo = delta["added"] | delta["changed"]
+    failed = {id(c) for c in failed_cases(chunks)}
+    positions, wanted = [], {}
+    for i, chunk in enumerate(chunks):
+        uid = report_delta.case_uid(chunk)
+        if uid in todo:
+            positions.append(i)
+        elif id(chunk) in failed:
+            wanted[uid] = i
+    with metrics.span("reuse_vectors", cases=len(wanted)):
+        vectors = get_case_vectors(item["team"], item["uuid"], wanted)
+    # Точку без вектора пересчитываем и записываем заново
+    positions.extend(i for uid, i in wanted.items() if uid not in vectors)
+    positions.sort()
+    return positions, {wanted[uid]: vector for uid, vector in vectors.items()}
+
+
+def _store_reports(team_name, items):
+    """Upsert the embedded cases of ``items``, delete removed ones, save indexes."""
+    with metrics.span("upsert", chunks=sum(len(item["stored"]) for item in items)):
+        save_reports_chunks(
+            team_name,
+            [
+                (
+                    item["uuid"],
+                    [item["chunks"][i] for i in item["stored"]],
+                    item["stored_embeddings"],
+                    item["timestamp"],
+                )
+                for item in items
+            ],
         )
+        for item in items:
+            if item["delta"] is not None:
+                delete_cases(team_name, item["uuid"], item["delta"]["removed"])
+    if not report_snapshot.REPORT_SNAPSHOT_ENABLED:
+        return
+    for item in items:
+        try:
+            report_snapshot.save_index(
+                item["uuid"],
+                {"team": team_name, "timestamp": item["timestamp"], "cases": item["index"]},
+            )
+        except Exception as e:
+            logger.warning("[DELTA] failed to save the index of %s: %s", item["uuid"], e)
+
+
+def _record_stats(item):
+    with metrics.span("stats", cases=len(item["report"])):
+        stats_store.record_report(
+            item["team"], item["uuid"], item["timestamp"], item["report"]
+        )
+
+
+def _summarize_and_publish(item, prev_reports, regressions, branch):
+    uuid, report, team_name = item["uuid"], item["report"], item["team"]
+    timestamp, failure_clusters = item["timestamp"], item["failure_clusters"]
+    # 7. Собираем для plotter: 2 prev + текущий
+    all_reports = []
+    all_uuids = []
+    all_teams = []
+    all_timestamps = []
+    # prev_reports — это dict {uuid: {"timestamp": ts, "chunks": [...]}}
+    for report_uuid, data in prev_reports.items():
+        chunks = data.get("chunks", [])
+        ts = int(data.get("timestamp", 0))
+        if chunks:
+            all_reports.append(chunks)
+            all_uuids.append(report_uuid)
+            all_timestamps.append(ts)
+            # Название команды из labels первого кейса
+            team = None
+            if isinstance(chunks[0], dict) and chunks[0].get("labels"):
+                for lbl in chunks[0]["labels"]:
+                    if lbl.get("name") == "parentSuite":
+                        team = lbl.get("value")
+                        break
+            all_teams.append(team or "")
+    # Добавляем текущий отчёт
+    all_reports.append(report)
+    all_uuids.append(uuid)
+    all_teams.append(team_name)
+    all_timestamps.append(timestamp)
+
+    # Оставляем только последние REPORTS_HISTORY_DEPTH (если вдруг больше)
+    if len(all_reports) > REPORTS_HISTORY_DEPTH:
+        all_reports = all_reports[-REPORTS_HISTORY_DEPTH:]
+        all_uuids = all_uuids[-REPORTS_HISTORY_DEPTH:]
+        all_teams = all_teams[-REPORTS_HISTORY_DEPTH:]
+        all_timestamps = all_timestamps[-REPORTS_HISTORY_DEPTH:]
+    total_cases = sum(len(rep) for rep in all_reports)
 
-        # 7. Собираем для plotter: 2 prev + текущий
-        all_reports = []
-        all_uuids = []
-        all_teams = []
-        all_timestamps = []
-        # prev_reports — это dict {uuid: {"timestamp": ts, "chunks": [...]}}
-        for report_uuid, data in prev_reports.items():
-            chunks = data.get("chunks", [])
-            ts = int(data.get("timestamp", 0))
-            if chunks:
-                all_reports.append(chunks)
-                all_uuids.append(report_uuid)
-                all_timestamps.append(ts)
-                # Название команды из labels первого кейса
-                team = None
-                if isinstance(chunks[0], dict) and chunks[0].get("labels"):
-                    for lbl in chunks[0]["labels"]:
-                        if lbl.get("name") == "parentSuite":
-                            team = lbl.get("value")
-                            break
-                all_teams.append(team or "")
-        # Добавляем текущий отчёт
-        all_reports.append(report)
-        all_uuids.append(uuid)
-        all_teams.append(team_name)
-        all_timestamps.append(timestamp)
-
-        # Оставляем только последние REPORTS_HISTORY_DEPTH (если вдруг больше)
-        if len(all_reports) > REPORTS_HISTORY_DEPTH:
-            all_reports = all_reports[-REPORTS_HISTORY_DEPTH:]
-            all_uuids = all_uuids[-REPORTS_HISTORY_DEPTH:]
-            all_teams = all_teams[-REPORTS_HISTORY_DEPTH:]
-            all_timestamps = all_timestamps[-REPORTS_HISTORY_DEPTH:]
-
-        # 8. Генерируем сводку по отчетам и тренды
+    # 8. Генерируем сводку по отчетам и тренды
+    with metrics.span("summary", cases=total_cases):
         report_info = format_reports_summary(
             all_reports, color=True, timestamps=all_timestamps
         )
         report_info_plain = format_reports_summary(
             all_reports, color=False, timestamps=all_timestamps
         )
-        img_path = plot_trends_for_reports(all_reports, all_uuids, all_teams, team_name)
-
-        # 9. Формируем текстовую аналитику
-        # Тренд в виде строки для LLM (пример: passed=12, failed=2,... на каждый отчёт)
-        trend_text = "\n".join(
-            [
-                f"{i+1}-й: passed={sum(1 for x in rep if (x.get('status') or '').lower() == 'passed')}, "
-                f"failed={sum(1 for x in rep if (x.get('status') or '').lower() == 'failed')}, "
-                f"broken={sum(1 for x in rep if (x.get('status') or '').lower() == 'broken')}, "
-                f"skipped={sum(1 for x in rep if (x.get('status') or '').lower() == 'skipped')}"
-                for i, rep in enumerate(all_reports)
-            ]
+    # 8a. Длинная история команды из stats_store (O(отчётов), без сырых чанков)
+    with metrics.span("trend") as sp:
+        history = stats_store.report_history(
+            team_name, stats_store.TREND_DEPTH, until=timestamp
+        )
+        sp["reports"] = len(history)
+    # 8b. Нестабильные, падающие подряд и замедлившиеся тесты
+    with metrics.span("test_analytics") as sp:
+        stability = flakiness.analyze_team(
+            team_name, stats_store.TREND_DEPTH, until=timestamp
+        )
+        stability_entries = flakiness.analytics_entries(stability)
+        sp["reports"] = stability["reports"]
+    with metrics.span("plot", cases=total_cases):
+        img_path = plot_trends_for_reports(
+            all_reports, all_uuids, all_teams, team_name, history=history
         )
 
+    # 9. Формируем текстовую аналитику
+    # Тренд в виде строки для LLM (пример: passed=12, failed=2,... на каждый отчёт)
+    trend_text = stats_store.format_trend(history)
+    for entry in stability_entries:
+        trend_text += f"\n{entry['message']}"
+
+    with metrics.span("llm", cases=total_cases):
         summary, rules, trend_img_path = utils.analyze_cases_with_llm(
-            all_reports, team_name, trend_text, img_path
+            all_reports,
+            team_name,
+            trend_text,
+            img_path,
+            priority=llm_gateway.priority_for_branch(branch),
+            failure_clusters=failure_clusters,
         )
-        analysis_entries = [{"rule": rule, "message": msg} for rule, msg in rules]
-        report_lines = report_info_plain.splitlines()
+    analysis_entries = [{"rule": rule, "message": msg} for rule, msg in rules]
+    analysis_entries += [
+        {"rule": "failure-cluster", "message": format_cluster(c)}
+        for c in failure_clusters[:FAILURE_CLUSTERS_TOP]
+    ]
+    analysis_entries += regression_entries(regressions)
+    analysis_entries += stability_entries
+    report_lines = report_info_plain.splitlines()
+    try:
         with open(trend_img_path, "rb") as img_file:
             image_entry = {"rule": "trend-image", "attachment": img_file}
             analysis = (
@@ -123,21 +463,283 @@ async def analyze_uuid(req: AnalyzeRequest):
                 + [image_entry]
                 + analysis_entries
             )
-            utils.send_analysis_to_allure(
-                uuid, analysis, files={"trend-image": img_file}
-            )
+            with metrics.span("publish", entries=len(analysis)):
+                utils.send_analysis_to_allure(
+                    uuid, analysis, files={"trend-image": img_file}
+                )
+    finally:
+        # График тренда у каждого отчёта свой, после отправки он не нужен
+        try:
+            os.remove(trend_img_path)
+        except OSError:
+            pass
 
-        return {
-            "result": "ok",
-            "report_info": report_info,
-            "summary": summary,
-            "analysis": analysis,
-        }
+    return {
+        "result": "ok",
+        "report_info": report_info,
+        "summary": summary,
+        "analysis": analysis,
+    }
+
+
+@app.post("/uuids/analyze")
+def analyze_uuids(req: BatchAnalyzeRequest):
+    """Analyse several reports; results are streamed as NDJSON per uuid."""
+    uuids = list(dict.fromkeys(req.uuids))
+    if len(uuids) > BATCH_MAX_UUIDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {BATCH_MAX_UUIDS} uuids per request"
+        )
+    return StreamingResponse(
+        _analyze_batch(uuids, req.branch, req.refresh),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/team/analyze")
+def analyze_team_reports(req: TeamAnalyzeRequest, request: Request = None):
+    """Compare the last recorded reports of a team from stored aggregates only."""
+    try:
+        cancel = _ClientDisconnect(request) if request is not None else None
+        with admission.admit(req.team, admission.estimate_cost(0)), llm_gateway.cancel_scope(
+            cancel
+        ):
+            with metrics.span("llm"):
+                analysis = analyzer.analyze_team(
+                    req.team, priority=llm_gateway.priority_for_branch(req.branch)
+                )
+    except admission.AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
+    except llm_gateway.LLMCancelled as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
     except Exception as e:
-        logger.exception("Unhandled exception while processing UUID %s", uuid)
+        logger.exception("Team analysis failed for %s", req.team)
         raise HTTPException(status_code=500, detail=str(e))
+    if not analysis:
+        raise HTTPException(status_code=404, detail=f"No reports recorded for team {req.team!r}")
+    return FastJSONResponse({"team": req.team, "analysis": analysis})
+
+
+def _ndjson(record: dict) -> bytes:
+    return serialization.dumps(record) + b"\n"
+
+
+def _batch_error(uuid: str, e: Exception) -> bytes:
+    logger.error("[BATCH] %s failed: %s", uuid, e)
+    record = {"uuid": uuid, "result": "error", "detail": getattr(e, "detail", str(e))}
+    if isinstance(e, admission.AdmissionRejected):
+        record["retry_after"] = e.retry_after
+    return _ndjson(record)
+
+
+def _batch_result(uuid: str, result: dict) -> bytes:
+    # Вложение с графиком уже отправлено в Allure, в поток идут только тексты
+    analysis = [
+        {k: v for k, v in entry.items() if k != "attachment"}
+        for entry in result["analysis"]
+    ]
+    return _ndjson({"uuid": uuid, **result, "analysis": analysis})
+
+
+def _analyze_batch(uuids, branch, refresh=True):
+    """Analyse ``uuids`` sharing the work that does not depend on one report.
+
+    Reports are fetched concurrently.  Every team then takes one admission
+    slot (see :mod:`admission`) for its reports, whose chunks and failures
+    are embedded together, and Qdrant writes and history lookups are done
+    once per team.  The per-report tail (summary, plot, LLM, publishing)
+    runs concurrently, inside the slot of its team.  Yields one NDJSON line
+    per uuid as soon as it is done.
+    """
+    order = {uuid: i for i, uuid in enumerate(uuids)}
+    workers = max(BATCH_CONCURRENCY, 1)
+    # Хвосты идут в отдельном пуле: задачи команд ждут их, не занимая их потоки
+    with ThreadPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(
+        max_workers=workers
+    ) as tails:
+        # 1-2. Параллельно скачиваем и режем отчёты
+        items = []
+        futures = {pool.submit(_load_report, uuid, refresh): uuid for uuid in uuids}
+        for future in as_completed(futures):
+            try:
+                items.append(future.result())
+            except Exception as e:
+                yield _batch_error(futures[future], e)
+        items.sort(key=lambda item: order[item["uuid"]])
+        if not items:
+            return
+
+        # 3-10. Допуск, общие батчи эмбеддингов, запись, история и регрессии —
+        #       один раз на команду, затем хвост по каждому отчёту
+        teams = {}
+        for item in items:
+            teams.setdefault(item["team"], []).append(item)
+        results = queue.SimpleQueue()
+        for team, team_items in teams.items():
+            pool.submit(_analyze_team, team, team_items, branch, tails, results.put)
+        for _ in items:
+            yield results.get()
+
+
+def _analyze_team(team_name, items, branch, tails, emit):
+    """Analyse the reports of one team of a batch in one admission slot.
+
+    The slot is held until the last report of the team is published, so the
+    LLM calls and publishing of a large batch count against the team's
+    limits as well.  Tails run on the ``tails`` executor; every report
+    passes exactly one NDJSON line to ``emit``.
+    """
+    pending = {item["uuid"] for item in items}
+    try:
+        with admission.admit(team_name, _admission_cost(items)):
+            _embed_batch(items)
+            futures = {
+                tails.submit(
+                    _summarize_and_publish, item, prev_reports, regressions, branch
+                ): item["uuid"]
+                for item, prev_reports, regressions in _process_team(team_name, items)
+            }
+            for future in as_completed(futures):
+                uuid = futures[future]
+                try:
+                    record = _batch_result(uuid, future.result())
+                except Exception as e:
+                    record = _batch_error(uuid, e)
+                pending.discard(uuid)
+                emit(record)
+    except Exception as e:
+        for item in items:
+            if item["uuid"] in pending:
+                emit(_batch_error(item["uuid"], e))
+
+
+def _embed_batch(items):
+    """Embed chunks and failures of all ``items`` in shared batches.
+
+    Sets ``stored``/``stored_embeddings`` (cases to upsert) and
+    ``embeddings`` (a vector per chunk; for a re-analysed report only the
+    stored and failed chunks have one) of every item.
+    """
+    plans = [_plan_embeddings(item) for item in items]
+    chunks = [item["chunks"][i] for item, (positions, _) in zip(items, plans) for i in positions]
+    failures_per_item = [failed_cases(item["chunks"]) for item in items]
+    failures = [case for item_failures in failures_per_item for case in item_failures]
+    with metrics.span("embed", chunks=len(chunks)):
+        embeddings = generate_embeddings(chunks) if chunks else []
+    with metrics.span("embed_failures", cases=len(failures)):
+        failure_embeddings = generate_failure_embeddings(failures)
+    start = failure_start = 0
+    for item, item_failures, (positions, reused) in zip(items, failures_per_item, plans):
+        end = start + len(positions)
+        item["stored"] = positions
+        item["stored_embeddings"] = embeddings[start:end]
+        start = end
+        if item["delta"] is None:
+            item["embeddings"] = item["stored_embeddings"]
+        else:
+            vectors = [None] * len(item["chunks"])
+            for i, vector in reused.items():
+                vectors[i] = vector
+            for i, vector in zip(positions, item["stored_embeddings"]):
+                vectors[i] = vector
+            item["embeddings"] = vectors
+        failure_end = failure_start + len(item_failures)
+        with metrics.span("cluster", cases=len(item_failures)):
+            item["failure_clusters"] = cluster_failures(
+                item_failures, failure_embeddings[failure_start:failure_end]
+            )
+        failure_start = failure_end
+
+
+def _process_team(team_name, items):
+    """Store the reports of one team and classify their failures.
+
+    Reports are treated as consecutive runs in the order they were
+    requested: each one sees the stored history plus the reports before it.
+    Returns ``[(item, prev_reports, regressions), ...]``.
+    """
+    prev_limit = max(REPORTS_HISTORY_DEPTH - 1, 0)
+    batch_uuids = {item["uuid"] for item in items}
+    # Время получения у параллельно скачанных отчётов совпадает; порядок
+    # в истории задаёт порядок uuid в запросе.
+    for prev, item in zip(items, items[1:]):
+        if item["delta"] is None:
+            item["timestamp"] = max(item["timestamp"], prev["timestamp"] + 1)
+    for item in items:
+        _record_stats(item)
+    # 6. История команды читается один раз на весь батч
+    with metrics.span("history") as sp:
+        stored = get_prev_report_chunks(
+            team_name, exclude_uuid=None, limit=prev_limit + len(items)
+        )
+        history = {u: d for u, d in stored.items() if u not in batch_uuids}
+        sp["chunks"] = sum(len(d.get("chunks", [])) for d in history.values())
+    # 4. Одна запись в коллекцию команды
+    _store_reports(team_name, items)
+    results = []
+    for item in items:
+        latest = sorted(history.items(), key=lambda x: x[1]["timestamp"], reverse=True)
+        prev_reports = dict(latest[:prev_limit])
+        # 6a. Регрессии относительно истории и предыдущих отчётов батча
+        with metrics.span("regression", cases=len(failed_cases(item["chunks"]))):
+            regressions = classify_failures(
+                team_name, item["chunks"], item["embeddings"], prev_reports
+            )
+        results.append((item, prev_reports, regressions))
+        history[item["uuid"]] = {"timestamp": item["timestamp"], "chunks": item["chunks"]}
+    # 5. Чистим старые отчёты, оставляя последние из батча
+    with metrics.span("retention"):
+        maintain_last_n_reports(
+            team_name, n=REPORTS_HISTORY_DEPTH, current_uuid=items[-1]["uuid"]
+        )
+    return results
+
+
+@app.post("/search")
+def search(req: SearchRequest):
+    """Semantic search over the stored cases of a team."""
+    with metrics.span("search_embed"):
+        vector = embed_query(req.query)
+    with metrics.span("search") as sp:
+        try:
+            hits = search_cases(
+                req.team,
+                vector,
+                statuses=req.statuses,
+                report_uuids=req.report_uuids,
+                time_from=req.time_from,
+                time_to=req.time_to,
+                limit=req.limit,
+                offset=req.offset,
+                fields=req.fields if req.fields is not None else SEARCH_DEFAULT_FIELDS,
+            )
+        except Exception as e:
+            logger.exception("Search failed for team %s", req.team)
+            raise HTTPException(status_code=500, detail=str(e))
+        sp["results"] = len(hits)
+    next_offset = req.offset + req.limit if len(hits) == req.limit else None
+    return FastJSONResponse(
+        {
+            "results": [{"score": h["score"], **h["payload"]} for h in hits],
+            "offset": req.offset,
+            "next_offset": next_offset,
+        }
+    )
+
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 @app.get("/")
 async def root():
     return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    state = warmup.readiness()
+    return FastJSONResponse(state, status_code=200 if state["ready"] else 503)
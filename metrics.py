@@ -0,0 +1,215 @@
+"""Lightweight in-process metrics exposed in Prometheus text format.
+
+Pipeline stages are wrapped in :func:`span`, which feeds the stage latency
+and payload-size histograms and, inside :func:`collect_timings`, also
+records the timings of the current run.  Cache counters and queue depths
+that live in other modules are read at scrape time through
+:func:`register_collector`.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+SIZE_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_run_timings = contextvars.ContextVar("run_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                le = f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+_REGISTRY = []
+_COLLECTORS = []
+
+
+def _register(metric):
+    _REGISTRY.append(metric)
+    return metric
+
+
+def register_collector(func):
+    """Register ``func`` returning metrics to be refreshed on every scrape.
+
+    ``func`` is called by :func:`render` and must return an iterable of
+    ``(metric, labels, value)`` triples for :class:`Gauge`/:class:`Counter`
+    metrics created with :func:`gauge` or :func:`counter`.
+    """
+    _COLLECTORS.append(func)
+    return func
+
+
+def counter(name, help_text, labelnames=()):
+    return _register(Counter(name, help_text, labelnames))
+
+
+def gauge(name, help_text, labelnames=()):
+    return _register(Gauge(name, help_text, labelnames))
+
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+
+STAGE_SECONDS = histogram(
+    "rag_stage_duration_seconds", "Duration of analysis pipeline stages.", ("stage",)
+)
+STAGE_PAYLOAD = histogram(
+    "rag_stage_payload_size",
+    "Payload processed by a stage (cases, chunks, bytes, tokens).",
+    ("stage", "unit"),
+    SIZE_BUCKETS,
+)
+CACHE_REQUESTS = counter(
+    "rag_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result")
+)
+QUEUE_DEPTH = gauge("rag_queue_depth", "Requests waiting in a queue.", ("queue",))
+QUEUE_ACTIVE = gauge("rag_queue_active", "Requests being served from a queue.", ("queue",))
+
+
+@contextmanager
+def span(stage, **sizes):
+    """Time a pipeline stage.
+
+    Yields a dict where payload sizes may be added while the stage runs
+    (``sp["cases"] = len(report)``); they can also be added from nested code
+    with :func:`add_size`.
+    """
+    record = {"stage": stage, **sizes}
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_span.reset(token)
+        record["seconds"] = round(elapsed, 6)
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        for unit, value in record.items():
+            if unit not in {"stage", "seconds"} and isinstance(value, (int, float)):
+                STAGE_PAYLOAD.observe(value, stage=stage, unit=unit)
+        timings = _run_timings.get()
+        if timings is not None:
+            timings.append(record)
+
+
+def add_size(**sizes):
+    """Add payload sizes to the innermost running :func:`span`, if any."""
+    record = _current_span.get()
+    if record is not None:
+        for unit, value in sizes.items():
+            record[unit] = record.get(unit, 0) + value
+
+
+@contextmanager
+def collect_timings():
+    """Collect records of all spans finished inside the block into a list."""
+    timings = []
+    token = _run_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _run_timings.reset(token)
+
+
+def render() -> str:
+    """Return all metrics in Prometheus text exposition format."""
+    for collect in _COLLECTORS:
+        for metric, labels, value in collect():
+            metric.set(value, **labels)
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,126 @@
+"""Move per-team Qdrant collections into the shared multitenant collection.
+
+Every point of a per-team collection is copied with its vector into
+``QDRANT_SHARED_COLLECTION``; the collection name becomes the ``tenant``
+payload value, which is what :func:`qdrant_store.tenant_scope` filters on.
+Point ids are kept, so running the tool again is safe.  Switch the service to
+``QDRANT_COLLECTION_MODE=shared`` after the migration.
+
+    python migrate_collections.py --dry-run
+    python migrate_collections.py --delete-source
+"""
+
+import argparse
+import logging
+
+import qdrant_store
+
+logger = logging.getLogger(__name__)
+
+
+def _vector_size(client, collection):
+    vectors = client.get_collection(collection).config.params.vectors
+    return vectors.size
+
+
+def migrate(client, target, collections=None, batch_size=512, delete_source=False, dry_run=False):
+    """Copy ``collections`` (all but ``target`` by default) into ``target``.
+
+    Returns
+    -------
+    dict
+        ``{tenant: points copied}``.  A source collection is deleted (with
+        ``delete_source``) only when ``target`` holds at least as many points
+        of its tenant.
+    """
+    from qdrant_client.models import FieldCondition, Filter, MatchValue, PointStruct
+
+    if collections is None:
+        collections = sorted(
+            c.name for c in client.get_collections().collections if c.name != target
+        )
+    copied = {}
+    for collection in collections:
+        total = client.count(collection_name=collection, exact=True).count
+        if dry_run:
+            logger.info("[MIGRATE] '%s': %s points (dry run)", collection, total)
+            copied[collection] = total
+            continue
+        qdrant_store.ensure_collection(client, target, _vector_size(client, collection), shared=True)
+        count = 0
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if points:
+                client.upsert(
+                    collection_name=target,
+                    points=[
+                        PointStruct(
+                            id=p.id,
+                            vector=p.vector,
+                            payload={**p.payload, qdrant_store.TENANT_KEY: collection},
+                        )
+                        for p in points
+                    ],
+                )
+                count += len(points)
+            if offset is None:
+                break
+        copied[collection] = count
+        stored = client.count(
+            collection_name=target,
+            count_filter=Filter(
+                must=[FieldCondition(key=qdrant_store.TENANT_KEY, match=MatchValue(value=collection))]
+            ),
+            exact=True,
+        ).count
+        logger.info("[MIGRATE] '%s': %s of %s points copied, %s stored", collection, count, total, stored)
+        if delete_source:
+            if stored >= total:
+                client.delete_collection(collection)
+                logger.info("[MIGRATE] '%s' deleted", collection)
+            else:
+                logger.error("[MIGRATE] '%s' kept: %s of %s points in '%s'", collection, stored, total, target)
+    return copied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Move per-team Qdrant collections into the shared collection",
+    )
+    parser.add_argument("--target", default=qdrant_store.QDRANT_SHARED_COLLECTION)
+    parser.add_argument(
+        "--collection",
+        action="append",
+        dest="collections",
+        help="Collection to migrate (repeatable); all other collections by default",
+    )
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Delete a per-team collection once all its points are in the target",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only count the points")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    copied = migrate(
+        qdrant_store.get_client(),
+        args.target,
+        collections=args.collections,
+        batch_size=args.batch_size,
+        delete_source=args.delete_source,
+        dry_run=args.dry_run,
+    )
+    print(f"{len(copied)} collection(s), {sum(copied.values())} points -> '{args.target}'")
+
+
+if __name__ == "__main__":
+    main()
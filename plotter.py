@@ -1,6 +1,7 @@
+import io
 import os
-import matplotlib.pyplot as plt
-import numpy as np
+import threading
+from datetime import datetime
 from qdrant_store import normalize_collection_name
 
 PLOT_DIR = "plots"
@@ -28,6 +29,29 @@ def ensure_plot_dir(team_name: str | None = None) -> str:
     os.makedirs(plot_dir, exist_ok=True)
     return plot_dir
 
+# Графики строятся из потоков пула: без глобального состояния pyplot,
+# а файлы одной команды пишутся и чистятся под её блокировкой
+_TEAM_LOCKS = {}
+_TEAM_LOCKS_GUARD = threading.Lock()
+
+def _team_lock(team_name: str | None) -> threading.Lock:
+    key = normalize_collection_name(team_name) if team_name else ""
+    with _TEAM_LOCKS_GUARD:
+        return _TEAM_LOCKS.setdefault(key, threading.Lock())
+
+def _figure(**kwargs):
+    # matplotlib is imported on first use to keep service start-up fast;
+    # a standalone Figure (no pyplot) can be drawn from any thread
+    from matplotlib.figure import Figure
+
+    return Figure(**kwargs)
+
+def warm_up():
+    """Import matplotlib and render a tiny figure so the first plot is fast."""
+    fig = _figure(figsize=(1, 1))
+    fig.subplots().plot([0, 1], [0, 1], marker="o")
+    fig.savefig(io.BytesIO(), format="png")
+
 def flatten_report(report):
     # Если report — список списков, развернём
     if report and isinstance(report[0], list):
@@ -46,19 +70,19 @@ def plot_individual_bar(report, uuid, team_name: str | None = None):
         status = (test.get("status") or "").lower()
         if status in counts:
             counts[status] += 1
-    plt.figure(figsize=(6, 4))
-    plt.bar(
+    fig = _figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.bar(
         statuses,
         [counts[s] for s in statuses],
         color=[COLORS[s] for s in statuses]
     )
-    plt.title(f"Статусы тестов (отчёт: {uuid[:8]})")
-    plt.ylabel("Количество тестов")
-    plt.xlabel("")
-    plt.tight_layout()
+    ax.set_title(f"Статусы тестов (отчёт: {uuid[:8]})")
+    ax.set_ylabel("Количество тестов")
+    ax.set_xlabel("")
+    fig.tight_layout()
     fname = os.path.join(plot_dir, f"trend_{uuid}.png")
-    plt.savefig(fname)
-    plt.close()
+    fig.savefig(fname)
     return fname
 
 def get_existing_trend_uuids(team_name: str | None = None):
@@ -66,7 +90,7 @@ def get_existing_trend_uuids(team_name: str | None = None):
     files = [
         f
         for f in os.listdir(plot_dir)
-        if f.startswith("trend_") and f.endswith(".png") and not f.endswith("summary.png")
+        if f.startswith("trend_") and f.endswith(".png") and not f.startswith("trend_summary")
     ]
     uuids = []
     for f in files:
@@ -86,8 +110,12 @@ def remove_old_trend_charts(latest_uuids, team_name: str | None = None):
             if os.path.exists(path):
                 os.remove(path)
 
-def plot_summary_trend(reports, uuids, team_names, team_name: str | None = None):
-    plot_dir = ensure_plot_dir(team_name)
+def summary_path(uuid: str | None = None, team_name: str | None = None) -> str:
+    """Path of the summary trend image of the report ``uuid``."""
+    name = f"trend_summary_{uuid}.png" if uuid else "trend_summary.png"
+    return os.path.join(ensure_plot_dir(team_name), name)
+
+def plot_summary_trend(reports, uuids, team_names, team_name: str | None = None, uuid=None):
     statuses = ["passed", "failed", "broken", "skipped"]
     trend = {s: [] for s in statuses}
     labels = []
@@ -101,34 +129,56 @@ def plot_summary_trend(reports, uuids, team_names, team_name: str | None = None)
         for s in statuses:
             trend[s].append(counts[s])
         labels.append((team_names[i] or uuids[i][:8]))
+    return _plot_trend(trend, labels, summary_path(uuid, team_name))
+
+def plot_status_trend(history, team_name: str | None = None, uuid=None):
+    """Plot the summary trend from report rows of :mod:`stats_store`."""
+    statuses = ["passed", "failed", "broken", "skipped"]
+    trend = {s: [row[s] for row in history] for s in statuses}
+    labels = [
+        datetime.fromtimestamp(row["timestamp"]).strftime("%d.%m %H:%M") for row in history
+    ]
+    return _plot_trend(trend, labels, summary_path(uuid, team_name))
+
+def _plot_trend(trend, labels, fname):
+    import numpy as np
 
-    x = np.arange(1, len(reports) + 1)
-    plt.figure(figsize=(10, 5))
-    for s in statuses:
-        plt.plot(x, trend[s], marker="o", color=COLORS[s], label=s.capitalize(), linewidth=2)
-    plt.title("Тренд последних 3 отчётов (по порядку)")
-    plt.xlabel("Очередность")
-    plt.ylabel("Количество тестов")
-    plt.xticks(x, labels, rotation=30, ha='right')
-    plt.legend()
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    fname = os.path.join(plot_dir, "trend_summary.png")
-    plt.savefig(fname)
-    plt.close()
+    x = np.arange(1, len(labels) + 1)
+    fig = _figure(figsize=(max(10, len(labels) * 0.4), 5))
+    ax = fig.subplots()
+    for s, values in trend.items():
+        ax.plot(x, values, marker="o", color=COLORS[s], label=s.capitalize(), linewidth=2)
+    ax.set_title(f"Тренд последних {len(labels)} отчётов (по порядку)")
+    ax.set_xlabel("Очередность")
+    ax.set_ylabel("Количество тестов")
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels, rotation=30, ha='right')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(fname)
     return fname
 
-def plot_trends_for_reports(reports, uuids, team_names, team_name: str | None = None):
+def plot_trends_for_reports(reports, uuids, team_names, team_name: str | None = None, history=None):
     """
     reports: list of test-cases (по каждому отчёту, max 3)
     uuids:   list of uuids (по каждому отчёту, max 3)
     team_names: list of команд (по каждому отчёту, max 3)
+    history: строки отчётов из stats_store — summary trend строится по ним
+
+    The summary trend is written to ``trend_summary_<uuid>.png`` of the last
+    (analysed) report, so concurrent analyses of one team never overwrite
+    each other's image; the caller removes it once it is published.
     """
-    ensure_plot_dir(team_name)
-    # 1. Бар-графики для каждого отчёта
-    for i, (report, uuid) in enumerate(zip(reports, uuids)):
-        plot_individual_bar(report, uuid, team_name)
-    # 2. Сохраняем только 3 последних bar-чарта
-    remove_old_trend_charts(set(uuids), team_name)
-    # 3. Summary trend
-    return plot_summary_trend(reports, uuids, team_names, team_name)
+    current = uuids[-1] if uuids else None
+    with _team_lock(team_name):
+        ensure_plot_dir(team_name)
+        # 1. Бар-графики для каждого отчёта
+        for i, (report, uuid) in enumerate(zip(reports, uuids)):
+            plot_individual_bar(report, uuid, team_name)
+        # 2. Сохраняем только 3 последних bar-чарта
+        remove_old_trend_charts(set(uuids), team_name)
+    # 3. Summary trend (по длинной истории, если она есть) — свой файл на отчёт
+    if history:
+        return plot_status_trend(history, team_name, uuid=current)
+    return plot_summary_trend(reports, uuids, team_names, team_name, uuid=current)
@@ -0,0 +1,104 @@
+"""Opt-in profiling of single analyses.
+
+A run is profiled when the request carries the ``X-Profile: 1`` header or
+when it is picked by ``PROFILE_SAMPLE_RATE``.  A profiled run records a
+cProfile trace and a tracemalloc snapshot next to the analysis results
+(``analysis/profiles`` by default); only the newest ``PROFILE_KEEP`` runs
+are kept.  Runs that are not profiled only pay for :func:`should_profile`.
+"""
+
+import cProfile
+import glob
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+# Share of analyses profiled without the header, 0 disables sampling
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("analysis", "profiles"))
+# How many profiled runs are kept on disk
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 20))
+# Frames kept per tracemalloc allocation
+PROFILE_TRACE_FRAMES = int(os.getenv("PROFILE_TRACE_FRAMES", 10))
+
+_ENABLED_VALUES = {"1", "true", "yes", "on"}
+# tracemalloc is process-wide, so only one run is profiled at a time
+_lock = threading.Lock()
+
+
+def should_profile(header_value: str | None = None) -> bool:
+    """Return ``True`` if the current analysis should be profiled."""
+    if isinstance(header_value, str) and header_value.strip().lower() in _ENABLED_VALUES:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _remove_old_profiles(keep: int):
+    bases = sorted(
+        {p.rsplit(".", 1)[0] for p in glob.glob(os.path.join(PROFILE_DIR, "*.*"))}
+    )
+    for base in bases[: max(len(bases) - keep, 0)]:
+        for path in glob.glob(base + ".*"):
+            os.remove(path)
+
+
+def _write_summary(path, profiler, snapshot, top=30):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(top)
+    stream.write("\nTop allocations (tracemalloc, by line):\n")
+    for stat in snapshot.statistics("lineno")[:top]:
+        stream.write(f"{stat}\n")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+
+
+@contextmanager
+def profile_run(name: str, enabled: bool):
+    """Profile the block when ``enabled``.
+
+    Yields a dict that receives the ``path`` prefix of the stored artefacts
+    (``.prof`` for cProfile/snakeviz, ``.tracemalloc`` for
+    :meth:`tracemalloc.Snapshot.load` and a readable ``.txt`` summary), or
+    ``None`` when the run is not profiled.
+    """
+    if not enabled or not _lock.acquire(blocking=False):
+        yield None
+        return
+    info = {}
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(PROFILE_TRACE_FRAMES)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield info
+    finally:
+        profiler.disable()
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            safe_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name)
+            base = os.path.join(PROFILE_DIR, f"{stamp}_{safe_name}")
+            profiler.dump_stats(base + ".prof")
+            snapshot.dump(base + ".tracemalloc")
+            _write_summary(base + ".txt", profiler, snapshot)
+            _remove_old_profiles(PROFILE_KEEP)
+            info["path"] = base
+            logger.info("[PROFILE] stored %s", base)
+        except Exception:
+            logger.exception("[PROFILE] failed to store profile for %s", name)
+        finally:
+            _lock.release()
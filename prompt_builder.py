@@ -0,0 +1,119 @@
+"""Token-budgeted assembly of LLM prompts.
+
+Large reports produce long lists (duplicate names, cases without mandatory
+fields, ...).  Inlining them makes prompts grow with the report size, and
+LLM latency grows with the prompt.  This module aggregates long lists into
+counts plus a few examples and assembles the prompt from ranked sections so
+that the result never exceeds a configurable token budget.
+"""
+
+import os
+from collections import Counter
+from dataclasses import dataclass
+
+# Budget of the whole prompt in (estimated) tokens, 0 disables the limit
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", 3000))
+# How many examples are kept when a list is aggregated
+PROMPT_TOP_K = int(os.getenv("PROMPT_TOP_K", 5))
+
+# Rough estimate that holds for mixed Russian/English text and gemma-like
+# tokenizers.  Exact counts are not needed to keep prompts bounded.
+CHARS_PER_TOKEN = 3
+TRUNCATION_MARK = " …"
+# Sections that would be cut below this size are dropped entirely
+MIN_SECTION_TOKENS = 16
+
+
+@dataclass
+class PromptSection:
+    """Part of a prompt.
+
+    ``priority`` ranks sections when the budget is tight: lower values are
+    kept first, the highest ones are truncated or dropped.  Sections keep
+    their declaration order in the final prompt.
+    """
+
+    text: str
+    priority: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Return an estimated token count for ``text``."""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut ``text`` so that it fits into ``tokens`` estimated tokens."""
+    if estimate_tokens(text) <= tokens:
+        return text
+    limit = max(tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARK) - 1, 0)
+    return text[:limit].rstrip() + TRUNCATION_MARK
+
+
+def summarize_items(items, top_k: int | None = None, empty: str = "нет") -> str:
+    """Return ``items`` as a short list or as a count with top-k examples.
+
+    Repeated items are counted, the most frequent ones are shown first.
+    """
+    if top_k is None:
+        top_k = PROMPT_TOP_K
+    counter = Counter(items)
+    if not counter:
+        return empty
+    examples = []
+    for item, cnt in counter.most_common(top_k):
+        examples.append(f"{item} x{cnt}" if cnt > 1 else str(item))
+    if len(counter) <= top_k:
+        return ", ".join(examples)
+    return f"{len(counter)} шт., например: " + ", ".join(examples)
+
+
+def summarize_missing_fields(missing, top_k: int | None = None) -> str:
+    """Aggregate ``(uid, [fields])`` pairs into per-field counts.
+
+    Returns e.g. ``"description: 120 (1, 2, 3 …); jira: 4 (5, 6, 7, 8)"``.
+    """
+    if top_k is None:
+        top_k = PROMPT_TOP_K
+    by_field = {}
+    for uid, fields in missing:
+        for field in fields:
+            by_field.setdefault(field, []).append(str(uid))
+    if not by_field:
+        return "нет"
+    parts = []
+    for field, uids in sorted(by_field.items(), key=lambda kv: -len(kv[1])):
+        examples = ", ".join(uids[:top_k])
+        if len(uids) > top_k:
+            examples += " …"
+        parts.append(f"{field}: {len(uids)} ({examples})")
+    return "; ".join(parts)
+
+
+def build_prompt(sections, instruction: str = "", budget: int | None = None) -> str:
+    """Assemble ``sections`` and ``instruction`` into a prompt within ``budget``.
+
+    The instruction is always kept.  Sections are admitted by priority;
+    the first section that does not fit is truncated to the remaining budget
+    and the rest are dropped.
+    """
+    if budget is None:
+        budget = LLM_PROMPT_TOKEN_BUDGET
+    if budget <= 0:
+        return "".join(s.text for s in sections) + instruction
+
+    remaining = budget - estimate_tokens(instruction)
+    kept = [None] * len(sections)
+    ranked = sorted(range(len(sections)), key=lambda i: sections[i].priority)
+    for idx in ranked:
+        text = sections[idx].text
+        cost = estimate_tokens(text)
+        if cost <= remaining:
+            kept[idx] = text
+            remaining -= cost
+        elif remaining >= MIN_SECTION_TOKENS:
+            kept[idx] = truncate_to_tokens(text.rstrip("\n"), remaining - 1) + "\n"
+            remaining = 0
+    return "".join(t for t in kept if t) + instruction
@@ -1,18 +1,38 @@
 import logging
-import qdrant_client
-from qdrant_client.models import PointStruct, Distance, VectorParams
 import os
 import re
+import threading
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# "per_team": a collection per team; "shared": one collection for all teams,
+# partitioned by the TENANT_KEY payload field
+QDRANT_COLLECTION_MODE = os.getenv("QDRANT_COLLECTION_MODE", "per_team").lower()
+QDRANT_SHARED_COLLECTION = os.getenv("QDRANT_SHARED_COLLECTION", "test_cases")
+TENANT_KEY = "tenant"
+# Points per scroll request when whole reports are read
+QDRANT_SCROLL_PAGE = int(os.getenv("QDRANT_SCROLL_PAGE", 1000))
+
+# qdrant_client is imported lazily: importing it takes longer than the rest
+# of the service, and health checks must not wait for it.
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
 
 def get_client():
-    return qdrant_client.QdrantClient(
-        host=os.getenv("QDRANT_HOST", "qdrant"),
-        port=int(os.getenv("QDRANT_PORT", 6333))
-    )
+    """Return a shared Qdrant client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                import qdrant_client
+
+                _CLIENT = qdrant_client.QdrantClient(
+                    host=os.getenv("QDRANT_HOST", "qdrant"),
+                    port=int(os.getenv("QDRANT_PORT", 6333))
+                )
+    return _CLIENT
 
 def normalize_collection_name(name: str) -> str:
     """
@@ -41,46 +61,135 @@ def to_qdrant_id(uid):
     """
     return str(uuid.uuid5(uuid.NAMESPACE_URL, str(uid)))
 
-def ensure_collection(client, collection, vector_size):
+def is_shared_mode() -> bool:
+    return QDRANT_COLLECTION_MODE == "shared"
+
+def tenant_scope(team: str):
+    """Return ``(collection, conditions)`` addressing the points of ``team``.
+
+    In shared mode ``conditions`` holds the tenant filter that must be part
+    of every query; in per-team mode it is empty.
+    """
+    tenant = normalize_collection_name(team)
+    if not is_shared_mode():
+        return tenant, []
+    from qdrant_client.models import FieldCondition, MatchValue
+
+    return QDRANT_SHARED_COLLECTION, [
+        FieldCondition(key=TENANT_KEY, match=MatchValue(value=tenant))
+    ]
+
+def _tenant_filter(conditions):
+    from qdrant_client.models import Filter
+
+    return Filter(must=conditions) if conditions else None
+
+def ensure_collection(client, collection, vector_size, shared=None):
+    from qdrant_client.models import (
+        Distance,
+        HnswConfigDiff,
+        KeywordIndexParams,
+        PayloadSchemaType,
+        VectorParams,
+    )
+
+    if shared is None:
+        shared = is_shared_mode()
     existing_collections = [col.name for col in client.get_collections().collections]
     if collection not in existing_collections:
         logger.info("[QDRANT] Creating collection: '%s' (vector_size=%s)", collection, vector_size)
         client.create_collection(
             collection_name=collection,
             vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+            # Общая коллекция: HNSW строится по каждому tenant отдельно
+            # (payload_m), глобальный граф не нужен — запросы всегда с фильтром
+            hnsw_config=HnswConfigDiff(payload_m=16, m=0) if shared else None,
+        )
+        if shared:
+            client.create_payload_index(
+                collection_name=collection,
+                field_name=TENANT_KEY,
+                field_schema=KeywordIndexParams(type="keyword", is_tenant=True),
+            )
+        # Индексы для фильтров по отчёту и статусу (поиск регрессий, /search)
+        for field in ("report_uuid", "status"):
+            client.create_payload_index(
+                collection_name=collection,
+                field_name=field,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+        client.create_payload_index(
+            collection_name=collection,
+            field_name="timestamp",
+            field_schema=PayloadSchemaType.INTEGER,
         )
     else:
         logger.debug("[QDRANT] Collection exists: '%s'", collection)
 
 def save_report_chunks(team: str, uuid: str, chunks, embeddings, timestamp):
+    save_reports_chunks(team, [(uuid, chunks, embeddings, timestamp)])
+
+def save_reports_chunks(team: str, reports):
+    """Store several reports of ``team`` with a single upsert.
+
+    ``reports`` is a list of ``(uuid, chunks, embeddings, timestamp)``.
+    """
+    from qdrant_client.models import PointStruct
+
     logger.debug("QDRANT_HOST = %s", os.getenv("QDRANT_HOST"))
     logger.debug("QDRANT_PORT = %s", os.getenv("QDRANT_PORT"))
     logger.debug("[QDRANT] client.get_collections() call")
+    reports = [r for r in reports if len(r[1])]
+    if not reports:
+        return
     client = get_client()
-    collection = normalize_collection_name(team)
+    collection, _ = tenant_scope(team)
+    tenant = {TENANT_KEY: normalize_collection_name(team)} if is_shared_mode() else {}
+    embeddings = reports[0][2]
     vector_size = embeddings.shape[1] if hasattr(embeddings, 'shape') else len(embeddings[0])
     ensure_collection(client, collection, vector_size)
     points = [
         PointStruct(
             id=to_qdrant_id(f"{uuid}-{chunk['uid']}"),  # уникальный ID для каждой попытки теста
             vector=embeddings[idx].tolist(),
-            payload={**chunk, "report_uuid": uuid, "timestamp": timestamp}
-        ) for idx, chunk in enumerate(chunks)
+            payload={**chunk, "report_uuid": uuid, "timestamp": timestamp, **tenant}
+        )
+        for uuid, chunks, embeddings, timestamp in reports
+        for idx, chunk in enumerate(chunks)
     ]
-    logger.info("[QDRANT] Upserting %s points into '%s'", len(points), collection)
+    logger.info(
+        "[QDRANT] Upserting %s points of %s report(s) into '%s'", len(points), len(reports), collection
+    )
     client.upsert(collection_name=collection, points=points)
 
+def _scroll_all(client, collection, scroll_filter, **kwargs) -> list:
+    """Return every point matching ``scroll_filter``, page by page."""
+    points = []
+    offset = None
+    while True:
+        page, offset = client.scroll(
+            collection_name=collection,
+            scroll_filter=scroll_filter,
+            limit=QDRANT_SCROLL_PAGE,
+            offset=offset,
+            **kwargs,
+        )
+        points.extend(page)
+        if offset is None:
+            return points
+
+
 def get_prev_report_chunks(team: str, exclude_uuid: str, limit=2):
     client = get_client()
-    collection = normalize_collection_name(team)
+    collection, conditions = tenant_scope(team)
     try:
-        res = client.scroll(collection_name=collection, limit=1000)
+        points = _scroll_all(client, collection, _tenant_filter(conditions))
     except Exception as e:
         # Если коллекция есть, но points нет — ловим 404 и возвращаем пусто!
         logger.error("[QDRANT] scroll exception: %s", e)
         return {}
     reports = {}
-    for point in res[0]:
+    for point in points:
         uuid = point.payload.get("report_uuid")
         if uuid and uuid != exclude_uuid:
             ts = point.payload.get("timestamp", 0)
@@ -100,16 +209,23 @@ def get_prev_report_chunks(team: str, exclude_uuid: str, limit=2):
 
 
 def maintain_last_n_reports(team, n, current_uuid):
+    from qdrant_client.models import PointIdsList
+
     logger.debug("[QDRANT] client.get_collections() call")
     client = get_client()
-    collection = normalize_collection_name(team)
+    collection, conditions = tenant_scope(team)
     existing_collections = [col.name for col in client.get_collections().collections]
     if collection not in existing_collections:
         logger.debug("[QDRANT] Collection '%s' does not exist (skip cleanup)", collection)
         return
-    res = client.scroll(collection_name=collection, limit=1000)
+    points = _scroll_all(
+        client,
+        collection,
+        _tenant_filter(conditions),
+        with_payload=["report_uuid", "timestamp"],
+    )
     uuids = {}
-    for point in res[0]:
+    for point in points:
         uuid_ = point.payload.get("report_uuid")
         if not uuid_:
             continue
@@ -136,10 +252,146 @@ def maintain_last_n_reports(team, n, current_uuid):
     if to_delete:
         logger.info("[QDRANT] Deleting reports: %s", to_delete)
         for u in to_delete:
-            client.delete(collection_name=collection, points_selector={"points": uuids[u]["ids"]})
+            client.delete(collection_name=collection, points_selector=PointIdsList(points=uuids[u]["ids"]))
     else:
         logger.debug(
             "[QDRANT] No reports to delete in '%s' (current count: %s)",
             collection,
             len(uuids_list),
         )
+
+
+def find_matches_in_reports(
+    team, vectors, report_uuids, statuses=None, limit=1, score_threshold=None
+):
+    """Find the nearest points of ``report_uuids`` for every vector.
+
+    All vectors are sent in a single ``query_batch_points`` call, so the
+    number of round-trips does not depend on the number of vectors.
+
+    Returns
+    -------
+    list of list
+        For each vector a list of ``(score, payload)`` pairs, best first.
+    """
+    from qdrant_client.models import FieldCondition, Filter, MatchAny, QueryRequest
+
+    if len(vectors) == 0 or not report_uuids:
+        return [[] for _ in range(len(vectors))]
+    client = get_client()
+    collection, must = tenant_scope(team)
+    must.append(FieldCondition(key="report_uuid", match=MatchAny(any=list(report_uuids))))
+    if statuses:
+        must.append(FieldCondition(key="status", match=MatchAny(any=list(statuses))))
+    query_filter = Filter(must=must)
+    requests = [
+        QueryRequest(
+            query=[float(x) for x in vector],
+            filter=query_filter,
+            limit=limit,
+            score_threshold=score_threshold,
+            with_payload=["report_uuid", "uid", "name", "fullName", "historyId", "status"],
+        )
+        for vector in vectors
+    ]
+    try:
+        responses = client.query_batch_points(collection_name=collection, requests=requests)
+    except Exception as e:
+        logger.error("[QDRANT] query_batch_points exception: %s", e)
+        return [[] for _ in range(len(vectors))]
+    return [[(p.score, p.payload) for p in resp.points] for resp in responses]
+
+
+def search_cases(
+    team,
+    vector,
+    statuses=None,
+    report_uuids=None,
+    time_from=None,
+    time_to=None,
+    limit=10,
+    offset=0,
+    fields=None,
+):
+    """Find cases of ``team`` nearest to ``vector``.
+
+    Parameters
+    ----------
+    statuses, report_uuids : list, optional
+        Keep only cases with one of these statuses / from these reports.
+    time_from, time_to : int, optional
+        Bounds (inclusive) of the report timestamp.
+    limit, offset : int
+        Page of the results.
+    fields : list, optional
+        Payload fields to return; the whole payload when ``None``.
+
+    Returns
+    -------
+    list of dict
+        ``{"id", "score", "payload"}``, best first; empty when the team has
+        no collection.
+    """
+    from qdrant_client.models import FieldCondition, Filter, MatchAny, Range
+
+    client = get_client()
+    collection, must = tenant_scope(team)
+    if not client.collection_exists(collection):
+        return []
+    if statuses:
+        must.append(FieldCondition(key="status", match=MatchAny(any=list(statuses))))
+    if report_uuids:
+        must.append(FieldCondition(key="report_uuid", match=MatchAny(any=list(report_uuids))))
+    if time_from is not None or time_to is not None:
+        must.append(FieldCondition(key="timestamp", range=Range(gte=time_from, lte=time_to)))
+    response = client.query_points(
+        collection_name=collection,
+        query=[float(x) for x in vector],
+        query_filter=Filter(must=must) if must else None,
+        limit=limit,
+        offset=offset,
+        with_payload=list(fields) if fields is not None else True,
+    )
+    return [{"id": p.id, "score": p.score, "payload": p.payload} for p in response.points]
+
+
+def count_report_points(team, report_uuid) -> int:
+    """Return the number of stored points of report ``report_uuid``."""
+    from qdrant_client.models import FieldCondition, Filter, MatchValue
+
+    client = get_client()
+    collection, must = tenant_scope(team)
+    if not client.collection_exists(collection):
+        return 0
+    must.append(FieldCondition(key="report_uuid", match=MatchValue(value=report_uuid)))
+    return client.count(collection_name=collection, count_filter=Filter(must=must), exact=True).count
+
+
+def get_case_vectors(team, report_uuid, uids) -> dict:
+    """Return ``{uid: vector}`` of the stored cases of a report."""
+    uids = list(uids)
+    if not uids:
+        return {}
+    client = get_client()
+    collection, _ = tenant_scope(team)
+    ids = {to_qdrant_id(f"{report_uuid}-{uid}"): uid for uid in uids}
+    points = client.retrieve(
+        collection_name=collection, ids=list(ids), with_payload=False, with_vectors=True
+    )
+    return {ids[str(p.id)]: p.vector for p in points}
+
+
+def delete_cases(team, report_uuid, uids):
+    """Delete the stored cases ``uids`` of a report."""
+    from qdrant_client.models import PointIdsList
+
+    uids = list(uids)
+    if not uids:
+        return
+    client = get_client()
+    collection, _ = tenant_scope(team)
+    logger.info("[QDRANT] Deleting %s case(s) of %s from '%s'", len(uids), report_uuid, collection)
+    client.delete(
+        collection_name=collection,
+        points_selector=PointIdsList(points=[to_qdrant_id(f"{report_uuid}-{uid}") for uid in uids]),
+    )
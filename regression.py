@@ -0,0 +1,149 @@
+"""Cross-report regression detection.
+
+Failures of the current report are matched with the previous reports by
+test identity (:func:`case_identity`).  Only a failure whose test does not
+occur in any previous report (e.g. a renamed test) falls back to the
+similarity of its stored vector, with one batched Qdrant query per previous
+report, so the cost in round-trips does not grow with the number of
+failures.
+"""
+
+import os
+
+import qdrant_store
+from prompt_builder import summarize_items
+from stats_store import case_key
+
+FAILED_STATUSES = ["failed", "broken"]
+# Minimal similarity for two cases to be treated as the same test
+REGRESSION_MATCH_THRESHOLD = float(os.getenv("REGRESSION_MATCH_THRESHOLD", 0.98))
+
+RULES = {
+    "new": ("regression-new", "Новые падения"),
+    "recurring": ("regression-recurring", "Повторяющиеся падения"),
+    "fixed": ("regression-fixed", "Исправлены"),
+}
+
+
+def _is_failed(case) -> bool:
+    return (case.get("status") or "").lower() in FAILED_STATUSES
+
+
+def case_identity(case) -> str:
+    """Identity of a test across reports.
+
+    ``historyId`` tells parametrized runs of one test apart; points stored
+    without it fall back to :func:`stats_store.case_key`.
+    """
+    return case.get("historyId") or case_key(case)
+
+
+def _match_by_vector(team, chunks, embeddings, indexes, prev_uuids, current_keys):
+    """Return ``{index: [(report_uuid, uid), ...]}`` of similar previous failures.
+
+    Every previous report is queried separately with ``limit=1``; a match
+    whose test still runs in the current report is another test with a
+    similar text, not the same one, and is ignored.
+    """
+    found = {}
+    vectors = [embeddings[i] for i in indexes]
+    for uuid in prev_uuids:
+        matches = qdrant_store.find_matches_in_reports(
+            team,
+            vectors,
+            [uuid],
+            statuses=FAILED_STATUSES,
+            limit=1,
+            score_threshold=REGRESSION_MATCH_THRESHOLD,
+        )
+        for i, points in zip(indexes, matches):
+            for _, payload in points:
+                if case_identity(payload) not in current_keys:
+                    found.setdefault(i, []).append((uuid, payload.get("uid")))
+    return found
+
+
+def classify_failures(team, chunks, embeddings, prev_reports):
+    """Split failures into new, recurring and fixed ones.
+
+    Parameters
+    ----------
+    team : str
+        Team (collection) name.
+    chunks : list
+        Cases of the current report.
+    embeddings : numpy.ndarray
+        Vectors of ``chunks`` as stored in Qdrant.
+    prev_reports : dict
+        Previous reports as returned by
+        :func:`qdrant_store.get_prev_report_chunks`.
+
+    Returns
+    -------
+    dict
+        ``{"new": [...], "recurring": [...], "fixed": [...]}``; the first two
+        hold current cases, ``fixed`` holds cases of the most recent previous
+        report that failed there and pass in the current report.
+    """
+    result = {"new": [], "recurring": [], "fixed": []}
+    failed_idx = [i for i, c in enumerate(chunks) if _is_failed(c)]
+    prev_uuids = list(prev_reports)
+    if not prev_uuids:
+        result["new"] = [chunks[i] for i in failed_idx]
+        return result
+
+    known = set()
+    prev_failed = {}
+    for uuid in prev_uuids:
+        for case in prev_reports[uuid].get("chunks", []):
+            key = case_identity(case)
+            known.add(key)
+            if _is_failed(case):
+                prev_failed.setdefault(key, []).append((uuid, case.get("uid")))
+
+    # Тест без истории мог быть переименован — его ищем по вектору
+    unknown = [i for i in failed_idx if case_identity(chunks[i]) not in known]
+    by_vector = {}
+    if unknown:
+        by_vector = _match_by_vector(
+            team,
+            chunks,
+            embeddings,
+            unknown,
+            prev_uuids,
+            {case_identity(c) for c in chunks},
+        )
+
+    matched_prev = set()
+    for i in failed_idx:
+        found = prev_failed.get(case_identity(chunks[i])) or by_vector.get(i)
+        if found:
+            result["recurring"].append(chunks[i])
+            matched_prev.update(found)
+        else:
+            result["new"].append(chunks[i])
+
+    # Исправлен только тест, который есть в текущем отчёте и прошёл;
+    # удалённый или пропущенный тест исправленным не считается
+    passed_now = {
+        case_identity(c) for c in chunks if (c.get("status") or "").lower() == "passed"
+    }
+    latest_uuid = max(prev_uuids, key=lambda u: prev_reports[u].get("timestamp", 0))
+    for case in prev_reports[latest_uuid].get("chunks", []):
+        if (
+            _is_failed(case)
+            and case_identity(case) in passed_now
+            and (latest_uuid, case.get("uid")) not in matched_prev
+        ):
+            result["fixed"].append(case)
+    return result
+
+
+def regression_entries(result):
+    """Return Allure analysis entries describing ``result``."""
+    entries = []
+    for key, (rule, title) in RULES.items():
+        cases = result.get(key, [])
+        names = summarize_items(c.get("name") or c.get("uid") or "?" for c in cases)
+        entries.append({"rule": rule, "message": f"{title}: {len(cases)} ({names})"})
+    return entries
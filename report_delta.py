@@ -0,0 +1,47 @@
+"""Diff of a re-fetched report against its last analysis.
+
+CI keeps rerunning tests of a report after it was analysed, so the same uuid
+is analysed again with a few added or changed cases.  Cases are identified
+by ``uid`` (the Qdrant point id is derived from it) and compared by a hash of
+their chunk, i.e. of what is embedded and stored; only added and changed
+cases need embedding and upserting, removed ones are deleted from Qdrant.
+Chunks hold the compact ``step_summary`` instead of the raw step tree, which
+may be nested deeper than the serializer accepts.  The state of the last analysis is the
+index stored next to the report snapshot (:func:`report_snapshot.save_index`).
+"""
+
+import hashlib
+
+import serialization
+
+
+def case_uid(case) -> str:
+    return str(case.get("uid"))
+
+
+def case_hash(case) -> str:
+    """Hash of the case content, independent of the key order."""
+    return hashlib.blake2b(serialization.dumps(case, sort_keys=True), digest_size=16).hexdigest()
+
+
+def case_index(cases) -> dict:
+    """Return ``{uid: content hash}`` of ``cases`` (chunks)."""
+    return {case_uid(case): case_hash(case) for case in cases}
+
+
+def diff(previous: dict, current: dict) -> dict:
+    """Compare two case indexes.
+
+    Returns
+    -------
+    dict
+        ``added``, ``changed``, ``removed`` and ``unchanged`` uid sets.
+    """
+    common = previous.keys() & current.keys()
+    changed = {uid for uid in common if previous[uid] != current[uid]}
+    return {
+        "added": set(current.keys() - previous.keys()),
+        "changed": changed,
+        "removed": set(previous.keys() - current.keys()),
+        "unchanged": common - changed,
+    }
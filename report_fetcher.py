@@ -3,6 +3,9 @@ from datetime import datetime
 import requests
 from requests.auth import HTTPBasicAuth
 from utils import get_env
+import metrics
+import report_snapshot
+import serialization
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +22,47 @@ def _flatten_suites(node, cases):
             cases.append(node)
 
 
-def fetch_allure_report(uuid: str) -> tuple[list, int]:
-    """Return Allure report cases and the fetch timestamp."""
+def _load_snapshot(uuid: str):
+    try:
+        return report_snapshot.load_snapshot(uuid)
+    except Exception as e:
+        logger.warning("[FETCH] broken snapshot of %s: %s", uuid, e)
+        return None
 
+
+def fetch_allure_report(uuid: str, refresh: bool = True) -> tuple[list, int]:
+    """Return Allure report cases and the fetch timestamp.
+
+    The report is fetched from Allure and snapshotted (see
+    :mod:`report_snapshot`).  With ``refresh=False`` a stored snapshot is
+    reused instead; it is also the fallback when Allure cannot be reached.
+    """
+    if report_snapshot.REPORT_SNAPSHOT_ENABLED and not refresh:
+        snapshot = _load_snapshot(uuid)
+        if snapshot is not None:
+            metrics.CACHE_REQUESTS.inc(cache="report_snapshot", result="hit")
+            return snapshot
+        metrics.CACHE_REQUESTS.inc(cache="report_snapshot", result="miss")
+
+    try:
+        cases, fetch_time = _fetch_from_allure(uuid)
+    except requests.RequestException as e:
+        snapshot = _load_snapshot(uuid) if report_snapshot.REPORT_SNAPSHOT_ENABLED else None
+        if snapshot is None:
+            raise
+        # Allure недоступен: анализируем последний сохранённый снимок
+        logger.warning("[FETCH] Allure unavailable for %s, using its snapshot: %s", uuid, e)
+        metrics.CACHE_REQUESTS.inc(cache="report_snapshot", result="fallback")
+        return snapshot
+    if report_snapshot.REPORT_SNAPSHOT_ENABLED:
+        try:
+            report_snapshot.save_snapshot(uuid, cases, fetch_time)
+        except Exception as e:
+            logger.warning("[FETCH] failed to snapshot %s: %s", uuid, e)
+    return cases, fetch_time
+
+
+def _fetch_from_allure(uuid: str) -> tuple[list, int]:
     base = get_env("ALLURE_API_REPORT_ENDPOINT")
     # Report path may vary between Allure versions. Allow overriding via env.
     # By default we try the newer "/test-cases/aggregate" endpoint and fall back
@@ -43,7 +84,8 @@ def fetch_allure_report(uuid: str) -> tuple[list, int]:
         logger.debug("[FETCH STATUS] %s", resp.status_code)
         logger.debug("[FETCH TEXT] %s", resp.text[:500])
         if resp.status_code == 200:
-            data = resp.json()
+            metrics.add_size(bytes=len(resp.content))
+            data = serialization.loads(resp.content)
             break
     if resp is None or resp.status_code != 200:
         raise Exception(
@@ -0,0 +1,189 @@
+"""On-disk snapshots of raw Allure reports.
+
+A fetched report is stored under ``REPORT_SNAPSHOT_DIR`` (``reports/`` by
+default), so re-analysing it does not hit Allure again.  A snapshot is a
+directory per report uuid with one file per top-level case field::
+
+    reports/<uuid>/meta.msgpack        format version, timestamp, columns
+    reports/<uuid>/<column>.zst        zstd-compressed msgpack list, one value per case
+    reports/<uuid>/index.msgpack       cases stored in Qdrant by the last analysis
+
+Heavy fields (``steps``, ``statusTrace``, ``attachments``…) are separate
+columns, so a projected load (``columns=[...]``) reads and decompresses only
+the fields a stage needs.  Column files are memory-mapped and decompressed
+straight from the mapping.  Missing fields and ``None`` values are not
+distinguished: both are absent from the loaded cases.
+
+The analysis index (:func:`save_index`) records the uid and content hash of
+every case the last analysis of the report stored in Qdrant; re-analysis
+diffs the fetched cases against it (see :mod:`report_delta`).  It is kept
+when the snapshot itself is replaced by a fresh fetch.
+"""
+
+import logging
+import mmap
+import os
+import re
+import shutil
+import threading
+
+import msgpack
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+REPORT_SNAPSHOT_DIR = os.getenv("REPORT_SNAPSHOT_DIR", "reports")
+REPORT_SNAPSHOT_ENABLED = os.getenv("REPORT_SNAPSHOT_ENABLED", "true").lower() == "true"
+# How many snapshots are kept, the oldest are removed first
+REPORT_SNAPSHOT_KEEP = int(os.getenv("REPORT_SNAPSHOT_KEEP", 1000))
+REPORT_SNAPSHOT_ZSTD_LEVEL = int(os.getenv("REPORT_SNAPSHOT_ZSTD_LEVEL", 3))
+
+FORMAT_VERSION = 1
+META_FILE = "meta.msgpack"
+INDEX_FILE = "index.msgpack"
+COLUMN_SUFFIX = ".zst"
+
+
+def _safe_name(value: str) -> str:
+    name = re.sub(r"[^A-Za-z0-9_\-.]", "_", str(value)).lstrip(".")
+    return name or "_"
+
+
+def snapshot_path(uuid: str) -> str:
+    """Return the snapshot directory of ``uuid``."""
+    return os.path.join(REPORT_SNAPSHOT_DIR, _safe_name(uuid))
+
+
+def has_snapshot(uuid: str) -> bool:
+    return os.path.isfile(os.path.join(snapshot_path(uuid), META_FILE))
+
+
+def save_snapshot(uuid: str, cases, timestamp: int) -> str:
+    """Store ``cases`` of report ``uuid``; an existing snapshot is replaced.
+
+    Returns the snapshot directory.
+    """
+    columns = {}
+    for case in cases:
+        for key in case:
+            columns.setdefault(key, None)
+    path = snapshot_path(uuid)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp, exist_ok=True)
+    compressor = zstandard.ZstdCompressor(level=REPORT_SNAPSHOT_ZSTD_LEVEL)
+    files = {}
+    try:
+        for i, key in enumerate(columns):
+            fname = f"{i:03d}_{_safe_name(key)[:64]}{COLUMN_SUFFIX}"
+            values = [case.get(key) for case in cases]
+            data = compressor.compress(msgpack.packb(values, use_bin_type=True))
+            with open(os.path.join(tmp, fname), "wb") as f:
+                f.write(data)
+            files[key] = fname
+        meta = {
+            "version": FORMAT_VERSION,
+            "uuid": uuid,
+            "timestamp": int(timestamp),
+            "cases": len(cases),
+            "columns": files,
+        }
+        with open(os.path.join(tmp, META_FILE), "wb") as f:
+            f.write(msgpack.packb(meta, use_bin_type=True))
+        if os.path.exists(path):
+            # Индекс анализа относится к точкам в Qdrant, а не к скачанным данным
+            if os.path.exists(os.path.join(path, INDEX_FILE)):
+                os.replace(os.path.join(path, INDEX_FILE), os.path.join(tmp, INDEX_FILE))
+            shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp, path)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _remove_old_snapshots(REPORT_SNAPSHOT_KEEP)
+    return path
+
+
+def _remove_old_snapshots(keep: int):
+    try:
+        entries = [e for e in os.scandir(REPORT_SNAPSHOT_DIR) if e.is_dir() and ".tmp-" not in e.name]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def load_meta(uuid: str) -> dict | None:
+    """Return the snapshot metadata of ``uuid`` or ``None`` without a snapshot."""
+    try:
+        with open(os.path.join(snapshot_path(uuid), META_FILE), "rb") as f:
+            meta = msgpack.unpackb(f.read(), raw=False)
+    except FileNotFoundError:
+        return None
+    if meta.get("version") != FORMAT_VERSION:
+        logger.warning("[SNAPSHOT] %s has unsupported version %s", uuid, meta.get("version"))
+        return None
+    return meta
+
+
+def _read_column(path: str):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = zstandard.ZstdDecompressor().decompress(mm)
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def load_columns(uuid: str, columns=None, meta: dict | None = None) -> dict | None:
+    """Return ``{column: [value per case]}`` for the requested ``columns``.
+
+    Columns missing from the snapshot are filled with ``None``.  Returns
+    ``None`` when there is no snapshot of ``uuid``.
+    """
+    meta = meta or load_meta(uuid)
+    if meta is None:
+        return None
+    files = meta["columns"]
+    if columns is None:
+        columns = list(files)
+    path = snapshot_path(uuid)
+    result = {}
+    for column in columns:
+        if column in files:
+            result[column] = _read_column(os.path.join(path, files[column]))
+        else:
+            result[column] = [None] * meta["cases"]
+    return result
+
+
+def load_snapshot(uuid: str, columns=None):
+    """Return ``(cases, timestamp)`` of the stored report or ``None``.
+
+    With ``columns`` only these fields are loaded into the cases.
+    """
+    meta = load_meta(uuid)
+    if meta is None:
+        return None
+    data = load_columns(uuid, columns, meta)
+    cases = [{} for _ in range(meta["cases"])]
+    for column, values in data.items():
+        for case, value in zip(cases, values):
+            if value is not None:
+                case[column] = value
+    return cases, meta["timestamp"]
+
+
+def save_index(uuid: str, index: dict):
+    """Store the analysis index of ``uuid`` (``{"team", "timestamp", "cases"}``)."""
+    path = snapshot_path(uuid)
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, f"{INDEX_FILE}.tmp-{os.getpid()}-{threading.get_ident()}")
+    with open(tmp, "wb") as f:
+        f.write(msgpack.packb(index, use_bin_type=True))
+    os.replace(tmp, os.path.join(path, INDEX_FILE))
+
+
+def load_index(uuid: str) -> dict | None:
+    """Return the analysis index of ``uuid`` or ``None`` when there is none."""
+    try:
+        with open(os.path.join(snapshot_path(uuid), INDEX_FILE), "rb") as f:
+            return msgpack.unpackb(f.read(), raw=False)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,36 @@
+"""JSON encoding and decoding used on the hot paths.
+
+orjson is several times faster than the stdlib ``json`` on the large case
+lists and analysis entries the service moves around, and serializes numpy
+arrays and scalars natively.  :func:`dumps` returns ``bytes``.
+"""
+
+import os
+
+import orjson
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    # Открытые файлы (вложения) сериализуются именем файла
+    if hasattr(obj, "read"):
+        return os.path.basename(getattr(obj, "name", "attachment"))
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(obj, sort_keys: bool = False) -> bytes:
+    """Serialize ``obj`` to UTF-8 JSON bytes.
+
+    Values orjson does not know are serialized with ``str``, files by
+    their name.  ``sort_keys`` gives a canonical form for hashing.
+    """
+    option = _OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _OPTIONS
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def loads(data):
+    """Parse JSON from ``bytes``, ``bytearray``, ``memoryview`` or ``str``."""
+    return orjson.loads(data)
@@ -0,0 +1,98 @@
+"""Production entry point of the service.
+
+With one worker this is the same as ``uvicorn main:app``.  With several
+workers the embedding model is loaded once, in an ``embedding_server.py``
+process, and all uvicorn workers reach it over a Unix socket, so the model
+is not duplicated in every worker.
+
+Every worker has its own LLM gateway, so ``LLM_MAX_CONCURRENCY`` is split
+between the workers (at least one generation each) to keep the total
+number of concurrent Ollama calls at the configured value.
+
+    python serve.py --workers 4
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+
+import uvicorn
+
+from embedding_server import DEFAULT_SOCKET, wait_for_socket
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_embedding_server(socket_path: str) -> subprocess.Popen:
+    """Start the shared embedding server and wait for its socket."""
+    env = dict(os.environ)
+    env.pop("EMBEDDING_SOCKET", None)
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "embedding_server.py"), "--socket", socket_path],
+        env=env,
+    )
+    if not wait_for_socket(socket_path):
+        proc.terminate()
+        raise RuntimeError(f"Embedding server did not start on {socket_path}")
+    return proc
+
+
+def split_llm_concurrency(total: int, workers: int) -> int:
+    """Return the ``LLM_MAX_CONCURRENCY`` of one of ``workers`` workers."""
+    return max(total // max(workers, 1), 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8001)))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 1))
+    )
+    parser.add_argument(
+        "--embedding-socket",
+        default=os.getenv("EMBEDDING_SOCKET") or DEFAULT_SOCKET,
+        help="Unix socket of the shared embedding model",
+    )
+    parser.add_argument(
+        "--shared-model",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Serve the model from a separate process (default: when workers > 1)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    shared = args.shared_model if args.shared_model is not None else args.workers > 1
+    embedder_proc = None
+    if shared:
+        embedder_proc = start_embedding_server(args.embedding_socket)
+        # Inherited by the spawned uvicorn workers
+        os.environ["EMBEDDING_SOCKET"] = args.embedding_socket
+        logger.info("[SERVE] shared embedding model on %s", args.embedding_socket)
+    if args.workers > 1:
+        total = int(os.getenv("LLM_MAX_CONCURRENCY", 2))
+        per_worker = split_llm_concurrency(total, args.workers)
+        if per_worker * args.workers > total:
+            logger.warning(
+                "[SERVE] %s workers allow %s concurrent LLM calls (LLM_MAX_CONCURRENCY=%s)",
+                args.workers,
+                per_worker * args.workers,
+                total,
+            )
+        # Каждый воркер держит свой шлюз LLM; переменная наследуется воркерами
+        os.environ["LLM_MAX_CONCURRENCY"] = str(per_worker)
+    try:
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        if embedder_proc is not None:
+            embedder_proc.terminate()
+            embedder_proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
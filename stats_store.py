@@ -0,0 +1,323 @@
+"""Per-team time series of report aggregates.
+
+Raw chunks in Qdrant are kept only for the last ``REPORTS_HISTORY_DEPTH``
+reports.  For long-horizon trends every analysed report is also recorded
+here as a compact row of aggregates (status counts, duration, flaky count),
+its top error signatures and the outcome of every test.  The store is
+updated incrementally by each analysis, so trends over ``TREND_DEPTH``
+reports cost one query over that many rows instead of reloading the reports.
+
+Per-test outcomes are stored column-wise, one row per report: test ids
+(from a per-team dictionary of test names), status codes, durations and
+Allure flaky flags as numpy arrays.  :func:`load_outcomes` aligns a window
+of reports into ``tests x reports`` matrices for :mod:`flakiness`.
+
+The store is a SQLite database (``STATS_DB_PATH``) in WAL mode, which is safe
+to share between the service workers.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+import numpy as np
+
+from error_signature import error_signature
+
+logger = logging.getLogger(__name__)
+
+STATS_DB_PATH = os.getenv("STATS_DB_PATH", os.path.join("analysis", "stats.sqlite3"))
+# How many reports are used for trends
+TREND_DEPTH = int(os.getenv("TREND_DEPTH", 30))
+# How many reports per team are kept in the store
+STATS_KEEP_REPORTS = int(os.getenv("STATS_KEEP_REPORTS", 365))
+# Error signatures stored per report
+STATS_TOP_SIGNATURES = int(os.getenv("STATS_TOP_SIGNATURES", 20))
+
+STATUSES = ("passed", "failed", "broken", "skipped")
+FAILED_STATUSES = ("failed", "broken")
+# Status codes of the outcome matrices; a test missing from a report is ABSENT
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+UNKNOWN = len(STATUSES)
+ABSENT = -1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    team TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    broken INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    flaky INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    PRIMARY KEY (team, uuid)
+);
+CREATE INDEX IF NOT EXISTS reports_by_time ON reports (team, timestamp);
+CREATE TABLE IF NOT EXISTS signatures (
+    team TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (team, uuid, signature)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tests (
+    team TEXT NOT NULL,
+    test TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (team, test)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS outcomes (
+    team TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    test_ids BLOB NOT NULL,
+    statuses BLOB NOT NULL,
+    durations BLOB NOT NULL,
+    flaky BLOB NOT NULL,
+    PRIMARY KEY (team, uuid)
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    # One connection per thread and database path
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(STATS_DB_PATH)
+    if conn is None:
+        directory = os.path.dirname(STATS_DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(STATS_DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conns[STATS_DB_PATH] = conn
+    return conn
+
+
+def case_key(case) -> str:
+    """Stable identity of a test across reports."""
+    return case.get("fullName") or case.get("name") or str(case.get("uid") or "")
+
+
+def _duration(case):
+    value = (case.get("time") or {}).get("duration", case.get("duration"))
+    return int(value) if isinstance(value, (int, float)) else None
+
+
+def _test_ids(conn, team, keys):
+    ids = dict(conn.execute("SELECT test, id FROM tests WHERE team = ?", (team,)).fetchall())
+    new = [key for key in keys if key not in ids]
+    if new:
+        start = max(ids.values(), default=-1) + 1
+        rows = [(team, key, start + i) for i, key in enumerate(new)]
+        conn.executemany("INSERT INTO tests VALUES (?, ?, ?)", rows)
+        ids.update((key, i) for _, key, i in rows)
+    return np.fromiter((ids[key] for key in keys), dtype=np.int32, count=len(keys))
+
+
+def record_report(team: str, uuid: str, timestamp: int, cases) -> dict:
+    """Record the aggregates of one report; re-recording a report replaces it.
+
+    Returns the stored report row as a dict.
+    """
+    counts = Counter()
+    signatures = Counter()
+    outcomes = {}
+    flaky = 0
+    total_duration = 0
+    for case in cases:
+        status = (case.get("status") or "unknown").lower()
+        counts[status] += 1
+        is_flaky = bool(case.get("flaky"))
+        flaky += is_flaky
+        duration = _duration(case)
+        total_duration += duration or 0
+        if status in FAILED_STATUSES:
+            signature = error_signature(case)
+            if signature:
+                signatures[signature] += 1
+        # Перезапуски одного теста: в истории остаётся последний
+        outcomes[case_key(case)] = (STATUS_CODES.get(status, UNKNOWN), duration, is_flaky)
+
+    row = {
+        "team": team,
+        "uuid": uuid,
+        "timestamp": int(timestamp),
+        **{s: counts[s] for s in STATUSES},
+        "total": sum(counts.values()),
+        "flaky": flaky,
+        "duration_ms": total_duration,
+    }
+    values = list(outcomes.values())
+    statuses = np.array([v[0] for v in values], dtype=np.int8)
+    durations = np.array([np.nan if v[1] is None else v[1] for v in values], dtype=np.float32)
+    flags = np.array([v[2] for v in values], dtype=np.uint8)
+    conn = _connect()
+    with conn:
+        # Словарь тестов команды пополняется под блокировкой записи
+        conn.execute("BEGIN IMMEDIATE")
+        test_ids = _test_ids(conn, team, list(outcomes))
+        conn.execute("DELETE FROM signatures WHERE team = ? AND uuid = ?", (team, uuid))
+        conn.execute(
+            "INSERT OR REPLACE INTO reports VALUES "
+            "(:team, :uuid, :timestamp, :passed, :failed, :broken, :skipped, :total, :flaky, :duration_ms)",
+            row,
+        )
+        conn.executemany(
+            "INSERT INTO signatures VALUES (?, ?, ?, ?)",
+            [(team, uuid, sig, n) for sig, n in signatures.most_common(STATS_TOP_SIGNATURES)],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?)",
+            (team, uuid, test_ids.tobytes(), statuses.tobytes(), durations.tobytes(), flags.tobytes()),
+        )
+        _prune(conn, team)
+    logger.debug("[STATS] recorded %s (%s cases) for '%s'", uuid, row["total"], team)
+    return row
+
+
+def _prune(conn, team):
+    old = [
+        uuid
+        for (uuid,) in conn.execute(
+            "SELECT uuid FROM reports WHERE team = ? ORDER BY timestamp DESC LIMIT -1 OFFSET ?",
+            (team, STATS_KEEP_REPORTS),
+        )
+    ]
+    for table in ("reports", "signatures", "outcomes"):
+        conn.executemany(
+            f"DELETE FROM {table} WHERE team = ? AND uuid = ?", [(team, u) for u in old]
+        )
+
+
+def _recent_uuids_sql(until):
+    condition = " AND timestamp <= ?" if until is not None else ""
+    return (
+        f"SELECT uuid FROM reports WHERE team = ?{condition} "
+        "ORDER BY timestamp DESC LIMIT ?"
+    )
+
+
+def _recent_args(team, depth, until):
+    return (team, until, depth) if until is not None else (team, depth)
+
+
+def report_history(team: str, depth: int = TREND_DEPTH, until: int | None = None) -> list:
+    """Return the last ``depth`` report rows of ``team``, oldest first.
+
+    ``until`` limits the history to reports recorded at or before this
+    timestamp.
+    """
+    condition = " AND timestamp <= ?" if until is not None else ""
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            f"SELECT * FROM reports WHERE team = ?{condition} ORDER BY timestamp DESC LIMIT ?",
+            _recent_args(team, depth, until),
+        ).fetchall()
+    finally:
+        conn.row_factory = None
+    return [dict(row) for row in reversed(rows)]
+
+
+def top_signatures(team: str, depth: int = TREND_DEPTH, until: int | None = None, top: int = 5):
+    """Return ``[(signature, count, reports), ...]`` over the last ``depth`` reports."""
+    return _connect().execute(
+        "SELECT signature, SUM(count) AS total, COUNT(*) AS reports FROM signatures "
+        f"WHERE team = ? AND uuid IN ({_recent_uuids_sql(until)}) "
+        "GROUP BY signature ORDER BY total DESC, signature LIMIT ?",
+        (team, *_recent_args(team, depth, until), top),
+    ).fetchall()
+
+
+def report_signatures(team: str, uuids, top: int = 5) -> dict:
+    """Return ``{uuid: [(signature, count), ...]}``, most frequent first."""
+    uuids = list(uuids)
+    if not uuids:
+        return {}
+    placeholders = ",".join("?" * len(uuids))
+    result = {}
+    for uuid, signature, count in _connect().execute(
+        "SELECT uuid, signature, count FROM signatures "
+        f"WHERE team = ? AND uuid IN ({placeholders}) ORDER BY count DESC, signature",
+        (team, *uuids),
+    ):
+        items = result.setdefault(uuid, [])
+        if len(items) < top:
+            items.append((signature, count))
+    return result
+
+
+def load_outcomes(team: str, depth: int = TREND_DEPTH, until: int | None = None) -> dict:
+    """Load per-test outcomes of the last ``depth`` reports as aligned matrices.
+
+    Returns
+    -------
+    dict
+        ``uuids`` (oldest first), ``test_ids`` (row ids), ``status``
+        (``int8`` codes of :data:`STATUS_CODES`, :data:`ABSENT` when the test
+        is not in the report), ``duration`` (``float32`` ms, NaN when
+        unknown) and ``flaky`` (``bool``); matrices are ``tests x reports``.
+    """
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT o.uuid, o.test_ids, o.statuses, o.durations, o.flaky FROM outcomes o "
+        "JOIN reports r ON r.team = o.team AND r.uuid = o.uuid "
+        f"WHERE o.team = ? AND o.uuid IN ({_recent_uuids_sql(until)}) ORDER BY r.timestamp",
+        (team, *_recent_args(team, depth, until)),
+    ).fetchall()
+    columns = [np.frombuffer(row[1], dtype=np.int32) for row in rows]
+    size = max((int(ids.max()) + 1 for ids in columns if len(ids)), default=0)
+    status = np.full((size, len(rows)), ABSENT, dtype=np.int8)
+    duration = np.full((size, len(rows)), np.nan, dtype=np.float32)
+    flaky = np.zeros((size, len(rows)), dtype=bool)
+    for r, (row, ids) in enumerate(zip(rows, columns)):
+        status[ids, r] = np.frombuffer(row[2], dtype=np.int8)
+        duration[ids, r] = np.frombuffer(row[3], dtype=np.float32)
+        flaky[ids, r] = np.frombuffer(row[4], dtype=np.uint8).astype(bool)
+    return {
+        "uuids": [row[0] for row in rows],
+        "test_ids": np.arange(size, dtype=np.int32),
+        "status": status,
+        "duration": duration,
+        "flaky": flaky,
+    }
+
+
+def names_for_ids(team: str, ids) -> dict:
+    """Return ``{id: test name}`` for the given test ids of ``team``."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    return dict(
+        _connect().execute(
+            f"SELECT id, test FROM tests WHERE team = ? AND id IN ({placeholders})",
+            (team, *ids),
+        ).fetchall()
+    )
+
+
+def team_test_names(team: str) -> dict:
+    """Return ``{id: test name}`` of every test of ``team``."""
+    return dict(
+        _connect().execute("SELECT id, test FROM tests WHERE team = ?", (team,)).fetchall()
+    )
+
+
+def format_trend(history) -> str:
+    """Format report rows as trend lines for the LLM prompt."""
+    return "\n".join(
+        f"{i + 1}-й: " + ", ".join(f"{s}={row[s]}" for s in STATUSES)
+        for i, row in enumerate(history)
+    )
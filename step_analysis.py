@@ -0,0 +1,148 @@
+"""Compact analytics of Allure step trees.
+
+Allure cases carry a tree of nested ``steps`` that can be thousands of
+nodes and dozens of levels deep.  The tree is walked iteratively with an
+explicit stack (:func:`iter_steps`), so depth is not limited by the
+interpreter recursion limit, and reduced to a small per-case summary
+(:func:`summarize_steps`) that is stored in chunks and Qdrant payloads
+instead of the raw tree:
+
+* ``count``, ``depth``, ``failed`` – number of steps, tree depth and failed
+  or broken steps;
+* ``duration`` – total duration of the top-level steps, ms;
+* ``slowest`` – name and duration of the slowest step;
+* ``failure`` – path (names from the root) of the deepest step of the first
+  failed branch, i.e. where the case actually failed; only its last
+  ``STEP_FAILURE_PATH_LEN`` names are kept, after a ``… >`` prefix;
+* ``names`` – the ``STEP_SUMMARY_NAMES`` most frequent step names;
+* ``fingerprint`` – hash of the tree shape (names and depths), equal for
+  runs that executed the same steps.
+"""
+
+import hashlib
+import os
+from collections import Counter
+
+# Step names kept per case in the summary
+STEP_SUMMARY_NAMES = int(os.getenv("STEP_SUMMARY_NAMES", 10))
+# Length limit of a step name in the failure path
+STEP_NAME_MAX_LEN = int(os.getenv("STEP_NAME_MAX_LEN", 200))
+# Step names kept at the end of the failure path
+STEP_FAILURE_PATH_LEN = int(os.getenv("STEP_FAILURE_PATH_LEN", 5))
+
+FAILED_STATUSES = {"failed", "broken"}
+
+
+def iter_steps(steps):
+    """Yield ``(depth, path, step)`` for every step, depth-first in order.
+
+    ``path`` is the list of step names from the root to the step; it is
+    shared between iterations and must be copied to be kept.
+    """
+    if not steps:
+        return
+    path = []
+    stack = [iter(steps)]
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            if path:
+                path.pop()
+            continue
+        if not isinstance(step, dict):
+            continue
+        path.append(step.get("name") or "")
+        yield len(stack) - 1, path, step
+        children = step.get("steps")
+        if children:
+            stack.append(iter(children))
+        else:
+            path.pop()
+
+
+def step_duration(step):
+    time = step.get("time") or {}
+    value = time.get("duration")
+    if value is None and time.get("start") is not None and time.get("stop") is not None:
+        value = time["stop"] - time["start"]
+    return value if isinstance(value, (int, float)) else None
+
+
+def _format_path(path) -> str:
+    """Join the last ``STEP_FAILURE_PATH_LEN`` names of ``path``."""
+    keep = max(STEP_FAILURE_PATH_LEN, 1)
+    names = [n[:STEP_NAME_MAX_LEN] for n in path[-keep:]]
+    if len(path) > keep:
+        names.insert(0, "…")
+    return " > ".join(names)
+
+
+def summarize_steps(steps) -> dict | None:
+    """Return the compact summary of a step tree, ``None`` without steps."""
+    if not steps:
+        return None
+    count = failed = depth = 0
+    duration = 0
+    slowest = None
+    failure = None
+    names = Counter()
+    digest = hashlib.blake2b(digest_size=8)
+    for level, path, step in iter_steps(steps):
+        count += 1
+        depth = max(depth, level + 1)
+        name = path[-1]
+        names[name] += 1
+        digest.update(f"{level}:{name}\n".encode("utf-8", "replace"))
+        value = step_duration(step)
+        if value is not None:
+            if level == 0:
+                duration += value
+            if slowest is None or value > slowest[1]:
+                slowest = (name, value)
+        if (step.get("status") or "").lower() in FAILED_STATUSES:
+            failed += 1
+            # Уточняем место падения, пока остаёмся в первой упавшей ветке
+            if failure is None or path[: len(failure)] == failure:
+                failure = list(path)
+    return {
+        "count": count,
+        "depth": depth,
+        "failed": failed,
+        "duration": duration,
+        "slowest": {"name": slowest[0], "duration": slowest[1]} if slowest else None,
+        "failure": _format_path(failure) if failure else None,
+        "names": dict(names.most_common(STEP_SUMMARY_NAMES)),
+        "fingerprint": digest.hexdigest(),
+    }
+
+
+def step_name_counts(cases) -> Counter:
+    """Count step names over ``cases``.
+
+    Raw cases are walked through their ``steps``; chunks only have the
+    ``step_summary`` and contribute its most frequent names.
+    """
+    counter = Counter()
+    for case in cases:
+        steps = case.get("steps")
+        if steps:
+            counter.update(path[-1] for _, path, _ in iter_steps(steps) if path[-1])
+        else:
+            summary = case.get("step_summary") or {}
+            counter.update({n: c for n, c in (summary.get("names") or {}).items() if n})
+    return counter
+
+
+def failure_locations(cases) -> Counter:
+    """Count the failure paths of failed and broken ``cases``."""
+    counter = Counter()
+    for case in cases:
+        if (case.get("status") or "").lower() not in FAILED_STATUSES:
+            continue
+        summary = case.get("step_summary")
+        if summary is None and case.get("steps"):
+            summary = summarize_steps(case["steps"])
+        if summary and summary.get("failure"):
+            counter[summary["failure"]] += 1
+    return counter
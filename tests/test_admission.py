@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import admission  # noqa: E402
+
+
+def _wait_for(predicate):
+    deadline = time.monotonic() + 5
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_weighted_fair_order_and_team_limit():
+    scheduler = admission.FairScheduler(capacity=1, team_limit=1, queue_limit=10)
+    first = scheduler.acquire("big", 100)
+    order = []
+
+    def worker(team, cost):
+        ticket = scheduler.acquire(team, cost, timeout=5)
+        order.append(team)
+        scheduler.release(ticket)
+
+    threads = []
+    for team, cost in [("big", 1000), ("big", 1000), ("small", 100)]:
+        threads.append(threading.Thread(target=worker, args=(team, cost)))
+        threads[-1].start()
+        _wait_for(lambda n=len(threads): sum(w for w, _ in scheduler.snapshot().values()) == n)
+    assert scheduler.snapshot()["big"] == (2, 1)
+    scheduler.release(first)
+    for t in threads:
+        t.join(5)
+    # Маленький отчёт другой команды не ждёт очередь большой
+    assert order == ["small", "big", "big"]
+
+
+def test_rejections_carry_retry_after():
+    scheduler = admission.FairScheduler(capacity=2, team_limit=1, queue_limit=0)
+    ticket = scheduler.acquire("a", 10)
+    # Другая команда проходит, пока есть общий слот
+    scheduler.release(scheduler.acquire("b", 10, timeout=0))
+    with pytest.raises(admission.AdmissionRejected) as queue_full:
+        scheduler.acquire("a", 10)
+    assert queue_full.value.retry_after >= 1
+
+    scheduler.queue_limit = 5
+    with pytest.raises(admission.AdmissionRejected) as timed_out:
+        scheduler.acquire("a", 10, timeout=0.05)
+    assert timed_out.value.retry_after >= 1
+    assert scheduler.snapshot()["a"] == (0, 1)
+    scheduler.release(ticket)
+    assert admission.parse_weights("A=2, B = 0.5,bad,C=x") == {"A": 2.0, "B": 0.5}
+
+
+def test_analyze_returns_429_with_retry_after(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import main
+
+    def rejected(req):
+        raise admission.AdmissionRejected("Too many queued analyses for team 'T'", 42)
+
+    monkeypatch.setattr(main, "_analyze", rejected)
+    resp = TestClient(main.app).post("/uuid/analyze", json={"uuid": "u1"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "42"
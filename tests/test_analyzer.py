@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import analyzer  # noqa: E402
+import llm_gateway  # noqa: E402
+import prompt_builder  # noqa: E402
+
+
+def _cases(statuses, trace="Traceback " + "frame\n" * 200):
+    return [
+        {
+            "uid": f"u{i}",
+            "name": f"test_{i}",
+            "status": status,
+            "statusMessage": "AssertionError: boom" if status == "failed" else None,
+            "statusTrace": trace if status == "failed" else None,
+            "time": {"duration": 1000},
+        }
+        for i, status in enumerate(statuses)
+    ]
+
+
+def test_diff_between_reports():
+    previous = analyzer.aggregate_report(_cases(["failed", "failed", "passed"]))
+    current = analyzer.aggregate_report(_cases(["passed", "failed", "failed", "passed"]))
+    assert current["statuses"] == {"passed": 2, "failed": 2}
+    assert analyzer.diff_reports(previous, current) == {
+        "new_failures": {"count": 1, "examples": ["test_2"]},
+        "fixed": {"count": 1, "examples": ["test_0"]},
+        "still_failing": 1,
+        "added_tests": 1,
+        "removed_tests": 0,
+    }
+
+
+def test_prompt_is_compact_and_capped(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        llm_gateway, "generate", lambda prompt, **kw: calls.append((prompt, kw)) or "ok"
+    )
+    report = _cases(["failed", "passed"] * 5000)
+    prev = {"p1": {"timestamp": 1, "chunks": _cases(["passed"] * 10000)}}
+
+    result = analyzer.analyze_reports(report, prev, None)
+
+    prompt, kwargs = calls[0]
+    assert result == [{"rule": "auto-analysis", "message": "ok"}]
+    assert prompt_builder.estimate_tokens(prompt) <= analyzer.ANALYZER_PROMPT_TOKEN_BUDGET
+    assert "frame" not in prompt
+    assert '"new_failures":{"count":5000' in prompt
+    assert kwargs["timeout"] == analyzer.ANALYZER_LLM_TIMEOUT
+
+
+def test_team_analysis_reads_stored_aggregates(monkeypatch, tmp_path):
+    import stats_store
+
+    monkeypatch.setattr(stats_store, "STATS_DB_PATH", str(tmp_path / "stats.sqlite3"))
+    reports = [
+        _cases(["failed", "failed", "passed"]),
+        _cases(["passed", "failed", "failed", "passed"]),
+    ]
+    for ts, cases in enumerate(reports):
+        stats_store.record_report("team", f"r{ts}", ts, cases)
+
+    stored = analyzer.stored_aggregates("team")
+    assert stored == [analyzer.aggregate_report(cases) for cases in reports]
+
+    calls = []
+    monkeypatch.setattr(
+        llm_gateway, "generate", lambda prompt, **kw: calls.append(prompt) or "ok"
+    )
+    assert analyzer.analyze_team("team") == [{"rule": "auto-analysis", "message": "ok"}]
+    assert calls[0] == analyzer.build_prompt(stored[-1], stored[:-1])
+    assert analyzer.analyze_team("other") == []
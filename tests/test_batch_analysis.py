@@ -0,0 +1,112 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+pytest.importorskip("fastapi")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import main  # noqa: E402
+import qdrant_store  # noqa: E402
+import stats_store  # noqa: E402
+
+
+def _item(uuid, statuses, timestamp=100):
+    chunks = [
+        {"uid": f"{uuid}-{i}", "name": f"test_{i}", "status": status}
+        for i, status in enumerate(statuses)
+    ]
+    embeddings = np.eye(len(statuses), 4, dtype=np.float32)
+    return {
+        "uuid": uuid,
+        "report": chunks,
+        "timestamp": timestamp,
+        "chunks": chunks,
+        "team": "team",
+        "index": {},
+        "delta": None,
+        "embeddings": embeddings,
+        "stored": list(range(len(chunks))),
+        "stored_embeddings": embeddings,
+    }
+
+
+def test_process_team_chains_history_in_request_order(monkeypatch, tmp_path):
+    monkeypatch.setattr(stats_store, "STATS_DB_PATH", str(tmp_path / "stats.sqlite3"))
+    monkeypatch.setattr(main.report_snapshot, "REPORT_SNAPSHOT_DIR", str(tmp_path / "reports"))
+    client = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+    lookups = []
+    original = main.get_prev_report_chunks
+    monkeypatch.setattr(
+        main, "get_prev_report_chunks", lambda *a, **kw: lookups.append(a) or original(*a, **kw)
+    )
+    monkeypatch.setattr(main, "REPORTS_HISTORY_DEPTH", 2)
+
+    items = [
+        _item("r1", ["failed", "failed"]),
+        _item("r2", ["failed", "passed"]),
+        _item("r3", ["passed", "passed"]),
+    ]
+    results = main._process_team("team", items)
+
+    assert len(lookups) == 1
+    assert [list(prev) for _, prev, _ in results] == [[], ["r1"], ["r2"]]
+    assert [item["timestamp"] for item in items] == [100, 101, 102]
+    first, second, third = (regressions for _, _, regressions in results)
+    assert [c["name"] for c in first["new"]] == ["test_0", "test_1"]
+    assert [c["name"] for c in second["recurring"]] == ["test_0"]
+    assert [c["name"] for c in second["fixed"]] == ["test_1"]
+    assert [c["name"] for c in third["fixed"]] == ["test_0"]
+
+    stored = {p.payload["report_uuid"] for p in client.scroll("team", limit=100)[0]}
+    assert stored == {"r2", "r3"}
+    assert [r["uuid"] for r in stats_store.report_history("team")] == ["r1", "r2", "r3"]
+
+
+def test_batch_publishes_own_trend_image_per_report(monkeypatch, tmp_path):
+    pytest.importorskip("matplotlib.figure")
+    import plotter
+
+    monkeypatch.setattr(stats_store, "STATS_DB_PATH", str(tmp_path / "stats.sqlite3"))
+    monkeypatch.setattr(main.report_snapshot, "REPORT_SNAPSHOT_DIR", str(tmp_path / "reports"))
+    monkeypatch.setattr(plotter, "PLOT_DIR", str(tmp_path / "plots"))
+    client = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+
+    items = {
+        "r1": _item("r1", ["failed", "passed"]),
+        "r2": _item("r2", ["passed", "passed", "broken"]),
+    }
+    monkeypatch.setattr(main, "_load_report", lambda uuid, refresh=False: items[uuid])
+    monkeypatch.setattr(
+        main, "_embed_batch", lambda batch: [i.update(failure_clusters=[]) for i in batch]
+    )
+    monkeypatch.setattr(
+        main.utils,
+        "analyze_cases_with_llm",
+        lambda reports, team, trend, img_path, **kw: ("summary", [], img_path),
+    )
+    published = {}
+
+    def send(uuid, analysis, files=None):
+        image = files["trend-image"]
+        published[uuid] = (os.path.basename(image.name), image.read())
+        # Хвост отчёта выполняется внутри слота допуска своей команды
+        assert main.admission._SCHEDULER.snapshot()["team"][1] == 1
+
+    monkeypatch.setattr(main.utils, "send_analysis_to_allure", send)
+
+    lines = list(main._analyze_batch(["r1", "r2"], None))
+
+    assert len(lines) == 2 and all(b'"result":"ok"' in line for line in lines)
+    assert {uuid: name for uuid, (name, _) in published.items()} == {
+        "r1": "trend_summary_r1.png",
+        "r2": "trend_summary_r2.png",
+    }
+    assert published["r1"][1] != published["r2"][1]
+    assert all(data.startswith(b"\x89PNG") for _, data in published.values())
+    assert main.admission._SCHEDULER.snapshot()["team"] == (0, 0)
+    team_dir = os.path.join(plotter.PLOT_DIR, plotter.normalize_collection_name("team"))
+    assert not [f for f in os.listdir(team_dir) if f.startswith("trend_summary")]
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import embedding_server
+
+
+class CountingModel:
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_remote_model_encodes_through_server(tmp_path):
+    socket_path = str(tmp_path / "embedder.sock")
+    server = embedding_server.EmbeddingServer(socket_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        server.set_model(CountingModel())
+        model = embedding_server.RemoteModel(socket_path, timeout=5)
+        embs = model.encode(["a", "abc"], convert_to_numpy=True, normalize_embeddings=True)
+        assert embs.shape == (2, 2)
+        assert embs[:, 0].tolist() == [1.0, 3.0]
+        assert model.encode([]).shape[0] == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_remote_model_does_not_retry_after_timeout(tmp_path):
+    calls = []
+
+    class SlowModel(CountingModel):
+        def encode(self, texts, **kwargs):
+            calls.append(list(texts))
+            threading.Event().wait(0.5)
+            return super().encode(texts)
+
+    socket_path = str(tmp_path / "embedder.sock")
+    server = embedding_server.EmbeddingServer(socket_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        server.set_model(SlowModel())
+        model = embedding_server.RemoteModel(socket_path, timeout=0.1)
+        with pytest.raises(TimeoutError):
+            model.encode(["a"])
+        threading.Event().wait(0.6)
+        assert calls == [["a"]]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import error_signature
+
+
+def test_volatile_tokens_are_normalized():
+    a = {"statusMessage": "Order 8f14e45f-ceea-467f-a1b2-3c4d5e6f7a8b failed at 2024-05-01T10:00:01Z after 35 ms"}
+    b = {"statusMessage": "Order 1b9d6bcd-bbfd-4b2d-9b5d-ab8dfbbd4bed failed at 2024-06-11 12:30:59 after 7 ms"}
+    assert error_signature.error_signature(a) == error_signature.error_signature(b)
+    assert error_signature.error_signature(a) == "Order <uuid> failed at <ts> after <n> ms"
+    assert error_signature.normalize("obj@1a2b3c4d at 0xDEADBEEF") == "obj@<addr> at <addr>"
+
+
+def test_signature_falls_back_to_trace_and_detects_locators():
+    case = {"statusTrace": "org.openqa.selenium.NoSuchElementException: x\n\tat Foo.bar(Foo.java:12)"}
+    info = error_signature.signature_info(case)
+    assert info["signature"] == "org.openqa.selenium.NoSuchElementException: x"
+    assert info["locator"]
+    assert not error_signature.signature_info({"statusMessage": "boom"})["locator"]
+
+
+def test_signatures_are_memoized():
+    case = {"statusMessage": "memo", "statusTrace": "x" * 100000}
+    error_signature.signature_info(case)
+    before = error_signature.cache_stats()
+    error_signature.signature_info(dict(case))
+    after = error_signature.cache_stats()
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import failure_clustering  # noqa: E402
+
+
+def test_cluster_embeddings_groups_similar_vectors():
+    vectors = np.array(
+        [[1, 0, 0], [0.99, 0.05, 0], [0, 1, 0], [0, 0.98, 0.1], [0, 0, 1]],
+        dtype=np.float32,
+    )
+    labels = failure_clustering.cluster_embeddings(vectors, threshold=0.9, batch_size=2)
+    assert labels.tolist() == [0, 0, 1, 1, 2]
+
+
+def test_cluster_embeddings_distinct_vectors_across_batches():
+    vectors = np.eye(7, dtype=np.float32)
+    vectors[6] = [0.99, 0.05, 0, 0, 0, 0, 0]
+    labels = failure_clustering.cluster_embeddings(vectors, threshold=0.9, batch_size=2)
+    assert labels.tolist() == [0, 1, 2, 3, 4, 5, 0]
+
+
+def test_cluster_failures_summarizes_clusters():
+    cases = [
+        {"name": "a", "status": "failed", "statusMessage": "Timeout\nmore"},
+        {"name": "b", "status": "broken", "statusMessage": "Timeout"},
+        {"name": "c", "status": "failed", "statusMessage": "NPE"},
+    ]
+    vectors = [[1, 0], [1, 0.01], [0, 1]]
+    clusters = failure_clustering.cluster_failures(cases, vectors, threshold=0.9)
+    assert clusters[0]["size"] == 2
+    assert clusters[0]["message"] == "Timeout"
+    assert clusters[0]["statuses"] == {"failed": 1, "broken": 1}
+    assert failure_clustering.format_cluster(clusters[0]) == "x2 Timeout (тесты: a, b)"
+    assert failure_clustering.cluster_failures([], []) == []
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import flakiness  # noqa: E402
+import stats_store  # noqa: E402
+
+P, F, B, S, A = (*(stats_store.STATUS_CODES[s] for s in stats_store.STATUSES), stats_store.ABSENT)
+
+
+def test_compute_flips_streaks_and_durations(monkeypatch):
+    monkeypatch.setattr(flakiness, "FLAKY_MIN_RUNS", 3)
+    status = np.array(
+        [
+            [P, F, P, F, P, F],  # flips every run
+            [P, P, A, F, S, B],  # absent and skipped runs are ignored
+            [F, F, F, F, F, F],  # never passed
+            [P, P, P, P, P, P],  # slowed down in the last run
+        ],
+        dtype=np.int8,
+    )
+    duration = np.full(status.shape, 100, dtype=np.float32)
+    duration[3] = [100, 110, 90, 100, 105, 400]
+
+    m = flakiness.compute(status, duration)
+    assert m["runs"].tolist() == [6, 4, 6, 6]
+    assert m["flips"].tolist() == [5, 1, 0, 0]
+    assert m["flip_rate"][0] == 1.0
+    assert m["streak"].tolist() == [1, 2, 6, 0]
+    assert m["duration_z"][3] > 30
+    assert np.isnan(m["duration_z"][2])
+
+    picked = flakiness.offenders(m)
+    assert picked["flaky"].tolist() == [0]
+    assert picked["streaks"].tolist() == [2]
+    assert picked["slow"].tolist() == [3]
+
+
+def test_analyze_team_reads_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(stats_store, "STATS_DB_PATH", str(tmp_path / "stats.sqlite3"))
+    for ts in range(6):
+        cases = [
+            {"name": "login", "status": "failed" if ts % 2 else "passed"},
+            {"name": "cart", "status": "passed"},
+        ]
+        stats_store.record_report("team", f"r{ts}", ts, cases)
+
+    result = flakiness.analyze_team("team")
+    assert result["reports"] == 6
+    assert [t["test"] for t in result["flaky"]] == ["login"]
+    (entry,) = flakiness.analytics_entries(result)
+    assert entry["rule"] == "flaky-tests"
+    assert entry["message"].startswith("Нестабильные тесты за 6 отчётов: login")
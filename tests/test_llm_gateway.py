@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import time
+import types
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.modules.setdefault("requests", types.SimpleNamespace(post=lambda *a, **k: None))
+import llm_gateway  # noqa: E402
+
+
+def test_gate_serves_waiters_by_priority():
+    gate = llm_gateway.PriorityGate(1)
+    assert gate.acquire()
+    order = []
+
+    def waiter(priority, name):
+        assert gate.acquire(priority, timeout=5)
+        order.append(name)
+        gate.release()
+
+    threads = [
+        threading.Thread(target=waiter, args=(llm_gateway.PRIORITY_NORMAL, "normal")),
+        threading.Thread(target=waiter, args=(llm_gateway.PRIORITY_HIGH, "high")),
+    ]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    assert gate.queue_depth == 2
+    gate.release()
+    for t in threads:
+        t.join()
+    assert order == ["high", "normal"]
+    assert gate.active == 0
+
+
+def test_gate_timeout_and_cancel():
+    gate = llm_gateway.PriorityGate(1)
+    assert gate.acquire()
+    assert not gate.acquire(timeout=0.05)
+    cancel = threading.Event()
+    cancel.set()
+    assert not gate.acquire(timeout=5, cancel=cancel)
+    gate.release()
+    assert gate.active == 0 and gate.queue_depth == 0
+
+
+def test_generate_raises_on_queue_deadline(monkeypatch):
+    gate = llm_gateway.PriorityGate(1)
+    gate.acquire()
+    monkeypatch.setattr(llm_gateway, "_GATE", gate)
+    try:
+        llm_gateway.generate("prompt", queue_deadline=0.01)
+    except llm_gateway.LLMQueueTimeout:
+        pass
+    else:
+        raise AssertionError("LLMQueueTimeout expected")
+
+
+def test_priority_for_branch():
+    assert llm_gateway.priority_for_branch("main") == llm_gateway.PRIORITY_HIGH
+    assert llm_gateway.priority_for_branch("feature/x") == llm_gateway.PRIORITY_NORMAL
+    assert llm_gateway.priority_for_branch(None) == llm_gateway.PRIORITY_NORMAL
+
+
+def test_cancel_scope_cancels_queued_calls(monkeypatch):
+    gate = llm_gateway.PriorityGate(1)
+    gate.acquire()
+    monkeypatch.setattr(llm_gateway, "_GATE", gate)
+    cancel = threading.Event()
+    cancel.set()
+    with llm_gateway.cancel_scope(cancel):
+        try:
+            llm_gateway.generate("prompt", queue_deadline=5)
+        except llm_gateway.LLMCancelled:
+            pass
+        else:
+            raise AssertionError("LLMCancelled expected")
+    assert llm_gateway._CANCEL.get() is None
+    assert gate.queue_depth == 0
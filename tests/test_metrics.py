@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import metrics
+
+
+def test_span_records_timings_and_sizes():
+    with metrics.collect_timings() as timings:
+        with metrics.span("test_stage", cases=3) as sp:
+            metrics.add_size(bytes=10)
+            metrics.add_size(bytes=5)
+            sp["chunks"] = 2
+    assert len(timings) == 1
+    record = timings[0]
+    assert record["stage"] == "test_stage"
+    assert record["cases"] == 3 and record["bytes"] == 15 and record["chunks"] == 2
+    assert record["seconds"] >= 0
+
+    text = metrics.render()
+    assert 'rag_stage_duration_seconds_count{stage="test_stage"} 1' in text
+    assert 'rag_stage_payload_size_sum{stage="test_stage",unit="bytes"} 15' in text
+
+
+def test_spans_outside_collect_timings_are_not_kept():
+    with metrics.span("untracked"):
+        pass
+    with metrics.collect_timings() as timings:
+        pass
+    assert timings == []
+
+
+def test_histogram_buckets_are_cumulative_and_labels_escaped():
+    hist = metrics.Histogram("h", "help", ("name",), buckets=(1, 10))
+    hist.observe(0.5, name='a"b')
+    hist.observe(5, name='a"b')
+    lines = hist.render()
+    assert 'h_bucket{name="a\\"b",le="1"} 1' in lines
+    assert 'h_bucket{name="a\\"b",le="10"} 2' in lines
+    assert 'h_bucket{name="a\\"b",le="+Inf"} 2' in lines
+    assert 'h_count{name="a\\"b"} 2' in lines
+
+
+def test_collectors_refresh_values_on_render():
+    gauge = metrics.gauge("rag_test_collected", "Test gauge.", ("queue",))
+    metrics.register_collector(lambda: [(gauge, {"queue": "q"}, 7)])
+    assert 'rag_test_collected{queue="q"} 7' in metrics.render()
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import migrate_collections  # noqa: E402
+import qdrant_store  # noqa: E402
+
+
+def _chunks(run, n=3):
+    return [{"uid": f"{run}-{i}", "name": f"test {i}", "status": "failed"} for i in range(n)]
+
+
+def _vectors(n=3):
+    return np.eye(n, 4, dtype=np.float32) + 0.01
+
+
+@pytest.fixture
+def store(monkeypatch):
+    client = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+    return client
+
+
+def test_shared_mode_isolates_teams(store, monkeypatch):
+    monkeypatch.setattr(qdrant_store, "QDRANT_COLLECTION_MODE", "shared")
+    for team in ("Team A", "Team B"):
+        for run, ts in (("r1", 1), ("r2", 2), ("r3", 3)):
+            qdrant_store.save_report_chunks(team, f"{team}-{run}", _chunks(run), _vectors(), ts)
+
+    assert [c.name for c in store.get_collections().collections] == ["test_cases"]
+    prev = qdrant_store.get_prev_report_chunks("Team A", "Team A-r3", limit=5)
+    assert set(prev) == {"Team A-r1", "Team A-r2"}
+
+    hits = qdrant_store.search_cases("Team B", _vectors()[0], limit=50)
+    assert hits and all(h["payload"]["tenant"] == "Team_B" for h in hits)
+
+    qdrant_store.maintain_last_n_reports("Team A", 1, "Team A-r3")
+    assert set(qdrant_store.get_prev_report_chunks("Team A", None, limit=5)) == {"Team A-r3"}
+    assert len(qdrant_store.get_prev_report_chunks("Team B", None, limit=5)) == 3
+
+
+def test_migrate_per_team_collections(store, monkeypatch):
+    for team in ("Team A", "Team B"):
+        qdrant_store.save_report_chunks(team, f"{team}-r1", _chunks("r1"), _vectors(), 1)
+
+    assert migrate_collections.migrate(store, "test_cases", batch_size=2, delete_source=True) == {
+        "Team_A": 3,
+        "Team_B": 3,
+    }
+    assert [c.name for c in store.get_collections().collections] == ["test_cases"]
+
+    monkeypatch.setattr(qdrant_store, "QDRANT_COLLECTION_MODE", "shared")
+    prev = qdrant_store.get_prev_report_chunks("Team A", None, limit=5)
+    assert list(prev) == ["Team A-r1"]
+    assert len(prev["Team A-r1"]["chunks"]) == 3
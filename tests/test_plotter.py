@@ -1,6 +1,9 @@
 import os
 import pytest
 matplotlib = pytest.importorskip('matplotlib')
+# plotter imports matplotlib lazily; load the real module before other tests
+# register their stubs for it
+pytest.importorskip('matplotlib.figure')
 import plotter  # noqa: E402
 
 matplotlib.use('Agg')
@@ -17,6 +20,6 @@ def test_team_plot_saving(tmp_path):
     team_dir = os.path.join(plotter.PLOT_DIR, plotter.normalize_collection_name(team))
     assert os.path.isdir(team_dir)
     assert os.path.isfile(os.path.join(team_dir, "trend_uid1.png"))
-    assert os.path.isfile(os.path.join(team_dir, "trend_summary.png"))
+    assert os.path.isfile(os.path.join(team_dir, "trend_summary_uid1.png"))
 
     plotter.PLOT_DIR = old_dir
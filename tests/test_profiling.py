@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import profiling
+
+
+def test_should_profile_by_header_or_sampling(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    assert profiling.should_profile("1")
+    assert not profiling.should_profile(None)
+    assert not profiling.should_profile("0")
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    assert profiling.should_profile(None)
+
+
+def test_profile_run_stores_artefacts_with_retention(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 2)
+    paths = []
+    for i in range(3):
+        with profiling.profile_run(f"uuid/{i}", True) as info:
+            sum(range(1000))
+        paths.append(info["path"])
+
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(p) + ext for p in paths[1:] for ext in (".prof", ".tracemalloc", ".txt")
+    )
+    with open(paths[-1] + ".txt", encoding="utf-8") as f:
+        assert "Top allocations" in f.read()
+
+
+def test_profile_run_disabled_yields_none(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    with profiling.profile_run("x", False) as info:
+        pass
+    assert info is None
+    assert not os.listdir(tmp_path)
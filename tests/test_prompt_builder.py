@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import prompt_builder
+from prompt_builder import PromptSection
+
+
+def test_summarize_items_aggregates_long_lists():
+    assert prompt_builder.summarize_items([]) == "нет"
+    assert prompt_builder.summarize_items(["a", "b", "a"], top_k=3) == "a x2, b"
+    text = prompt_builder.summarize_items([f"t{i}" for i in range(100)], top_k=2)
+    assert text == "100 шт., например: t0, t1"
+
+
+def test_summarize_missing_fields_counts_per_field():
+    missing = [(1, ["jira"]), (2, ["jira", "owner"]), (3, ["jira"])]
+    text = prompt_builder.summarize_missing_fields(missing, top_k=2)
+    assert text == "jira: 3 (1, 2 …); owner: 1 (2)"
+
+
+def test_build_prompt_respects_budget_and_order():
+    sections = [
+        PromptSection("header\n", priority=0),
+        PromptSection("x" * 3000 + "\n", priority=5),
+        PromptSection("statuses\n", priority=0),
+    ]
+    prompt = prompt_builder.build_prompt(sections, "END", budget=100)
+    assert prompt_builder.estimate_tokens(prompt) <= 100
+    assert prompt.startswith("header\n")
+    assert prompt.index("statuses") > prompt.index("x")
+    assert prompt_builder.TRUNCATION_MARK in prompt
+    assert prompt.endswith("END")
+
+
+def test_build_prompt_without_budget_keeps_everything():
+    sections = [PromptSection("a" * 10000, priority=9)]
+    assert len(prompt_builder.build_prompt(sections, "", budget=0)) == 10000
@@ -0,0 +1,118 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import qdrant_store  # noqa: E402
+import regression  # noqa: E402
+
+
+def _vec(i):
+    v = np.zeros(4, dtype=np.float32)
+    v[i] = 1.0
+    return v
+
+
+def test_classify_failures_against_previous_report(monkeypatch):
+    client = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+
+    prev = [
+        {"uid": "p1", "name": "login", "status": "failed"},
+        {"uid": "p2", "name": "search", "status": "failed"},
+        {"uid": "p3", "name": "cart", "status": "passed"},
+    ]
+    qdrant_store.save_report_chunks(
+        "team", "prev", prev, np.stack([_vec(0), _vec(1), _vec(2)]), 100
+    )
+    current = [
+        {"uid": "c1", "name": "login", "status": "failed"},
+        {"uid": "c2", "name": "search", "status": "passed"},
+        {"uid": "c3", "name": "cart", "status": "broken"},
+    ]
+    prev_reports = qdrant_store.get_prev_report_chunks("team", exclude_uuid="cur")
+
+    result = regression.classify_failures(
+        "team", current, np.stack([_vec(0), _vec(1), _vec(2)]), prev_reports
+    )
+    assert [c["name"] for c in result["recurring"]] == ["login"]
+    assert [c["name"] for c in result["new"]] == ["cart"]
+    assert [c["name"] for c in result["fixed"]] == ["search"]
+
+    entries = regression.regression_entries(result)
+    assert entries[0] == {"rule": "regression-new", "message": "Новые падения: 1 (cart)"}
+
+
+def test_classify_failures_without_history():
+    current = [{"uid": "c1", "name": "login", "status": "failed"}]
+    result = regression.classify_failures("team", current, [_vec(0)], {})
+    assert result == {"new": current, "recurring": [], "fixed": []}
+
+
+def test_classify_failures_matches_same_description_tests_by_identity(monkeypatch):
+    client = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+
+    # Параметризованный тест: одно описание, значит и одинаковые векторы
+    prev = [
+        {"uid": "p1", "name": "login", "historyId": "h1", "status": "failed"},
+        {"uid": "p2", "name": "login", "historyId": "h2", "status": "failed"},
+        {"uid": "p3", "name": "logout", "status": "passed"},
+    ]
+    qdrant_store.save_report_chunks(
+        "team", "prev", prev, np.stack([_vec(0), _vec(0), _vec(0)]), 100
+    )
+    current = [
+        {"uid": "c1", "name": "login", "historyId": "h1", "status": "failed"},
+        {"uid": "c2", "name": "login", "historyId": "h2", "status": "failed"},
+        {"uid": "c3", "name": "logout", "status": "failed"},
+    ]
+    prev_reports = qdrant_store.get_prev_report_chunks("team", exclude_uuid="cur")
+
+    result = regression.classify_failures(
+        "team", current, np.stack([_vec(0), _vec(0), _vec(0)]), prev_reports
+    )
+    assert [c["uid"] for c in result["recurring"]] == ["c1", "c2"]
+    assert [c["uid"] for c in result["new"]] == ["c3"]
+    assert result["fixed"] == []
+
+
+def test_classify_failures_falls_back_to_vectors_for_renamed_tests(monkeypatch):
+    client = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+
+    prev = [{"uid": "p1", "name": "login old", "status": "failed"}]
+    qdrant_store.save_report_chunks("team", "prev", prev, np.stack([_vec(0)]), 100)
+    current = [{"uid": "c1", "name": "login", "status": "failed"}]
+    prev_reports = qdrant_store.get_prev_report_chunks("team", exclude_uuid="cur")
+
+    result = regression.classify_failures("team", current, np.stack([_vec(0)]), prev_reports)
+    assert [c["uid"] for c in result["recurring"]] == ["c1"]
+    assert result["fixed"] == []
+
+
+def test_classify_failures_reads_whole_previous_reports(monkeypatch):
+    client = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+    monkeypatch.setattr(qdrant_store, "QDRANT_SCROLL_PAGE", 500)
+
+    n = 1200
+    prev = [{"uid": f"p{i}", "name": f"test {i}", "status": "failed"} for i in range(n)]
+    vectors = np.stack([_vec(i % 4) for i in range(n)])
+    qdrant_store.save_report_chunks("team", "prev", prev, vectors, 100)
+    # Тест 0 починили, тест 1 удалили, остальные падают как раньше
+    current = [{"uid": "c0", "name": "test 0", "status": "passed"}] + [
+        {"uid": f"c{i}", "name": f"test {i}", "status": "failed"} for i in range(2, n)
+    ]
+    prev_reports = qdrant_store.get_prev_report_chunks("team", exclude_uuid="cur")
+    assert len(prev_reports["prev"]["chunks"]) == n
+
+    result = regression.classify_failures(
+        "team", current, np.stack([_vec(3)] * len(current)), prev_reports
+    )
+    assert result["new"] == []
+    assert len(result["recurring"]) == n - 2
+    assert [c["uid"] for c in result["fixed"]] == ["p0"]
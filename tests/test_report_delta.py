@@ -0,0 +1,142 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+pytest.importorskip("fastapi")
+pytest.importorskip("zstandard")
+pytest.importorskip("msgpack")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import embedder  # noqa: E402
+import main  # noqa: E402
+import qdrant_store  # noqa: E402
+import report_delta  # noqa: E402
+import report_snapshot  # noqa: E402
+
+
+class CountingModel:
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        self.texts.extend(texts)
+        vectors = np.array([[len(t) % 7 + 1, len(t) % 5 + 1, 1.0, 0.5] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _cases(n, failed=()):
+    return [
+        {
+            "uid": str(i),
+            "name": f"test {i}",
+            "status": "failed" if i in failed else "passed",
+            "statusMessage": f"boom {i}" if i in failed else None,
+            "labels": [{"name": "parentSuite", "value": "Team"}],
+        }
+        for i in range(n)
+    ]
+
+
+def _analyze_storage(uuid):
+    item = main._load_report(uuid)
+    main._embed_batch([item])
+    main._store_reports(item["team"], [item])
+    return item
+
+
+def test_diff_by_uid_and_content():
+    old = report_delta.case_index(_cases(3))
+    cases = _cases(4, failed={1})
+    del cases[0]
+    assert report_delta.diff(old, report_delta.case_index(cases)) == {
+        "added": {"3"},
+        "changed": {"1"},
+        "removed": {"0"},
+        "unchanged": {"2"},
+    }
+    assert report_delta.case_hash({"a": 1, "b": 2}) == report_delta.case_hash({"b": 2, "a": 1})
+
+
+def test_reanalysis_embeds_and_stores_only_the_delta(monkeypatch, tmp_path):
+    monkeypatch.setattr(report_snapshot, "REPORT_SNAPSHOT_DIR", str(tmp_path))
+    store = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: store)
+    model = CountingModel()
+    monkeypatch.setattr(embedder, "_MODEL", model)
+    monkeypatch.setattr(embedder, "_FAILURE_CACHE", type(embedder._FAILURE_CACHE)())
+    reports = [(_cases(10, failed={2, 5}), 1000)]
+    monkeypatch.setattr(main, "fetch_allure_report", lambda uuid, refresh=False: reports[-1])
+
+    first = _analyze_storage("r1")
+    assert first["delta"] is None
+    assert sum(t.startswith("passage: test") for t in model.texts) == 10
+
+    # Перезапуск: тест 5 починили, тест 9 пропал, добавился тест 10
+    cases = _cases(11, failed={2})
+    del cases[9]
+    reports.append((cases, 2000))
+    model.texts.clear()
+    second = _analyze_storage("r1")
+
+    assert {k: sorted(v) for k, v in second["delta"].items() if k != "unchanged"} == {
+        "added": ["10"],
+        "changed": ["5"],
+        "removed": ["9"],
+    }
+    assert model.texts == ["passage: test 5", "passage: test 10"]
+    assert second["timestamp"] == 1000
+    assert second["embeddings"][2] is not None
+    points = store.scroll("Team", limit=100)[0]
+    assert sorted(int(p.payload["uid"]) for p in points) == [0, 1, 2, 3, 4, 5, 6, 7, 8, 10]
+    assert {p.payload["timestamp"] for p in points} == {1000}
+
+    # Свежий снимок отчёта не теряет индекс анализа
+    report_snapshot.save_snapshot("r1", cases, 3000)
+    assert report_snapshot.load_index("r1")["cases"] == second["index"]
+
+
+def test_deep_step_trees_are_diffed(monkeypatch, tmp_path):
+    monkeypatch.setattr(report_snapshot, "REPORT_SNAPSHOT_DIR", str(tmp_path))
+    store = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: store)
+    monkeypatch.setattr(embedder, "_MODEL", CountingModel())
+    monkeypatch.setattr(embedder, "_FAILURE_CACHE", type(embedder._FAILURE_CACHE)())
+    # Глубже, чем orjson сериализует (255 уровней)
+    cases = _cases(3, failed={1})
+    step = cases[1]
+    for i in range(400):
+        step["steps"] = [{"name": f"level {i}", "status": "failed"}]
+        step = step["steps"][0]
+    with pytest.raises(Exception):
+        main.serialization.dumps(cases[1])
+    monkeypatch.setattr(main, "fetch_allure_report", lambda uuid, refresh=False: (cases, 1000))
+
+    assert _analyze_storage("r1")["delta"] is None
+    second = _analyze_storage("r1")
+    assert second["delta"]["unchanged"] == {"0", "1", "2"}
+
+    def fail(case):
+        raise TypeError("unhashable")
+
+    monkeypatch.setattr(report_delta, "case_hash", fail)
+    third = _analyze_storage("r1")
+    assert third["delta"] is None and third["index"] == {}
+
+
+def test_plain_reanalysis_picks_up_rerun_cases(monkeypatch, tmp_path):
+    import report_fetcher
+
+    monkeypatch.setattr(report_snapshot, "REPORT_SNAPSHOT_DIR", str(tmp_path))
+    store = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: store)
+    monkeypatch.setattr(embedder, "_MODEL", CountingModel())
+    monkeypatch.setattr(embedder, "_FAILURE_CACHE", type(embedder._FAILURE_CACHE)())
+    # Ответы Allure: после перезапуска в CI тест 1 прошёл
+    responses = [(_cases(3, failed={1}), 1000), (_cases(3), 2000)]
+    monkeypatch.setattr(report_fetcher, "_fetch_from_allure", lambda uuid: responses.pop(0))
+
+    assert _analyze_storage("r1")["delta"] is None
+    second = _analyze_storage("r1")
+    assert second["delta"]["changed"] == {"1"}
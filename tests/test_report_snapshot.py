@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("zstandard")
+pytest.importorskip("msgpack")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import report_snapshot  # noqa: E402
+
+CASES = [
+    {
+        "uid": "1",
+        "name": "login",
+        "status": "failed",
+        "time": {"start": 1, "duration": 20},
+        "steps": [{"name": "open", "steps": []}],
+        "statusTrace": "Traceback ...",
+    },
+    {"uid": "2", "name": "cart", "status": "passed", "description": None},
+]
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(report_snapshot, "REPORT_SNAPSHOT_DIR", str(tmp_path))
+
+
+def test_round_trip_and_projection():
+    assert report_snapshot.load_snapshot("../r1") is None
+    path = report_snapshot.save_snapshot("../r1", CASES, 123)
+    assert os.path.dirname(path) == report_snapshot.REPORT_SNAPSHOT_DIR
+
+    cases, timestamp = report_snapshot.load_snapshot("../r1")
+    assert timestamp == 123
+    assert cases == [CASES[0], {"uid": "2", "name": "cart", "status": "passed"}]
+
+    projected, _ = report_snapshot.load_snapshot("../r1", columns=["uid", "status", "labels"])
+    assert projected == [{"uid": "1", "status": "failed"}, {"uid": "2", "status": "passed"}]
+    assert report_snapshot.load_columns("../r1", ["steps"]) == {"steps": [CASES[0]["steps"], None]}
+
+
+def test_old_snapshots_are_removed(monkeypatch):
+    monkeypatch.setattr(report_snapshot, "REPORT_SNAPSHOT_KEEP", 2)
+    for i in range(3):
+        report_snapshot.save_snapshot(f"r{i}", CASES, i)
+        os.utime(report_snapshot.snapshot_path(f"r{i}"), (i, i))
+    report_snapshot.save_snapshot("r3", CASES, 3)
+    assert [report_snapshot.has_snapshot(f"r{i}") for i in range(4)] == [False, False, True, True]
+
+
+def test_fetch_prefers_allure_and_falls_back_to_snapshot(monkeypatch):
+    requests = pytest.importorskip("requests")
+    import report_fetcher
+
+    responses = [(CASES[:1], 100), (CASES, 200)]
+    monkeypatch.setattr(report_fetcher, "_fetch_from_allure", lambda uuid: responses.pop(0))
+    assert report_fetcher.fetch_allure_report("r1") == (CASES[:1], 100)
+    # Перезапуски в CI видны без флага refresh
+    assert report_fetcher.fetch_allure_report("r1") == (CASES, 200)
+    cases, timestamp = report_fetcher.fetch_allure_report("r1", refresh=False)
+    assert ([c["uid"] for c in cases], timestamp) == (["1", "2"], 200)
+
+    def down(uuid):
+        raise requests.ConnectionError("Allure is down")
+
+    monkeypatch.setattr(report_fetcher, "_fetch_from_allure", down)
+    assert report_fetcher.fetch_allure_report("r1")[1] == 200
+    with pytest.raises(requests.ConnectionError):
+        report_fetcher.fetch_allure_report("r2")
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from fastapi.testclient import TestClient  # noqa: E402
+
+import embedder  # noqa: E402
+import main  # noqa: E402
+import qdrant_store  # noqa: E402
+
+WORDS = ["login", "cart", "search"]
+
+
+class KeywordModel:
+    """Vector with a 1 for every known word of the text."""
+
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        self.texts.extend(texts)
+        vectors = np.array([[w in t for w in WORDS] + [0.1] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = qdrant_client.QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: store)
+    model = KeywordModel()
+    monkeypatch.setattr(embedder, "_MODEL", model)
+    monkeypatch.setattr(embedder, "_QUERY_CACHE", type(embedder._QUERY_CACHE)())
+    for run, ts in (("r1", 100), ("r2", 200)):
+        chunks = [
+            {"uid": f"{run}-{w}", "name": f"{w} test", "status": "failed" if w == "login" else "passed",
+             "steps": [{"name": "heavy"}]}
+            for w in WORDS
+        ]
+        qdrant_store.save_report_chunks("Team A", run, chunks, embedder.generate_embeddings(chunks), ts)
+    return TestClient(main.app), model
+
+
+def test_search_filters_and_pages(client):
+    http, model = client
+    resp = http.post("/search", json={"query": "login", "team": "Team A", "limit": 1})
+    body = resp.json()
+    assert resp.status_code == 200
+    assert [r["name"] for r in body["results"]] == ["login test"]
+    assert "steps" not in body["results"][0]
+    assert body["next_offset"] == 1
+    assert "query: login" in model.texts
+
+    body = http.post(
+        "/search",
+        json={"query": "login", "team": "Team A", "statuses": ["passed"], "time_from": 150,
+              "fields": ["uid"], "limit": 5},
+    ).json()
+    assert sorted(r["uid"] for r in body["results"]) == ["r2-cart", "r2-search"]
+    assert body["next_offset"] is None
+
+    # Повторный запрос берёт вектор из кэша
+    encoded = len(model.texts)
+    http.post("/search", json={"query": "login ", "team": "Team A"})
+    assert len(model.texts) == encoded
+
+    assert http.post("/search", json={"query": "x", "team": "nobody"}).json()["results"] == []
+    assert http.post("/search", json={"query": "x", "team": "Team A", "limit": 0}).status_code == 422
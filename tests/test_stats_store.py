@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import stats_store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def db(monkeypatch, tmp_path):
+    monkeypatch.setattr(stats_store, "STATS_DB_PATH", str(tmp_path / "stats.sqlite3"))
+
+
+def _case(name, status, duration=100, message=None, flaky=False):
+    return {
+        "fullName": f"suite.{name}",
+        "name": name,
+        "status": status,
+        "time": {"duration": duration},
+        "statusMessage": message,
+        "flaky": flaky,
+    }
+
+
+def test_history_and_flaky_tests():
+    runs = [
+        ("r1", ["passed", "passed", "failed"]),
+        ("r2", ["failed", "passed", "failed"]),
+        ("r3", ["passed", "passed", "failed"]),
+        ("r4", ["failed", "skipped", "failed"]),
+    ]
+    for ts, (uuid, statuses) in enumerate(runs):
+        cases = [
+            _case(f"t{i}", status, message=f"Timeout after {ts}s" if status == "failed" else None)
+            for i, status in enumerate(statuses)
+        ]
+        stats_store.record_report("team", uuid, 100 + ts, cases)
+    # Повторная запись отчёта заменяет его
+    stats_store.record_report("team", "r4", 103, [_case("t0", "failed", message="Timeout after 3s")] + [
+        _case("t1", "skipped"), _case("t2", "failed", message="Timeout after 3s")
+    ])
+
+    history = stats_store.report_history("team", depth=3)
+    assert [r["uuid"] for r in history] == ["r2", "r3", "r4"]
+    assert history[-1]["failed"] == 2 and history[-1]["skipped"] == 1
+    assert history[-1]["duration_ms"] == 300
+    assert [r["uuid"] for r in stats_store.report_history("team", until=101)] == ["r1", "r2"]
+    assert stats_store.format_trend(history[:1]) == "1-й: passed=1, failed=2, broken=0, skipped=0"
+
+    outcomes = stats_store.load_outcomes("team", depth=4)
+    assert outcomes["uuids"] == ["r1", "r2", "r3", "r4"]
+    names = stats_store.names_for_ids("team", outcomes["test_ids"])
+    row = [names[i] for i in outcomes["test_ids"]].index("suite.t0")
+    codes = stats_store.STATUS_CODES
+    assert outcomes["status"][row].tolist() == [codes["passed"], codes["failed"], codes["passed"], codes["failed"]]
+    assert outcomes["duration"][row].tolist() == [100.0] * 4
+
+    ((signature, count, reports),) = stats_store.top_signatures("team", depth=4)
+    assert signature.startswith("Timeout after <n>s")
+    assert (count, reports) == (6, 4)
+
+
+def test_old_reports_are_pruned(monkeypatch):
+    monkeypatch.setattr(stats_store, "STATS_KEEP_REPORTS", 2)
+    for ts in range(4):
+        stats_store.record_report("team", f"r{ts}", ts, [_case("t", "passed")])
+    assert [r["uuid"] for r in stats_store.report_history("team")] == ["r2", "r3"]
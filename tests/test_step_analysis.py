@@ -0,0 +1,76 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import step_analysis  # noqa: E402
+from chunker import chunk_report  # noqa: E402
+from step_analysis import (  # noqa: E402
+    failure_locations,
+    iter_steps,
+    step_name_counts,
+    summarize_steps,
+)
+
+STEPS = [
+    {"name": "open", "status": "passed", "time": {"duration": 10}},
+    {
+        "name": "login",
+        "status": "failed",
+        "time": {"start": 100, "stop": 400},
+        "steps": [
+            {"name": "type", "status": "passed", "time": {"duration": 20}},
+            {"name": "submit", "status": "failed", "time": {"duration": 250}},
+        ],
+    },
+    {"name": "logout", "status": "broken", "time": {"duration": 5}},
+]
+
+
+def _deep(depth):
+    root = step = {"name": "level 0", "status": "passed"}
+    for i in range(1, depth):
+        child = {"name": f"level {i}", "status": "passed"}
+        step["steps"] = [child]
+        step = child
+    step["status"] = "failed"
+    return [root]
+
+
+def test_summary_counts_durations_and_failure():
+    summary = summarize_steps(STEPS)
+    assert summary["count"] == 5
+    assert summary["depth"] == 2
+    assert summary["failed"] == 3
+    assert summary["duration"] == 315
+    assert summary["slowest"] == {"name": "login", "duration": 300}
+    assert summary["failure"] == "login > submit"
+    assert summary["names"]["submit"] == 1
+    assert summary["fingerprint"] == summarize_steps(
+        [{**s, "status": "passed"} for s in STEPS]
+    )["fingerprint"]
+    assert summarize_steps(None) is None
+
+
+def test_deep_tree_is_walked_without_recursion():
+    depth = sys.getrecursionlimit() * 3
+    steps = _deep(depth)
+    assert [d for d, _, _ in iter_steps(steps)][-1] == depth - 1
+    summary = summarize_steps(steps)
+    assert summary["depth"] == depth
+    assert summary["failure"].endswith(f"level {depth - 1}")
+    # В payload остаётся только хвост пути падения
+    parts = summary["failure"].split(" > ")
+    assert parts[0] == "…"
+    assert len(parts) == step_analysis.STEP_FAILURE_PATH_LEN + 1
+    assert len(summary["failure"]) < 200
+
+
+def test_chunks_keep_only_the_summary():
+    report = [{"name": "t", "uid": "1", "status": "failed", "steps": STEPS, "labels": []}]
+    chunks, _ = chunk_report(report)
+    assert "steps" not in chunks[0]
+    assert chunks[0]["step_summary"]["failure"] == "login > submit"
+    # Сырые кейсы и чанки истории считаются одинаково
+    assert step_name_counts(report) == step_name_counts(chunks)
+    assert failure_locations(report) == failure_locations(chunks) == {"login > submit": 1}
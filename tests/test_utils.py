@@ -70,5 +70,23 @@ def test_send_analysis_with_files(monkeypatch, tmp_path):
         analysis = [{"rule": "trend-image", "attachment": f}]
         utils.send_analysis_to_allure("uid", analysis, files={"trend-image": f})
 
-    assert "json" in captured
-    assert captured["json"] == analysis
+    import serialization
+
+    assert captured["headers"] == {"Content-Type": "application/json"}
+    assert serialization.loads(captured["data"]) == [{"rule": "trend-image", "attachment": "trend.png"}]
+
+
+def test_analyze_cases_falls_back_when_llm_queue_is_full(monkeypatch):
+    import llm_gateway
+
+    def busy(*a, **k):
+        raise llm_gateway.LLMQueueTimeout("busy")
+
+    monkeypatch.setattr(llm_gateway, "generate", busy)
+    summary, rules, _ = utils.analyze_cases_with_llm(
+        [[{"status": "failed", "uid": "1", "name": "t", "statusMessage": "boom"}]],
+        "team",
+    )
+    assert "failed=1" in summary
+    assert "boom x1" in summary
+    assert rules == [("auto-analysis", summary)]
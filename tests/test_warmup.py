@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import warmup
+
+
+def test_readiness_reports_each_component(monkeypatch):
+    def broken():
+        raise RuntimeError("qdrant is down")
+
+    components = {"fast": lambda: None, "broken": broken}
+    monkeypatch.setattr(warmup, "COMPONENTS", components)
+    monkeypatch.setattr(warmup, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(warmup, "WARMUP_RETRIES", 2)
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_DELAY", 0)
+    monkeypatch.setattr(
+        warmup, "_state", {n: {"status": "pending", "seconds": None, "error": None} for n in components}
+    )
+    assert not warmup.readiness()["ready"]
+
+    for thread in warmup.start_warmup():
+        thread.join(5)
+
+    state = warmup.readiness()
+    assert not state["ready"]
+    assert state["components"]["fast"]["status"] == "ready"
+    assert state["components"]["broken"]["status"] == "failed"
+    assert state["components"]["broken"]["error"] == "qdrant is down"
+
+
+def test_disabled_warmup_is_ready(monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_ENABLED", False)
+    monkeypatch.setattr(
+        warmup, "_state", {n: {"status": "pending", "seconds": None, "error": None} for n in warmup.COMPONENTS}
+    )
+    assert warmup.start_warmup() == []
+    assert warmup.readiness()["ready"]
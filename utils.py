@@ -17,9 +17,9 @@ def save_analysis_result(uuid, analysis):
 
 
 def send_analysis_to_allure(uuid, analysis, files=None):
-    import json
     import requests
     from requests.auth import HTTPBasicAuth
+    import serialization
 
     allure_api = f"{get_env('ALLURE_API_ANALYSIS_ENDPOINT')}/{uuid}"
     user = get_env("ALLURE_API_USER")
@@ -46,7 +46,7 @@ def send_analysis_to_allure(uuid, analysis, files=None):
 
     if allow_attachments and attachments:
         # Multipart request with JSON part and attachments
-        multipart = {"analysis": (None, json.dumps(analysis), "application/json")}
+        multipart = {"analysis": (None, serialization.dumps(analysis), "application/json")}
         for key, f in attachments.items():
             if isinstance(f, tuple):
                 multipart[key] = f
@@ -54,14 +54,35 @@ def send_analysis_to_allure(uuid, analysis, files=None):
                 multipart[key] = (os.path.basename(getattr(f, "name", key)), f)
         resp = requests.post(allure_api, files=multipart, auth=auth)
     else:
-        resp = requests.post(allure_api, json=analysis, auth=auth)
+        resp = requests.post(
+            allure_api,
+            data=serialization.dumps(analysis),
+            headers={"Content-Type": "application/json"},
+            auth=auth,
+        )
 
     if resp.status_code != 200:
         raise Exception(f"Failed to send analysis: {resp.text}")
 
 
+def _rule_based_summary(status_summary, top_errors, locator_failures, flaky_count):
+    """Return a short summary built without the LLM."""
+    return (
+        "LLM недоступна, сводка сформирована автоматически.\n"
+        f"Статусы: {status_summary}\n"
+        f"Ошибки: {top_errors}\n"
+        f"Не найдено локаторов: {locator_failures}\n"
+        f"Флейки: {flaky_count}"
+    )
+
+
 def analyze_cases_with_llm(
-    all_reports, team_name, trend_text=None, trend_img_path=None
+    all_reports,
+    team_name,
+    trend_text=None,
+    trend_img_path=None,
+    priority=None,
+    failure_clusters=None,
 ):
     """Invoke LLM to analyse provided test cases.
 
@@ -77,6 +98,11 @@ def analyze_cases_with_llm(
         Path to the trend image created by :mod:`plotter`. The image is
         returned as an Allure attachment but is not included in the LLM
         prompt.
+    priority : int, optional
+        Queue priority of the LLM call, see :mod:`llm_gateway`.
+    failure_clusters : list, optional
+        Clusters of similar failures from
+        :func:`failure_clustering.cluster_failures`.
 
     Returns
     -------
@@ -88,9 +114,10 @@ def analyze_cases_with_llm(
     from collections import Counter, defaultdict
     from datetime import datetime
     from plotter import flatten_report
-
-    ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
-    llm_model = os.getenv("LLM_MODEL", "gemma3:4b")
+    from error_signature import signature_info
+    import llm_gateway
+    import prompt_builder
+    from prompt_builder import PromptSection
 
     # "all_reports" may contain nested lists, flatten them
     cases = []
@@ -160,40 +187,36 @@ def analyze_cases_with_llm(
             flaky_count += 1
         status = (c.get("status") or "").lower()
         if status in {"failed", "broken"}:
-            msg = c.get("statusMessage") or ""
-            trace = c.get("statusTrace") or ""
-            lines = msg.splitlines() or trace.splitlines()
-            key = lines[0][:120] if lines else ""
-            if key:
-                error_clusters[key] += 1
-            if (
-                "no such element" in trace.lower()
-                or "nosuchelement" in trace.lower()
-                or "element not found" in msg.lower()
-            ):
+            info = signature_info(c)
+            if info["signature"]:
+                error_clusters[info["signature"]] += 1
+            if info["locator"]:
                 locator_failures += 1
 
     top_errors = (
         "; ".join(f"{m} x{c}" for m, c in error_clusters.most_common(3)) or "нет"
     )
 
+    clusters_info = "нет"
+    if failure_clusters:
+        from failure_clustering import FAILURE_CLUSTERS_TOP, format_cluster
+
+        clusters_info = "; ".join(
+            format_cluster(c) for c in failure_clusters[:FAILURE_CLUSTERS_TOP]
+        )
+
     # --- Optimisation hints ---
     name_counter = Counter(c.get("name") for c in cases if c.get("name"))
     duplicates = [n for n, c in name_counter.items() if c > 1]
-    duplicates_info = ", ".join(duplicates) if duplicates else "нет"
-
-    step_counter = Counter()
+    duplicates_info = prompt_builder.summarize_items(duplicates)
 
-    def _collect_steps(steps):
-        if not steps:
-            return
-        for st in steps:
-            if st.get("name"):
-                step_counter[st["name"]] += 1
-            _collect_steps(st.get("steps"))
+    from step_analysis import failure_locations, step_name_counts
 
-    for c in cases:
-        _collect_steps(c.get("steps"))
+    step_counter = step_name_counts(cases)
+    locations = failure_locations(cases)
+    failure_steps = (
+        "; ".join(f"{p} x{c}" for p, c in locations.most_common(3)) if locations else "нет"
+    )
 
     common_steps = (
         ", ".join(f"{n} x{c}" for n, c in step_counter.most_common(3))
@@ -215,43 +238,56 @@ def analyze_cases_with_llm(
     for c in cases:
         miss = [f for f in mandatory_fields if not c.get(f)]
         if miss:
-            missing.append(f"{c.get('uid', '?')}: {', '.join(miss)}")
-    missing_summary = "; ".join(missing) if missing else "нет"
+            missing.append((c.get("uid", "?"), miss))
+    missing_summary = prompt_builder.summarize_missing_fields(missing)
 
     # --- Form prompt for LLM ---
-    text = (
-        f"Команда: {team_name}\n"
-        f"Период запуска: {run_period}\n"
-        f"Окружение: {env_str}\n"
-        f"Инициаторы: {initiators_str}\n\n"
-        f"Статусы: {status_summary}\n"
-        f"Ошибки: {top_errors}\n"
-        f"Не найдено локаторов: {locator_failures}\n"
-        f"Флейки: {flaky_count}\n"
-        f"Дубли тестов: {duplicates_info}\n"
-        f"Повторяющиеся шаги: {common_steps}\n"
-        f"Обязательные поля (name, status, uid, description, owner, labels, jira): {missing_summary}\n"
-    )
-
+    # Sections are ranked: when the token budget is tight the least
+    # important ones (priority with the highest value) are cut first.
+    sections = [
+        PromptSection(
+            f"Команда: {team_name}\n"
+            f"Период запуска: {run_period}\n"
+            f"Окружение: {env_str}\n"
+            f"Инициаторы: {initiators_str}\n\n",
+            priority=1,
+        ),
+        PromptSection(f"Статусы: {status_summary}\n", priority=0),
+        PromptSection(f"Ошибки: {top_errors}\n", priority=0),
+        PromptSection(f"Кластеры ошибок: {clusters_info}\n", priority=1),
+        PromptSection(
+            f"Не найдено локаторов: {locator_failures}\n"
+            f"Флейки: {flaky_count}\n",
+            priority=0,
+        ),
+        PromptSection(f"Дубли тестов: {duplicates_info}\n", priority=3),
+        PromptSection(f"Повторяющиеся шаги: {common_steps}\n", priority=3),
+        PromptSection(f"Шаги падений: {failure_steps}\n", priority=2),
+        PromptSection(
+            "Обязательные поля (name, status, uid, description, owner, labels, jira): "
+            f"{missing_summary}\n",
+            priority=4,
+        ),
+    ]
     if trend_text:
-        text += f"\nТренд по датам:\n{trend_text}\n"
+        sections.append(PromptSection(f"\nТренд по датам:\n{trend_text}\n", priority=2))
 
-    text += (
+    text = prompt_builder.build_prompt(
+        sections,
         "\nСделай вывод о стабильности тестов, ключевых проблемах и дай краткие рекомендации."
-        " Ответ дай на русском, по существу."
+        " Ответ дай на русском, по существу.",
     )
 
-    payload = {
-        "model": llm_model,
-        "prompt": text,
-        "stream": False,
-    }
+    if priority is None:
+        priority = llm_gateway.PRIORITY_NORMAL
     try:
-        response = requests.post(ollama_url, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        summary = result.get("response", "").strip() or result.get(
-            "message", "Нет ответа от LLM"
+        summary = llm_gateway.generate(text, priority=priority) or "Нет ответа от LLM"
+    except llm_gateway.LLMCancelled:
+        # Клиент ушёл, пока вызов стоял в очереди: анализ не нужен
+        raise
+    except llm_gateway.LLMQueueTimeout:
+        summary = _rule_based_summary(
+            status_summary, top_errors, locator_failures, flaky_count
         )
     except Exception as e:
         summary = f"Ошибка вызова LLM: {e}"
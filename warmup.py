@@ -0,0 +1,100 @@
+"""Background warm-up of heavy components.
+
+Heavy libraries are imported lazily, so the service answers health checks
+right after start.  At start-up :func:`start_warmup` loads the embedding
+model, opens the Qdrant connection and renders a tiny matplotlib figure in
+background threads, so the first ``/uuid/analyze`` does not pay for them.
+:func:`readiness` reports which components are warm.
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Attempts per component (Qdrant may start after the service)
+WARMUP_RETRIES = int(os.getenv("WARMUP_RETRIES", 5))
+WARMUP_RETRY_DELAY = float(os.getenv("WARMUP_RETRY_DELAY", 2))
+
+
+def _warm_embedding_model():
+    import embedder
+
+    model = embedder.get_model()
+    model.encode(["passage: warm-up"], convert_to_numpy=True, normalize_embeddings=True)
+
+
+def _warm_qdrant():
+    import qdrant_store
+
+    qdrant_store.get_client().get_collections()
+
+
+def _warm_renderer():
+    import plotter
+
+    plotter.warm_up()
+
+
+COMPONENTS = {
+    "embedding_model": _warm_embedding_model,
+    "qdrant": _warm_qdrant,
+    "renderer": _warm_renderer,
+}
+
+_state = {name: {"status": "pending", "seconds": None, "error": None} for name in COMPONENTS}
+_lock = threading.Lock()
+
+
+def _set(name, **values):
+    with _lock:
+        _state[name].update(values)
+
+
+def _run(name, func):
+    _set(name, status="warming")
+    start = time.perf_counter()
+    for attempt in range(1, WARMUP_RETRIES + 1):
+        try:
+            func()
+        except Exception as e:
+            logger.warning("[WARMUP] %s attempt %s failed: %s", name, attempt, e)
+            _set(name, error=str(e))
+            if attempt < WARMUP_RETRIES:
+                time.sleep(WARMUP_RETRY_DELAY)
+            continue
+        elapsed = round(time.perf_counter() - start, 3)
+        _set(name, status="ready", seconds=elapsed, error=None)
+        logger.info("[WARMUP] %s ready in %.2fs", name, elapsed)
+        return
+    _set(name, status="failed", seconds=round(time.perf_counter() - start, 3))
+
+
+def start_warmup():
+    """Start warming up all components in daemon threads.
+
+    Returns the started threads (an empty list when ``WARMUP_ENABLED`` is
+    false).
+    """
+    if not WARMUP_ENABLED:
+        # Components are loaded on first use, nothing to wait for
+        for name in COMPONENTS:
+            _set(name, status="disabled")
+        return []
+    threads = []
+    for name, func in COMPONENTS.items():
+        thread = threading.Thread(target=_run, args=(name, func), name=f"warmup-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def readiness() -> dict:
+    """Return ``{"ready": bool, "components": {...}}``."""
+    with _lock:
+        components = {name: dict(state) for name, state in _state.items()}
+    ready = all(c["status"] in {"ready", "disabled"} for c in components.values())
+    return {"ready": ready, "components": components}